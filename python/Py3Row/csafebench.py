@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Description:
+    Microbenchmark of the CSAFE codec in pyrowlib.csafe_cmd using PM5
+    response frames, compared against the 0.1.0 reference decoder.
+
+Example:
+    %prog
+    %prog -n 100000
+    %prog --capture workout.c2rc
+"""
+# -----------------------------------------------------------------------------
+#                               Safe Imports
+# -----------------------------------------------------------------------------
+# Standard
+from array import array
+from time import perf_counter
+from timeit import timeit
+import sys
+import os
+
+# Third party
+
+# Local packages
+from pyrowlib import capture, csafe_cmd, csafe_dic
+from pyrowlib.pyrow import PyRow
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+__author__ = "Copyright (c) 2022, W P Dulyea, All rights reserved."
+__email__ = "wpdulyea@yahoo.com"
+__version__ = "$Name: Release 0.1.0 $"[7:-2]
+
+# PM5 responses (report ID 0x04) to the PyRow built-in queries.
+FRAMES = {
+    "get_monitor": (
+        [
+            "CSAFE_PM_GET_WORKTIME",
+            "CSAFE_PM_GET_WORKDISTANCE",
+            "CSAFE_GETCADENCE_CMD",
+            "CSAFE_GETPOWER_CMD",
+            "CSAFE_GETPACE_CMD",
+            "CSAFE_GETCALORIES_CMD",
+            "CSAFE_GETHRCUR_CMD",
+        ],
+        "04f1851a0ea00540e2010007a3056eb2000003a7031c0054b403f3030058a603d4"
+        "0039a3026000b00198b9f2",
+    ),
+    "get_status": (
+        ["CSAFE_PM_GET_STROKESTATE"],
+        "04f1851a03bf010220f2",
+    ),
+    "get_workout": (
+        [
+            "CSAFE_GETID_CMD",
+            "CSAFE_PM_GET_WORKOUTTYPE",
+            "CSAFE_PM_GET_WORKOUTSTATE",
+            "CSAFE_PM_GET_INTERVALTYPE",
+            "CSAFE_PM_GET_WORKOUTINTERVALCOUNT",
+        ],
+        "04f18592033034321a0c8901018d01018e01ff9f0100def2",
+    ),
+    "get_erg": (
+        ["CSAFE_GETVERSION_CMD", "CSAFE_GETSERIAL_CMD", "CSAFE_GETCAPS_CMD", 0],
+        "04f18591071610050002aa00940934333031323334353670037940326df2",
+    ),
+    "get_force_plot": (
+        ["CSAFE_PM_GET_STROKESTATE", "CSAFE_PM_GET_FORCEPLOTDATA", 32],
+        "04f1851a26bf01026b21200c00280058008c00b900dc00f30100f30300f30000"
+        "e600d200be00a00078005000280022f2",
+    ),
+}
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def transmission(hexframe: str) -> array:
+    """
+    Pads the frame to the 63 byte report and returns it the way
+    pyusb does, as an array('B').
+    """
+    raw = bytes.fromhex(hexframe)
+
+    return array("B", raw + bytes(63 - len(raw)))
+
+
+def reference_decode(transmission: list) -> dict:
+    """
+    The list based decoder shipped in release 0.1.0, kept for comparison.
+    """
+    message = []
+    j = 4 if transmission[1] == csafe_dic.Extended_Frame_Start_Flag else 2
+    while transmission[j] != csafe_dic.Stop_Frame_Flag:
+        message.append(transmission[j])
+        j += 1
+
+    i = 0
+    checksum = 0
+    while i < len(message):
+        if message[i] == csafe_dic.Byte_Stuffing_Flag:
+            stuffvalue = message.pop(i + 1)
+            message[i] = 0xF0 | stuffvalue
+        checksum = checksum ^ message[i]
+        i = i + 1
+    del message[-1]
+
+    response = {"CSAFE_GETSTATUS_CMD": [message.pop(0)]}
+    k = 0
+    wrapend = -1
+    wrapper = 0x0
+    while k < len(message):
+        result = []
+        msgcmd = message[k]
+        if k <= wrapend:
+            msgcmd = wrapper | msgcmd
+        msgprop = list(csafe_dic.resp[msgcmd])
+        k = k + 1
+        bytecount = message[k]
+        k = k + 1
+        if msgprop[0] == "CSAFE_SETUSERCFG1_CMD":
+            wrapper = message[k - 2] << 8
+            wrapend = k + bytecount - 1
+            if bytecount:
+                msgcmd = wrapper | message[k]
+                msgprop = list(csafe_dic.resp[msgcmd])
+                k = k + 1
+                bytecount = message[k]
+                k = k + 1
+        if msgprop[0] == "CSAFE_GETCAPS_CMD":
+            msgprop[1] = [1] * bytecount
+        if msgprop[0] == "CSAFE_GETID_CMD":
+            msgprop[1] = [-bytecount]
+        for numbytes in msgprop[1]:
+            raw_bytes = message[k : k + abs(numbytes)]
+            if numbytes >= 0:
+                value = 0
+                for n in range(len(raw_bytes)):
+                    value = (raw_bytes[n] << (8 * n)) | value
+            else:
+                value = ""
+                for letter in raw_bytes:
+                    value += chr(letter)
+            result.append(value)
+            k = k + abs(numbytes)
+        response[msgprop[0]] = result
+
+    return response
+
+
+def read_inputs():
+    from argparse import ArgumentParser
+
+    res = None
+    try:
+        parser = ArgumentParser()
+        parser.add_argument(
+            "-n", help="Decodes per frame", type=int, default=20000,
+            required=False
+        )
+        parser.add_argument(
+            "--capture", help="Decodes the reads of a capture file",
+            required=False
+        )
+        res = parser.parse_args()
+    except Exception as error:
+        print(str(error))
+    finally:
+        return res
+
+
+def bench_capture(path: str) -> int:
+    """
+    Decodes every report read in the capture at path with the generic
+    decoder and, for PyRow's precompiled queries, the fused parser.
+    """
+    parsers = {
+        frame.frame: frame.parser
+        for frame in vars(PyRow).values()
+        if isinstance(frame, csafe_cmd.CompiledFrame)
+    }
+    frames = [
+        (report, parsers.get(frame))
+        for frame, report in capture.replay_frames(path)
+    ]
+    if not frames:
+        print(f"{path}: no reads")
+        return 1
+
+    start = perf_counter()
+    for report, parser in frames:
+        csafe_cmd.decode(report)
+    generic = perf_counter() - start
+
+    start = perf_counter()
+    for report, parser in frames:
+        csafe_cmd.decode(report, parser)
+    fused = perf_counter() - start
+
+    known = sum(parser is not None for report, parser in frames)
+    print(f"{len(frames)} reads, {known} from precompiled queries")
+    print(f"decode us {generic / len(frames) * 1e6:>10.2f}")
+    print(f"fused us  {fused / len(frames) * 1e6:>10.2f}")
+
+    return 0
+
+
+def main(number: int) -> int:
+    print(
+        f"{'frame':<16}{'reference us':>14}{'decode us':>12}"
+        f"{'fused us':>12}{'speedup':>10}"
+    )
+    for name, (commands, hexframe) in FRAMES.items():
+        frame = transmission(hexframe)
+        parser = csafe_cmd.compile(commands).parser
+        expected = reference_decode(frame)
+        decoded = (csafe_cmd.decode(frame), csafe_cmd.decode(frame, parser))
+        if any(response != expected for response in decoded):
+            print(f"{name}: decoders disagree")
+            return 1
+
+        old = timeit(lambda: reference_decode(frame), number=number)
+        new = timeit(lambda: csafe_cmd.decode(frame), number=number)
+        fused = timeit(lambda: csafe_cmd.decode(frame, parser), number=number)
+        print(
+            f"{name:<16}{old / number * 1e6:>14.2f}{new / number * 1e6:>12.2f}"
+            f"{fused / number * 1e6:>12.2f}{old / min(new, fused):>9.2f}x"
+        )
+
+    return 0
+
+
+# -----------------------------------------------------------------------------
+#                               If run as main file
+# -----------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    cmd_name = os.path.splitext(os.path.basename(__file__))[0]
+    args = read_inputs()
+    if args is None:
+        sys.exit(1)
+
+    if args.capture:
+        sys.exit(bench_capture(args.capture))
+    sys.exit(main(args.n))
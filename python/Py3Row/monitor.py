@@ -24,6 +24,7 @@ import pygame
 
 # Local packages
 from pyrowlib import pyrow
+from pyrowlib.reconnect import ERRORS, Reconnector
 
 
 # TOP LEVEL CONSTANTS
@@ -75,6 +76,10 @@ def main():
         exit("Failed to create erg connection")
     else:
         print("Connected to erg.")
+    # Reconnects in the background after USB errors
+    reconnector = Reconnector(erg)
+    # Metrics of each force curve read in the force curve view
+    analyzer = erg.analyze_strokes()
 
     # SETUP PM VARS
     cmeters = 0
@@ -96,6 +101,7 @@ def main():
     disconnectedText = tinyFont.render(
         "Connection Lost - Re-Start!", True, RED
     )
+    staleText = tinyFont.render("Connection Lost - Reconnecting", True, RED)
     quitText = tinyFont.render("Press Esc to Exit", True, BLACK)
     errexitText = smallFont.render("Press Esc to", True, RED)  # after error
     errexitText2 = smallFont.render("Exit!", True, RED)  # after error
@@ -139,11 +145,21 @@ def main():
     menuText2 = tinyFont.render("Press 1 = Calorie view", True, WHITE)
     menuText3 = tinyFont.render("Press 2 = Force Curve", True, WHITE)
 
+    monitor = None
     while start_game is False:
         try:
-            monitor = erg.get_monitor()
-            if monitor["time"] > 0:  # if rowing detected start main loop
-                start_game = True
+            if reconnector.down:
+                pygame.time.wait(100)
+            else:
+                monitor = erg.get_monitor()
+                if monitor["time"] > 0:  # if rowing detected start main loop
+                    start_game = True
+        except ERRORS as err:  # retry in the background
+            print(f"Lost erg: {err}")
+            reconnector.start()
+            screen.fill(LTGREY, (1, 1, 300, 60))  # x,y,w,h
+            screen.blit(staleText, (1, 1))
+            pygame.display.update()
         except Exception:  # display error msg
             screen.fill(LTGREY, (1, 1, 300, 60))  # x,y,w,h
             screen.fill(LTGREY, (600, 445, 350, 200))  # x,y,w,h
@@ -163,6 +179,7 @@ def main():
 
     # MAIN WORKOUT LOOP
     command = ["CSAFE_PM_GET_WORKDISTANCE"]
+    result = None
     while game_over is False:
         for event in pygame.event.get():
             if event.type == pygame.KEYDOWN:
@@ -179,9 +196,20 @@ def main():
                 pygame.quit()
                 sys.exit(0)
 
-        monitor = erg.get_monitor()
-        ergData = erg.get_erg()
-        result = erg.send(command)
+        # While reconnecting the last values are shown, marked stale
+        if not reconnector.down:
+            try:
+                monitor = erg.get_monitor()
+                ergData = erg.get_erg()
+                result = erg.send(command)
+            except ERRORS as err:
+                print(f"Lost erg: {err}")
+                reconnector.start()
+        stale = reconnector.down
+        if stale:
+            pygame.time.wait(100)
+        if monitor is None or result is None:
+            continue
 
         cmeters = result["CSAFE_PM_GET_WORKDISTANCE"][0] / 10
         calhr = monitor["calhr"]  # pre processed data
@@ -264,6 +292,8 @@ def main():
 
             screen.blit(hrateText, (670, 590))
             screen.blit(heart, (900, 630))  # symbol
+            if stale:
+                screen.blit(staleText, (35, 110))
             pygame.display.update()
 
         if view == 1:
@@ -304,14 +334,31 @@ def main():
 
             screen.blit(hrateText, (670, 590))
             screen.blit(heart, (900, 630))  # symbol
+            if stale:
+                screen.blit(staleText, (35, 110))
             pygame.display.update()
 
         if view == 2:
-            force = erg.get_forceplot_data()
+            force = []
+            if not stale:
+                try:
+                    force = erg.get_forceplot_data()
+                except ERRORS as err:
+                    print(f"Lost erg: {err}")
+                    reconnector.start()
             forcedata = ",".join([str(f) for f in force])
 
             print(str(power) + "W")
             print(forcedata)
+            if force and analyzer.last is not None:
+                metrics = analyzer.last
+                consistency = analyzer.consistency().get("overall", 0.0)
+                print(
+                    f"peak {metrics.peak:.0f} at {metrics.peakpos:.0%}"
+                    f" avg/peak {metrics.ratio:.2f}"
+                    f" smooth {metrics.smoothness:.2f}"
+                    f" consistency {consistency:.0%}"
+                )
 
             plot_col_picker = counter
             if counter == 0:  # 5 visible force curves before clearing screen
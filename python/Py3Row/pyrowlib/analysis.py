@@ -0,0 +1,328 @@
+"""
+Description:
+    Vectorized analysis of stored sessions. load() reads one or many
+    session files into NumPy arrays, the strokes of each session after
+    those of the one before, and the functions here work on the whole
+    arrays at once: splits, rolling pace, power duration curves, stroke
+    rate histograms and average force curves. Pace, power and calories
+    are converted with the pyrowlib.units formulas applied to arrays.
+    Requires NumPy.
+
+Example:
+    data = load(glob.glob("workout-*.c2ss"))
+    print(power_curve(data))
+    for session in data:
+        print(session.paths[0], splits(session["distance"], session["time"]))
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+import os
+
+# Third party
+import numpy
+
+# Local packages
+from pyrowlib import units
+from pyrowlib.sample import COLUMNS, TYPECODES
+from pyrowlib.store import SessionReader
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+SPLIT = 500.0  # meters
+# Seconds the rolling pace is taken over
+PACE_WINDOW = 30.0
+# Power duration curve durations, seconds
+DURATIONS = (10, 30, 60, 240, 600, 1200, 1800, 3600)
+# Stroke rate histogram range, strokes per minute
+SPM_RANGE = (10, 60)
+# Points of a resampled force curve
+CURVE_POINTS = 64
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def _nonzero(values: numpy.ndarray, convert: object) -> numpy.ndarray:
+    """
+    convert applied to values, 0 where values is 0.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    moving = values > 0
+
+    return numpy.where(moving, convert(numpy.where(moving, values, 1.0)), 0.0)
+
+
+def pace_to_watts(pace: numpy.ndarray) -> numpy.ndarray:
+    """
+    Watts of each pace, seconds per 500 m, 0 for a pace of 0.
+    """
+    return _nonzero(pace, units.pace_to_watts)
+
+
+def watts_to_pace(watts: numpy.ndarray) -> numpy.ndarray:
+    return _nonzero(watts, units.watts_to_pace)
+
+
+def watts_to_calhr(watts: numpy.ndarray) -> numpy.ndarray:
+    """
+    Calories per hour at each power, 0 for 0 W as PyRow.get_sample.
+    """
+    return _nonzero(watts, units.watts_to_calhr)
+
+
+def splits(
+    distance: numpy.ndarray, time: numpy.ndarray, split: float = SPLIT
+) -> numpy.ndarray:
+    """
+    Returns the seconds each whole split of split meters took, the time
+    at each split mark interpolated between strokes. With 500 m splits
+    these are the split paces.
+    """
+    distance = numpy.asarray(distance, dtype=numpy.float64)
+    time = numpy.asarray(time, dtype=numpy.float64)
+    if not len(distance):
+        return numpy.zeros(0)
+    # The workout starts at 0 m and 0 s, before the first stroke
+    if distance[0] > 0:
+        distance = numpy.concatenate(([0.0], distance))
+        time = numpy.concatenate(([0.0], time))
+
+    marks = numpy.arange(int(distance[-1] // split) + 1) * split
+
+    return numpy.diff(numpy.interp(marks, distance, time))
+
+
+def rolling_pace(
+    distance: numpy.ndarray, time: numpy.ndarray, window: float = PACE_WINDOW
+) -> numpy.ndarray:
+    """
+    Returns the pace, seconds per 500 m, at each stroke over the window
+    seconds before it, 0 where no distance was covered.
+    """
+    distance = numpy.asarray(distance, dtype=numpy.float64)
+    time = numpy.asarray(time, dtype=numpy.float64)
+    first = numpy.searchsorted(time, time - window)
+    meters = distance - distance[first]
+    seconds = time - time[first]
+    covered = meters > 0
+
+    return numpy.where(
+        covered, SPLIT * seconds / numpy.where(covered, meters, 1.0), 0.0
+    )
+
+
+def power_curve(data: object, durations: tuple = DURATIONS) -> numpy.ndarray:
+    """
+    Returns the best average watts held for each of durations seconds in
+    any one session of data, 0 for durations longer than every session.
+    Between strokes the power of the last stroke is held.
+    """
+    durations = numpy.asarray(durations, dtype=numpy.int64)
+    best = numpy.zeros(len(durations))
+
+    for session in data:
+        time = session["time"]
+        if len(time) < 2:
+            continue
+        # Power at each whole second of the session
+        seconds = numpy.arange(time[0], time[-1], 1.0)
+        held = session["power"][numpy.searchsorted(time, seconds, "right") - 1]
+        total = numpy.concatenate(([0.0], numpy.cumsum(held, dtype=float)))
+        for index, duration in enumerate(durations):
+            if 0 < duration <= len(held):
+                averages = (total[duration:] - total[:-duration]) / duration
+                best[index] = max(best[index], averages.max())
+
+    return best
+
+
+def stroke_rate_histogram(
+    spm: numpy.ndarray, low: int = SPM_RANGE[0], high: int = SPM_RANGE[1]
+) -> tuple:
+    """
+    Returns (counts, rates), the number of strokes at each stroke rate
+    from low to high, rates outside it are left out.
+    """
+    rates = numpy.arange(low, high + 1)
+    counts = numpy.bincount(
+        numpy.asarray(spm, dtype=numpy.int64), minlength=high + 1
+    )
+
+    return counts[low : high + 1], rates
+
+
+def resample(
+    offsets: numpy.ndarray, points: numpy.ndarray, length: int = CURVE_POINTS
+) -> numpy.ndarray:
+    """
+    Returns a float32 array of the force curves, curve i is
+    points[offsets[i] : offsets[i + 1]], each linearly resampled to
+    length points from the catch to the end of the drive. Rows of empty
+    curves are 0.
+    """
+    offsets = numpy.asarray(offsets, dtype=numpy.int64)
+    values = numpy.asarray(points, dtype=numpy.float32)
+    sizes = numpy.diff(offsets)
+    curves = numpy.zeros((len(sizes), length), dtype=numpy.float32)
+    captured = sizes > 0
+    if not captured.any():
+        return curves
+
+    last = (sizes[captured] - 1).astype(numpy.float32)[:, None]
+    position = numpy.linspace(0.0, 1.0, length, dtype=numpy.float32) * last
+    low = position.astype(numpy.int64)
+    fraction = position - low
+    low += offsets[:-1][captured, None]
+    # The point after the last of a curve is only ever weighted by 0
+    below = values[low]
+    above = values[numpy.minimum(low + 1, len(values) - 1)]
+    curves[captured] = below + (above - below) * fraction
+
+    return curves
+
+
+def force_average(data: object, length: int = CURVE_POINTS) -> numpy.ndarray:
+    """
+    Returns the average of the force curves of data, each resampled to
+    length points, strokes without a curve left out.
+    """
+    curves = resample(data.offsets, data.points, length)
+    captured = numpy.diff(data.offsets) > 0
+    if not captured.any():
+        return numpy.zeros(length)
+
+    return curves[captured].mean(axis=0, dtype=numpy.float64)
+
+
+def load(paths: list) -> object:
+    """
+    Reads the session files at paths, or the one at paths if it is a
+    single path, into a SessionArrays.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+
+    names, serials, workouttypes, started = [], [], [], []
+    columns = {name: [] for name in COLUMNS}
+    offsets = [numpy.zeros(1, dtype=numpy.int64)]
+    points = [numpy.zeros(0, dtype=numpy.uint16)]
+    bounds = [0]
+    base = 0
+    for path in paths:
+        with SessionReader(path) as session:
+            names.append(str(path))
+            serials.append(session.serial)
+            workouttypes.append(session.workouttype)
+            started.append(session.started)
+            for name in COLUMNS:
+                columns[name].append(numpy.array(session.column(name)))
+            starts, curve = session.forces()
+            offsets.append(numpy.array(starts[1:], dtype=numpy.int64) + base)
+            points.append(numpy.array(curve))
+            base += len(curve)
+            bounds.append(bounds[-1] + len(session))
+
+    return SessionArrays(
+        names,
+        serials,
+        numpy.array(workouttypes, dtype=numpy.int64),
+        numpy.array(started, dtype=numpy.float64),
+        numpy.array(bounds, dtype=numpy.int64),
+        {
+            name: (
+                numpy.concatenate(parts)
+                if parts
+                else numpy.zeros(0, dtype=TYPECODES[name])
+            )
+            for name, parts in columns.items()
+        },
+        numpy.concatenate(offsets),
+        numpy.concatenate(points),
+    )
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class SessionArrays(object):
+    """
+    Strokes of one or more sessions as NumPy arrays, data["power"] is the
+    power column of every stroke. Iterating gives each session on its
+    own, as a SessionArrays of views.
+
+    :param list paths: Session file of each session
+    :param list serials: Erg serial of each session
+    :param ndarray workouttypes: Workout type of each session
+    :param ndarray started: time.time() each session started
+    :param ndarray bounds: Index of the first stroke of each session,
+        then the number of strokes
+    :param dict columns: {column: array} over every stroke
+    :param ndarray offsets: Force curve of stroke i is points[offsets[i]
+        : offsets[i + 1]]
+    :param ndarray points: Force points of every stroke
+    :return: SessionArrays Object
+    """
+
+    def __init__(
+        self: object,
+        paths: list,
+        serials: list,
+        workouttypes: numpy.ndarray,
+        started: numpy.ndarray,
+        bounds: numpy.ndarray,
+        columns: dict,
+        offsets: numpy.ndarray,
+        points: numpy.ndarray,
+    ):
+        self.paths = paths
+        self.serials = serials
+        self.workouttypes = workouttypes
+        self.started = started
+        self.bounds = bounds
+        self.columns = columns
+        self.offsets = offsets
+        self.points = points
+
+    def __len__(self: object) -> int:
+        return int(self.bounds[-1])
+
+    def __getitem__(self: object, name: str) -> numpy.ndarray:
+        return self.columns[name]
+
+    def __iter__(self: object):
+        for index in range(len(self.paths)):
+            yield self.session(index)
+
+    @property
+    def sessions(self: object) -> int:
+        return len(self.paths)
+
+    def session(self: object, index: int) -> object:
+        """
+        Session index on its own, its arrays are views into these.
+        """
+        first, last = self.bounds[index], self.bounds[index + 1]
+        offsets = self.offsets[first : last + 1]
+
+        return SessionArrays(
+            self.paths[index : index + 1],
+            self.serials[index : index + 1],
+            self.workouttypes[index : index + 1],
+            self.started[index : index + 1],
+            numpy.array([0, last - first], dtype=numpy.int64),
+            {
+                name: column[first:last]
+                for name, column in self.columns.items()
+            },
+            offsets - offsets[0],
+            self.points[offsets[0] : offsets[-1]],
+        )
+
+    def force(self: object, index: int) -> numpy.ndarray:
+        """
+        Force curve of stroke index.
+        """
+        return self.points[self.offsets[index] : self.offsets[index + 1]]
@@ -0,0 +1,181 @@
+"""
+Description:
+    Asyncio client for the Concept2 PM. AsyncPyRow wraps a PyRow, runs
+    the blocking USB transfers on a dedicated single thread executor and
+    waits out the frame gap with asyncio timers, so several ergs, servers
+    and a UI can share one event loop.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+# Local packages
+from pyrowlib import csafe_cmd
+from pyrowlib import pyrow
+from pyrowlib.poller import ErgSample, POLL_RATE
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Seconds get_forceplot_data waits for a stroke to finish
+FORCEPLOT_TIMEOUT = 5.0
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class AsyncPyRow(object):
+    """
+    Awaitable version of the PyRow queries. Calls are serialised, each
+    one waits for the frame gap on the event loop and then runs its
+    single frame exchange on the executor, where the PyRow scheduler
+    finds the gap already passed.
+
+    :param PyRow erg: Connected erg, only used through this object
+    :param ThreadPoolExecutor executor: Executor for USB transfers, by
+        default a dedicated single thread
+    :return: AsyncPyRow Object
+    """
+
+    def __init__(self: object, erg: object, executor: object = None):
+        self.erg = erg
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(1, thread_name_prefix="AsyncPyRow")
+        self.executor = executor
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def open(cls: type, device: object, executor: object = None):
+        """
+        Opens device, as returned by pyrow.find(), on the executor.
+        """
+        self = cls(None, executor)
+        loop = asyncio.get_running_loop()
+        self.erg = await loop.run_in_executor(
+            self.executor, pyrow.PyRow, device
+        )
+
+        return self
+
+    @property
+    def forcecapture(self: object) -> object:
+        """
+        The erg's ForceCapture, strokes read through either API reach
+        its analyzer and statistics.
+        """
+        return self.erg.forcecapture
+
+    async def __aenter__(self: object) -> object:
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.aclose()
+
+    async def aclose(self: object):
+        """
+        Waits for the executor to finish the current transfer and shuts
+        it down, if it was created by this object.
+        """
+        if self._owns_executor:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.executor.shutdown)
+
+    async def _call(self: object, method: object, *args) -> object:
+        """
+        Runs method(*args), one frame exchange, on the executor after
+        waiting for the frame gap.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            delay = self.erg.scheduler.remaining()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await loop.run_in_executor(self.executor, method, *args)
+
+    async def send(self: object, message: list) -> dict:
+        return await self._call(self.erg.send, message)
+
+    async def query(self: object, message: list) -> dict:
+        """
+        As PyRow.query, the other calls may run between the frames.
+        """
+        results = {}
+        for frame in csafe_cmd.plan(message):
+            results.update(await self.send(frame))
+
+        return results
+
+    async def get_monitor(
+        self: object, forceplot: bool = False, strokestate: bool = False
+    ) -> dict:
+        monitor = await self._call(self.erg.get_monitor, False, strokestate)
+        if forceplot:
+            monitor["forceplot"] = await self.get_forceplot_data()
+
+        return monitor
+
+    async def get_force_plot(self: object) -> dict:
+        return await self._call(self.erg.get_force_plot)
+
+    async def get_workout(self: object) -> dict:
+        return await self._call(self.erg.get_workout)
+
+    async def get_erg(self: object) -> dict:
+        return await self._call(self.erg.get_erg)
+
+    async def get_status(self: object) -> dict:
+        return await self._call(self.erg.get_status)
+
+    async def get_forceplot_data(
+        self: object, timeout: float = FORCEPLOT_TIMEOUT
+    ) -> list:
+        """
+        Returns the force curve of the next stroke, as
+        PyRow.get_forceplot_data, waiting on the event loop between
+        polls. The capture report is in self.forcecapture.last.
+        """
+        capture = self.forcecapture
+        capture.reset()
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            forceplot = await self.get_force_plot()
+            stroke = capture.feed(
+                forceplot["strokestate"],
+                forceplot["forceplot"],
+                time.monotonic(),
+            )
+            if stroke is not None:
+                return stroke.force
+
+        force = capture.pending
+        capture.reset()
+
+        return force
+
+    async def stream(self: object, rate: float = POLL_RATE):
+        """
+        Yields an ErgSample, with stroke state, rate times a second. The
+        rate is deadline based and does not try to catch up after a slow
+        consumer.
+        """
+        period = 1.0 / rate
+        deadline = time.monotonic()
+        seq = 0
+
+        while True:
+            monitor = await self.get_monitor(strokestate=True)
+            yield ErgSample(seq, time.monotonic(), monitor)
+            seq += 1
+
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                deadline = time.monotonic()
+            else:
+                await asyncio.sleep(delay)
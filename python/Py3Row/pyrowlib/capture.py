@@ -0,0 +1,298 @@
+"""
+Description:
+    Raw USB capture and replay. RecordingErg wraps the usb.core.Device
+    of an erg and writes every frame PyRow sends and every report it
+    reads, with time.monotonic() timestamps, to a binary capture file.
+    ReplayErg plays a capture back as a device, at recorded speed or as
+    fast as possible, so the monitors and loggers run offline against a
+    recorded workout and field issues can be reproduced.
+
+    Capture file layout, little endian:
+        header  magic b"C2RC", version u16, reserved u16
+        record  kind u8, timestamp f64, size u16, stored u16, data
+    size is the report length, trailing zero padding is not stored.
+
+Example:
+    erg = pyrow.PyRow(RecordingErg(device, "workout.c2rc"))
+    erg = pyrow.PyRow(ReplayErg("workout.c2rc", speed=None))
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from array import array
+from collections import deque
+from struct import Struct
+from threading import Lock
+from typing import NamedTuple
+import os
+import time
+
+# Third party
+from usb.core import USBTimeoutError
+
+# Local packages
+from pyrowlib.simulator import FakeDevice
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+MAGIC = b"C2RC"
+VERSION = 1
+HEADER = Struct("<4sHH")
+RECORD = Struct("<BdHH")
+
+# Record kinds
+WRITE = 0
+READ = 1
+TIMEOUT = 2  # read raised USBTimeoutError
+
+# Open CaptureWriters by path, shared by every RecordingErg recording
+# there so a later recorder appends rather than truncating the file
+_writers = {}
+_writers_lock = Lock()
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def read_capture(path: str):
+    """
+    Yields the CaptureRecords of the capture file at path in order.
+    Raises ValueError if it is not a capture file.
+    """
+    with open(path, "rb") as file:
+        data = memoryview(file.read())
+
+    magic, version, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} capture")
+
+    unpack = RECORD.unpack_from
+    offset = HEADER.size
+    end = len(data)
+    while offset < end:
+        kind, timestamp, size, stored = unpack(data, offset)
+        offset += RECORD.size
+        report = bytes(data[offset : offset + stored])
+        offset += stored
+        if size > stored:
+            report += bytes(size - stored)
+        yield CaptureRecord(kind, timestamp, report)
+
+
+def replay_frames(path: str):
+    """
+    Yields (frame, report) for each read in the capture at path, frame
+    is the last frame written before it.
+    """
+    frame = None
+    for record in read_capture(path):
+        if record.kind == WRITE:
+            frame = record.data
+        elif record.kind == READ:
+            yield frame, record.data
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class CaptureRecord(NamedTuple):
+    """
+    :param int kind: WRITE, READ or TIMEOUT
+    :param float timestamp: time.monotonic() of the transfer
+    :param bytes data: Frame written or report read, empty for TIMEOUT
+    """
+
+    kind: int
+    timestamp: float
+    data: bytes
+
+
+class CaptureWriter(object):
+    """
+    Appends records to a new capture file at path.
+
+    :param str path: Capture file
+    :return: CaptureWriter Object
+    """
+
+    def __init__(self: object, path: str):
+        self.path = path
+        self.records = 0
+        # RecordingErgs using the writer, see RecordingErg.close
+        self.users = 0
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0))
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def write(self: object, kind: int, data, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        data = bytes(data)
+        report = data.rstrip(b"\x00")
+        self._file.write(RECORD.pack(kind, timestamp, len(data), len(report)))
+        self._file.write(report)
+        self.records += 1
+
+    def flush(self: object):
+        self._file.flush()
+
+    @property
+    def closed(self: object) -> bool:
+        return self._file.closed
+
+    def close(self: object):
+        self._file.close()
+
+
+class RecordingErg(object):
+    """
+    Passes everything through to device and records its transfers to
+    a capture file at path. Recorders of the same path share one
+    CaptureWriter, so the device found again after a reconnect is
+    recorded after the transfers before it; the file is closed with the
+    last of them.
+
+    :param usb.core.Device device: Erg, as returned by pyrow.find()
+    :param str path: Capture file
+    :return: RecordingErg Object
+    """
+
+    def __init__(self: object, device: object, path: str):
+        self.device = device
+        key = os.path.abspath(path)
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None or writer.closed:
+                writer = _writers[key] = CaptureWriter(path)
+            writer.users += 1
+        self.capture = writer
+        self.closed = False
+
+    def __getattr__(self: object, name: str) -> object:
+        return getattr(self.device, name)
+
+    def __getitem__(self: object, index: int) -> object:
+        return self.device[index]
+
+    def __repr__(self: object) -> str:
+        return f"RecordingErg({self.device!r}, {self.capture.path!r})"
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def write(self: object, endpoint: int, data, timeout: int = None) -> int:
+        self.capture.write(WRITE, data)
+        return self.device.write(endpoint, data, timeout)
+
+    def read(self: object, endpoint: int, length: int, timeout: int = None):
+        try:
+            report = self.device.read(endpoint, length, timeout)
+        except USBTimeoutError:
+            self.capture.write(TIMEOUT, b"")
+            raise
+        self.capture.write(READ, report)
+
+        return report
+
+    def close(self: object):
+        if self.closed:
+            return
+        self.closed = True
+        with _writers_lock:
+            self.capture.users -= 1
+            if self.capture.users:
+                self.capture.flush()
+                return
+            _writers.pop(os.path.abspath(self.capture.path), None)
+            self.capture.close()
+
+
+class ReplayErg(FakeDevice):
+    """
+    Plays back a capture file as an erg. Each write is matched to the
+    next recorded write of the same frame, skipping any in between, and
+    the reads recorded after it are returned in order. Reads with
+    nothing to return raise USBTimeoutError, as at the end of the
+    capture or after a write that was never recorded.
+
+    :param str path: Capture file
+    :param float speed: Playback speed, 1.0 is as recorded, None is as
+        fast as possible
+    :return: ReplayErg Object
+    """
+
+    def __init__(self: object, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        self.records = list(read_capture(path))
+        self.position = 0
+        # Writes with no recorded match
+        self.mismatches = 0
+        self._reads = deque()
+        # time.monotonic() at the first replayed write and its recorded
+        # timestamp
+        self._start = None
+        self._origin = 0.0
+
+    def __repr__(self: object) -> str:
+        return f"ReplayErg({self.path!r})"
+
+    @property
+    def done(self: object) -> bool:
+        """
+        True when every recorded write has been replayed.
+        """
+        return not any(
+            record.kind == WRITE for record in self.records[self.position :]
+        )
+
+    def write(self: object, endpoint: int, data, timeout: int = None) -> int:
+        frame = bytes(data)
+        records = self.records
+        self._reads.clear()
+
+        for index in range(self.position, len(records)):
+            record = records[index]
+            if record.kind == WRITE and record.data == frame:
+                break
+        else:
+            self.mismatches += 1
+            return len(frame)
+
+        if self._start is None:
+            self._start = time.monotonic()
+            self._origin = record.timestamp
+        index += 1
+        while index < len(records) and records[index].kind != WRITE:
+            self._reads.append(records[index])
+            index += 1
+        self.position = index
+
+        return len(frame)
+
+    def read(self: object, endpoint: int, length: int, timeout: int = None):
+        if not self._reads:
+            raise USBTimeoutError("Operation timed out")
+
+        record = self._reads.popleft()
+        if self.speed:
+            ready = (
+                self._start + (record.timestamp - self._origin) / self.speed
+            )
+            delay = ready - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if record.kind == TIMEOUT:
+            raise USBTimeoutError("Operation timed out")
+
+        return array("B", record.data)
@@ -0,0 +1,272 @@
+"""
+Description:
+    Session catalog. SessionCatalog keeps a summary of each session file
+    (when it started, erg serial, workout type, strokes, distance, time,
+    average and max power, average stroke rate) in a small sqlite3
+    database, so totals over a period and the best sessions are answered
+    from the index without opening any session. strokelog.py adds each
+    session when the workout ends, sessions.py queries it.
+
+Example:
+    with SessionCatalog() as catalog:
+        catalog.add("workout.c2ss")
+        best = catalog.top("time", 1, distance=2000, since=month_start)
+        print(catalog.aggregate(serial="430000001"))
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+import os
+import sqlite3
+
+# Local packages
+from pyrowlib.store import SessionReader
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+CATALOG_PATH = "sessions.db"
+
+# Summary columns, in table order, and their SQL types
+SUMMARY = {
+    "path": "TEXT PRIMARY KEY",
+    "started": "REAL NOT NULL",
+    "serial": "TEXT NOT NULL",
+    "workouttype": "INTEGER NOT NULL",
+    "strokes": "INTEGER NOT NULL",
+    "distance": "REAL NOT NULL",
+    "time": "REAL NOT NULL",
+    "avgpower": "REAL NOT NULL",
+    "maxpower": "INTEGER NOT NULL",
+    "avgspm": "REAL NOT NULL",
+}
+FIELDS = tuple(SUMMARY)
+
+# Metrics top() ranks by, True when a lower value is better
+RANKED = {
+    "time": True,
+    "distance": False,
+    "avgpower": False,
+    "maxpower": False,
+    "strokes": False,
+    "avgspm": False,
+}
+
+# Sessions within this fraction of the distance asked for match it
+DISTANCE_TOLERANCE = 0.01
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def summarize(path: str) -> dict:
+    """
+    Returns the catalog summary of the session file at path, reading
+    only the columns it needs.
+    """
+    with SessionReader(path) as session:
+        strokes = len(session)
+        power = session.column("power")
+        spm = session.column("spm")
+        summary = {
+            "path": os.path.abspath(path),
+            "started": session.started,
+            "serial": session.serial,
+            "workouttype": session.workouttype,
+            "strokes": strokes,
+            # Strokes are sampled at the catch, the totals written when
+            # the workout ended also cover the drive after the last one
+            "distance": max(
+                session.distance,
+                max(session.column("distance"), default=0.0),
+            ),
+            "time": max(
+                session.time, max(session.column("time"), default=0.0)
+            ),
+            "avgpower": sum(power) / strokes if strokes else 0.0,
+            "maxpower": max(power, default=0),
+            "avgspm": sum(spm) / strokes if strokes else 0.0,
+        }
+        del power, spm
+
+    return summary
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class SessionCatalog(object):
+    """
+    sqlite3 index of session summaries at path, created if missing.
+
+    :param str path: Database file, ":memory:" for a temporary one
+    :return: SessionCatalog Object
+    """
+
+    def __init__(self: object, path: str = CATALOG_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.row_factory = sqlite3.Row
+        columns = ", ".join(f"{name} {kind}" for name, kind in SUMMARY.items())
+        with self._db:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS sessions ({columns})"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_started"
+                " ON sessions (started)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_serial"
+                " ON sessions (serial, started)"
+            )
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def __len__(self: object) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self: object):
+        self._db.close()
+
+    def add(self: object, path: str) -> dict:
+        """
+        Summarizes the session file at path into the catalog, replacing
+        any earlier summary of it. Returns the summary.
+        """
+        summary = summarize(path)
+        self.insert(summary)
+
+        return summary
+
+    def insert(self: object, summary: dict):
+        """
+        Adds or replaces a summary, keyed by its path.
+        """
+        placeholders = ", ".join(f":{name}" for name in FIELDS)
+        with self._db:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO sessions VALUES ({placeholders})",
+                summary,
+            )
+
+    def remove(self: object, path: str):
+        with self._db:
+            self._db.execute(
+                "DELETE FROM sessions WHERE path = ?",
+                (os.path.abspath(path),),
+            )
+
+    def __where(
+        self: object,
+        serial: str,
+        since: float,
+        until: float,
+        distance: float,
+    ) -> tuple:
+        """
+        Returns the WHERE clause and parameters of the common filters.
+        """
+        clauses = []
+        parameters = []
+        if serial is not None:
+            clauses.append("serial = ?")
+            parameters.append(serial)
+        if since is not None:
+            clauses.append("started >= ?")
+            parameters.append(since)
+        if until is not None:
+            clauses.append("started < ?")
+            parameters.append(until)
+        if distance is not None:
+            clauses.append("distance BETWEEN ? AND ?")
+            parameters.append(distance * (1 - DISTANCE_TOLERANCE))
+            parameters.append(distance * (1 + DISTANCE_TOLERANCE))
+
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+        return where, parameters
+
+    def sessions(
+        self: object,
+        serial: str = None,
+        since: float = None,
+        until: float = None,
+        distance: float = None,
+    ) -> list:
+        """
+        Returns the summaries, oldest first, of the sessions on erg
+        serial that started from since until until, time.time() values,
+        and with the given distance, to within DISTANCE_TOLERANCE. None
+        leaves a filter out.
+        """
+        where, parameters = self.__where(serial, since, until, distance)
+        rows = self._db.execute(
+            f"SELECT * FROM sessions{where} ORDER BY started", parameters
+        )
+
+        return [dict(row) for row in rows]
+
+    def top(
+        self: object,
+        metric: str,
+        number: int = 10,
+        serial: str = None,
+        since: float = None,
+        until: float = None,
+        distance: float = None,
+    ) -> list:
+        """
+        Returns the number best summaries by metric, one of RANKED, best
+        first; the lowest time is best, the highest of anything else.
+        Filters as sessions().
+        """
+        if metric not in RANKED:
+            raise ValueError(f"Cannot rank sessions by {metric}")
+        order = "ASC" if RANKED[metric] else "DESC"
+        where, parameters = self.__where(serial, since, until, distance)
+        rows = self._db.execute(
+            f"SELECT * FROM sessions{where}"
+            f" ORDER BY {metric} {order}, started LIMIT ?",
+            (*parameters, number),
+        )
+
+        return [dict(row) for row in rows]
+
+    def aggregate(
+        self: object,
+        serial: str = None,
+        since: float = None,
+        until: float = None,
+        distance: float = None,
+    ) -> dict:
+        """
+        Returns totals over the sessions sessions() would return:
+            sessions, strokes, distance, time, avgpower, maxpower, first,
+            last
+        avgpower is the mean of the session averages, first and last
+        are when the earliest and latest sessions started.
+        """
+        where, parameters = self.__where(serial, since, until, distance)
+        row = self._db.execute(
+            "SELECT COUNT(*), TOTAL(strokes), TOTAL(distance), TOTAL(time),"
+            " AVG(avgpower), MAX(maxpower), MIN(started), MAX(started)"
+            f" FROM sessions{where}",
+            parameters,
+        ).fetchone()
+
+        return {
+            "sessions": row[0],
+            "strokes": int(row[1]),
+            "distance": row[2],
+            "time": row[3],
+            "avgpower": row[4] or 0.0,
+            "maxpower": row[5] or 0,
+            "first": row[6],
+            "last": row[7],
+        }
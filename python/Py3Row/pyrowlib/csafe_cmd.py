@@ -4,8 +4,15 @@ Description:
 # -----------------------------------------------------------------------------
 #                               Safe Imports
 # -----------------------------------------------------------------------------
+# Standard
+from functools import lru_cache, reduce
+from operator import xor
+from struct import Struct
+from typing import NamedTuple
+
 # local
 from . import csafe_dic
+from . import csafe_struct
 
 
 def __int2bytes(numbytes: int, integer: int) -> list:
@@ -24,27 +31,101 @@ def __int2bytes(numbytes: int, integer: int) -> list:
         return byte
 
 
-def __bytes2int(raw_bytes):
-    num_bytes = len(raw_bytes)
-    integer = 0
+class CompiledFrame(NamedTuple):
+    """
+    Immutable, ready to write CSAFE frame.
 
-    for k in range(num_bytes):
-        integer = (raw_bytes[k] << (8 * k)) | integer
+    :param bytes frame: Report ID, framed message and padding
+    :param int maxresponse: Max possible length of the response in bytes
+    :param tuple commands: Command list the frame was compiled from
+    :param ResponseParser parser: Fused response parser, None if the
+        response has a variable length
+    """
 
-    return integer
+    frame: bytes
+    maxresponse: int
+    commands: tuple
+    parser: object = None
 
 
-def __bytes2ascii(raw_bytes):
-    word = ""
-    for letter in raw_bytes:
-        word += chr(letter)
+def encode(arguments: list) -> list:
+    """
+    Encode message.
+    """
+    return __encode(arguments)[0]
 
-    return word
 
+def compile(arguments: list) -> CompiledFrame:
+    """
+    Compile message into an immutable frame. Frames are cached by
+    command list, repeated queries are only encoded once.
+    """
+    return __compile(tuple(arguments))
 
-def encode(arguments: list) -> list:
+
+@lru_cache(maxsize=128)
+def __compile(arguments: tuple) -> CompiledFrame:
+    message, maxresponse = __encode(arguments)
+
+    return CompiledFrame(
+        bytes(message),
+        maxresponse,
+        arguments,
+        csafe_struct.compile_parser(arguments),
+    )
+
+
+def plan(arguments: list) -> tuple:
     """
-    Encode message.
+    Packs a command list of any length into the fewest frames whose
+    message and expected response both fit in a report. Commands keep
+    their order, a run of wrapped commands that is split is re-wrapped
+    in each frame. Returns a tuple of CompiledFrames to send in order.
+    """
+    return __plan(tuple(arguments))
+
+
+@lru_cache(maxsize=32)
+def __plan(arguments: tuple) -> tuple:
+    frames = []
+    current = ()
+    i = 0
+
+    while i < len(arguments):
+        # a command and its arguments are never split
+        numargs = len(csafe_dic.cmds[arguments[i]][1])
+        command = arguments[i : i + 1 + numargs]
+        i += 1 + numargs
+
+        if __fits(current + command):
+            current = current + command
+            continue
+        if not current or not __fits(command):
+            raise Exception(f"Command does not fit in a frame: {command}")
+        frames.append(__compile(current))
+        current = command
+
+    if current:
+        frames.append(__compile(current))
+
+    return tuple(frames)
+
+
+def __fits(arguments: tuple) -> bool:
+    """
+    Checks the message and max possible response fit in a report.
+    """
+    try:
+        message, maxresponse = __encode(arguments)
+    except (Exception, UserWarning):
+        return False
+
+    return maxresponse <= 121
+
+
+def __encode(arguments: list) -> tuple:
+    """
+    Returns the encoded message and its max possible response length.
     """
 
     # priming variables
@@ -102,7 +183,9 @@ def encode(arguments: list) -> list:
         # max message length
         cmdid = cmdprop[0] | (wrapper << 8)
         # double return to account for stuffing
-        maxresponse += abs(sum(csafe_dic.resp[cmdid][1])) * 2 + 1
+        maxresponse += (
+            abs(sum(csafe_dic.SCHEMA.responses[cmdid].fields)) * 2 + 1
+        )
 
         # add completed command to final message
         message.extend(command)
@@ -115,33 +198,12 @@ def encode(arguments: list) -> list:
         wrapped.insert(0, wrapper)  # wrapper command id
         message.extend(wrapped)  # adds wrapper to message
 
-    # prime variables
-    checksum = 0x0
-    j = 0
-
-    # checksum and byte stuffing
-    while j < len(message):
-        # calculate checksum
-        checksum = checksum ^ message[j]
-
-        # byte stuffing
-        if 0xF0 <= message[j] <= 0xF3:
-            message.insert(j, csafe_dic.Byte_Stuffing_Flag)
-            j += 1
-            message[j] = message[j] & 0x3
-
-        j += 1
-
-    # add checksum to end of message
-    message.append(checksum)
-
-    # start & stop frames
-    message.insert(0, csafe_dic.Standard_Frame_Start_Flag)
-    message.append(csafe_dic.Stop_Frame_Flag)
+    # checksum, byte stuffing and start & stop flags
+    message = list(frame(message))
 
     # check for frame size (96 bytes)
     if len(message) > 96:
-        raise Exception("Message is too long: " + len(message))
+        raise Exception(f"Message is too long: {len(message)}")
 
     # report IDs
     maxmessage = max(len(message) + 1, maxresponse)
@@ -166,143 +228,219 @@ def encode(arguments: list) -> list:
         )
         message = []
 
-    return message
+    return message, maxresponse
 
 
-def __verify_message(message: list) -> list:
-    # prime variables
-    i = 0
-    checksum = 0
+def frame(message) -> bytes:
+    """
+    Frames a message, the bytes between the flags: appends the checksum,
+    byte stuffs and adds the standard start and stop flags.
+    """
+    checksum = reduce(xor, message, 0)
+    framed = bytearray([csafe_dic.Standard_Frame_Start_Flag])
+
+    for byte in bytes(message) + bytes([checksum]):
+        if 0xF0 <= byte <= 0xF3:
+            framed.append(csafe_dic.Byte_Stuffing_Flag)
+            byte &= 0x3
+        framed.append(byte)
+    framed.append(csafe_dic.Stop_Frame_Flag)
+
+    return bytes(framed)
+
 
+def unframe(frame) -> bytes:
+    """
+    Returns the message in a frame that starts at the start flag, the
+    inverse of frame(). Raises ValueError for invalid frames.
+    """
+    return bytes(__unframe(__view(frame)))
+
+
+def __unframe(view: memoryview) -> memoryview:
+    """
+    Unstuffs the frame, starting at the start flag, into a single message
+    buffer and verifies the checksum. Returns a view of the message
+    without the checksum.
+    """
+    startflag = view[0]
+
+    if startflag == csafe_dic.Extended_Frame_Start_Flag:
+        # destination = view[1]
+        # source = view[2]
+        j = 3
+    elif startflag == csafe_dic.Standard_Frame_Start_Flag:
+        j = 1
+    else:
+        raise ValueError("No Start Flag found.")
+
+    # single copy into the message buffer, the stop flag and byte
+    # stuffing flag are unique so both can be searched for directly
+    message = bytearray(view[j:])
+    end = message.find(csafe_dic.Stop_Frame_Flag)
+    if end < 0:
+        raise ValueError("No Stop Flag found.")
+
+    # byte unstuffing in place, w is where the next byte is written,
+    # the unstuffed runs between flags are moved down a slice at a time
+    i = message.find(csafe_dic.Byte_Stuffing_Flag, 0, end)
+    if i >= 0:
+        w = i
+        while i >= 0:
+            message[w] = 0xF0 | message[i + 1]
+            w += 1
+            start = i + 2
+            i = message.find(csafe_dic.Byte_Stuffing_Flag, start, end)
+            stop = end if i < 0 else i
+            message[w : w + stop - start] = message[start:stop]
+            w += stop - start
+        end = w
+
+    message = memoryview(message)[:end]
+
+    # checks checksum
+    if reduce(xor, message, 0) != 0:
+        raise ValueError("Checksum error")
+
+    # remove checksum from end of message
+    return message[:-1]
+
+
+# Precompiled formats for the common field widths.
+__FIELDS = {
+    1: Struct("<B").unpack_from,
+    2: Struct("<H").unpack_from,
+    4: Struct("<I").unpack_from,
+}
+
+
+def __view(transmission) -> memoryview:
+    """
+    Byte view of any buffer protocol object or list of byte values.
+    """
     try:
-        # checksum and unstuff
-        while i < len(message):
-            # byte unstuffing
-            if message[i] == csafe_dic.Byte_Stuffing_Flag:
-                stuffvalue = message.pop(i + 1)
-                message[i] = 0xF0 | stuffvalue
+        view = memoryview(transmission)
+    except TypeError:
+        view = memoryview(bytes(transmission))
+    if view.format != "B":
+        view = view.cast("B")
 
-            # calculate checksum
-            checksum = checksum ^ message[i]
+    return view
 
-            i = i + 1
 
-        # checks checksum
-        if checksum != 0:
-            message = []
-            raise ValueError("Checksum error")
+def parse(frame, parser: object = None) -> dict:
+    """
+    Decode a single frame that starts at the start flag, as found by
+    csafe_stream. Raises ValueError or KeyError for invalid frames.
+    """
+    message = __unframe(__view(frame))
 
-        # remove checksum from  end of message
-        del message[-1]
-    except Exception as err:
-        print(str(err))
-    finally:
-        return message
+    if parser is not None:
+        response = parser(message)
+        if response is not None:
+            return response
 
+    response = {}
+    __parse(message, response)
 
-def decode(transmission: list) -> list:
+    return response
+
+
+def decode(transmission: list, parser: object = None) -> list:
     """
-    Decode recieved messages.
+    Decode recieved messages. Accepts any buffer protocol object,
+    a list of byte values is also accepted. The optional parser from
+    csafe_struct is tried first, its fallback is the generic decoder.
     """
 
-    # prime variables
-    message = []
-    stopfound = False
     response = None
 
     try:
         # reportid = transmission[0]
-        startflag = transmission[1]
-
-        if startflag == csafe_dic.Extended_Frame_Start_Flag:
-            # destination = transmission[2]
-            # source = transmission[3]
-            j = 4
-        elif startflag == csafe_dic.Standard_Frame_Start_Flag:
-            j = 2
-        else:
-            message = []
-            raise ValueError("No Start Flag found.")
-
-        while j < len(transmission):
-            if transmission[j] == csafe_dic.Stop_Frame_Flag:
-                stopfound = True
-                break
-            message.append(transmission[j])
-            j += 1
-
-        if not stopfound:
-            message = []
-            raise ValueError("No Stop Flag found.")
-
-        message = __verify_message(message)
-        status = message.pop(0)
-
-        # prime variables
-        response = {
-            "CSAFE_GETSTATUS_CMD": [
-                status,
-            ]
-        }
-        k = 0
-        wrapend = -1
-        wrapper = 0x0
-
-        # loop through complete frames
-        while k < len(message):
-            result = []
-
-            # get command name
-            msgcmd = message[k]
-            if k <= wrapend:
-                msgcmd = wrapper | msgcmd  # check if still in wrapper
-            msgprop = csafe_dic.resp[msgcmd]
-            k = k + 1
-
-            # get data byte count
-            bytecount = message[k]
-            k = k + 1
-
-            # if wrapper command then gets command in wrapper
-            if msgprop[0] == "CSAFE_SETUSERCFG1_CMD":
-                wrapper = message[k - 2] << 8
-                wrapend = k + bytecount - 1
-                if bytecount:  # If wrapper length != 0
-                    msgcmd = wrapper | message[k]
-                    msgprop = csafe_dic.resp[msgcmd]
-                    k = k + 1
-                    bytecount = message[k]
-                    k = k + 1
-
-            # special case for capability code, response lengths differ based off capability code
-            if msgprop[0] == "CSAFE_GETCAPS_CMD":
-                msgprop[1] = [
-                    1,
-                ] * bytecount
-
-            # special case for get id, response length is variable
-            if msgprop[0] == "CSAFE_GETID_CMD":
-                msgprop[1] = [
-                    (-bytecount),
-                ]
-
-            # checking that the recieved data byte is the expected length, sanity check
-            if abs(sum(msgprop[1])) != 0 and bytecount != abs(sum(msgprop[1])):
-                raise ValueError("Warning: bytecount is an unexpected length")
-
-            # extract values
-            for numbytes in msgprop[1]:
-                raw_bytes = message[k : k + abs(numbytes)]
-                value = (
-                    __bytes2int(raw_bytes)
-                    if numbytes >= 0
-                    else __bytes2ascii(raw_bytes)
-                )
-                result.append(value)
-                k = k + abs(numbytes)
+        message = __unframe(__view(transmission)[1:])
+
+        if parser is not None:
+            response = parser(message)
+            if response is not None:
+                return response
 
-            response[msgprop[0]] = result
+        response = {}
+        __parse(message, response)
     except Exception as err:
         print(str(err))
     finally:
         return response
+
+
+def __parse(message: memoryview, response: dict):
+    """
+    Generic decoder, adds the values of each command in message to
+    response.
+    """
+    # prime variables
+    response["CSAFE_GETSTATUS_CMD"] = [
+        message[0],
+    ]
+    k = 1
+    wrapend = -1
+    wrapper = 0x0
+    responses = csafe_dic.SCHEMA.responses
+    wrappers = csafe_dic.SCHEMA.wrappers
+    unpack = __FIELDS
+
+    # loop through complete frames
+    while k < len(message):
+        result = []
+
+        # get command id
+        msgcmd = message[k]
+        if k <= wrapend:
+            msgcmd = wrapper | msgcmd  # check if still in wrapper
+        k = k + 1
+
+        # get data byte count
+        bytecount = message[k]
+        k = k + 1
+
+        # if wrapper command then gets command in wrapper
+        if msgcmd <= 0xFF and wrappers[msgcmd]:
+            wrapper = msgcmd << 8
+            wrapend = k + bytecount - 1
+            if bytecount:  # If wrapper length != 0
+                msgcmd = wrapper | message[k]
+                k = k + 1
+                bytecount = message[k]
+                k = k + 1
+
+        msgprop = responses[msgcmd]
+        if msgprop is None:
+            raise KeyError(f"Unknown response {msgcmd:#x}")
+
+        fields = msgprop[1]
+        # special case for capability code, response lengths differ based off capability code
+        if msgprop[0] == "CSAFE_GETCAPS_CMD":
+            fields = (1,) * bytecount
+
+        # special case for get id, response length is variable
+        if msgprop[0] == "CSAFE_GETID_CMD":
+            fields = (-bytecount,)
+
+        # checking that the recieved data byte is the expected length, sanity check
+        if abs(sum(fields)) != 0 and bytecount != abs(sum(fields)):
+            raise ValueError("Warning: bytecount is an unexpected length")
+
+        # extract values
+        for numbytes in fields:
+            if numbytes < 0:
+                result.append(str(message[k : k - numbytes], "latin-1"))
+                k = k - numbytes
+                continue
+            if numbytes in unpack:
+                result.append(unpack[numbytes](message, k)[0])
+            else:
+                result.append(
+                    int.from_bytes(message[k : k + numbytes], "little")
+                )
+            k = k + numbytes
+
+        response[msgprop[0]] = result
@@ -6,6 +6,8 @@ Description:
 # -----------------------------------------------------------------------------
 # Standard
 from enum import IntEnum
+from types import MappingProxyType
+from typing import NamedTuple
 
 # Third party
 
@@ -141,8 +143,9 @@ cmds["CSAFE_PM_GET_HW_ADDRESS"] = [0x82, [], CSAFE_GETPMCFG_CMD]
 cmds["CSAFE_PM_GET_TICK_TIMEBASE"] = [0x83, [], CSAFE_GETPMCFG_CMD]
 cmds["CSAFE_PM_GET_HRM"] = [0x84, [], CSAFE_GETPMCFG_CMD]
 cmds["CSAFE_PM_GET_DATETIME"] = [0x85, [], CSAFE_GETPMCFG_CMD]
-cmds["CSAFE_PM_GET_WORKOUTTYPE"] = [0x89, [], CSAFE_GETPMCFG_CMD]
-cmds["CSAFE_PM_GET_WORKOUTSTATE"] = [0x8D, [], CSAFE_GETPMCFG_CMD]
+# CSAFE_PM_GET_WORKOUTTYPE (0x89) and CSAFE_PM_GET_WORKOUTSTATE (0x8D) are
+# also available in this wrapper, the names are kept for the
+# CSAFE_SETUSERCFG1_CMD versions which have response layouts.
 cmds["CSAFE_PM_GET_OPERATIONALSTATE"] = [0x8F, [], CSAFE_GETPMCFG_CMD]
 
 # resp[0xCmd_Id] = [COMMAND_NAME, [Bytes, ...]]
@@ -406,6 +409,104 @@ resp[0x1A6C] = [
     [1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2],
 ]  # Bytes read, data ...
 
+# -----------------------------------------------------------------------------
+#                           Frozen schema
+# -----------------------------------------------------------------------------
+class Command(NamedTuple):
+    """
+    :param int id: Command id
+    :param tuple args: Byte count of each argument
+    """
+
+    id: int
+    args: tuple
+
+
+class WrappedCommand(NamedTuple):
+    """
+    Command sent inside a command wrapper.
+
+    :param int id: Command id
+    :param tuple args: Byte count of each argument
+    :param int wrapper: Wrapper command id
+    """
+
+    id: int
+    args: tuple
+    wrapper: int
+
+
+class Response(NamedTuple):
+    """
+    :param str name: Command name
+    :param tuple fields: Byte count of each field, negative for ASCII
+    """
+
+    name: str
+    fields: tuple
+
+
+class Schema(NamedTuple):
+    """
+    Immutable command schema, safe to share between ergs, threads and
+    processes without locking. Nothing in it is modified after import.
+
+    :param MappingProxyType cmds: Read only cmds, values are Commands
+    :param MappingProxyType resp: Read only resp, values are Responses
+    :param tuple responses: 65536 Responses (or None) indexed by
+        (wrapper << 8) | command id
+    :param tuple wrappers: 256 flags indexed by command id, True for
+        command wrappers
+    """
+
+    cmds: MappingProxyType
+    resp: MappingProxyType
+    responses: tuple
+    wrappers: tuple
+
+    def __reduce__(self):
+        # pickled by reference, every process builds its own on import
+        return "SCHEMA"
+
+
+def __freeze(commands: dict, responses: dict) -> Schema:
+    frozencmds = {}
+    for name, cmdprop in commands.items():
+        if len(cmdprop) == 3:
+            frozencmds[name] = WrappedCommand(
+                cmdprop[0], tuple(cmdprop[1]), cmdprop[2]
+            )
+        else:
+            frozencmds[name] = Command(cmdprop[0], tuple(cmdprop[1]))
+
+    frozenresp = {
+        cmdid: Response(msgprop[0], tuple(msgprop[1]))
+        for cmdid, msgprop in responses.items()
+    }
+    wrapperids = {
+        cmdprop[2] for cmdprop in commands.values() if len(cmdprop) == 3
+    }
+
+    responses = [None] * 0x10000
+    for cmdid, msgprop in frozenresp.items():
+        responses[cmdid] = msgprop
+    wrappers = [False] * 0x100
+    for cmdid in wrapperids:
+        wrappers[cmdid] = True
+
+    return Schema(
+        MappingProxyType(frozencmds),
+        MappingProxyType(frozenresp),
+        tuple(responses),
+        tuple(wrappers),
+    )
+
+
+SCHEMA = __freeze(cmds, resp)
+cmds = SCHEMA.cmds
+resp = SCHEMA.resp
+
+
 # -----------------------------------------------------------------------------
 #                           State ENUMS
 # -----------------------------------------------------------------------------
@@ -0,0 +1,118 @@
+"""
+Description:
+    Incremental CSAFE frame decoder for USB reads that do not line up
+    with frames; a frame split over several reads, several frames in one
+    read or junk (report IDs, padding, partial frames) between frames.
+"""
+# -----------------------------------------------------------------------------
+#                               Safe Imports
+# -----------------------------------------------------------------------------
+# local
+from . import csafe_cmd
+from . import csafe_dic
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Largest frame that fits in a report, anything longer is discarded.
+MAX_FRAME = 121
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class CsafeStreamDecoder(object):
+    """
+    Stateful decoder fed with arbitrary chunks of the byte stream from
+    the erg. Bytes before a start flag are skipped, a frame is decoded as
+    soon as its stop flag arrives and frames with a bad checksum are
+    dropped.
+
+    :param ResponseParser parser: Default fused parser, see csafe_struct
+    :return: CsafeStreamDecoder Object
+    """
+
+    def __init__(self: object, parser: object = None):
+        self.parser = parser
+        self._buffer = bytearray()
+        # Bytes skipped looking for a start flag
+        self.skipped = 0
+        # Frames dropped for a bad checksum, bad layout or overrun
+        self.errors = 0
+        # Frames decoded
+        self.frames = 0
+
+    def __len__(self: object) -> int:
+        """
+        Number of bytes buffered waiting for the rest of a frame.
+        """
+        return len(self._buffer)
+
+    def __start(self: object, begin: int) -> int:
+        """
+        Returns the index of the first start flag at or after begin.
+        """
+        buffer = self._buffer
+        extended = buffer.find(csafe_dic.Extended_Frame_Start_Flag, begin)
+        standard = buffer.find(csafe_dic.Standard_Frame_Start_Flag, begin)
+        if extended < 0 or 0 <= standard < extended:
+            return standard
+
+        return extended
+
+    def reset(self: object):
+        """
+        Discards any partially received frame.
+        """
+        self.skipped += len(self._buffer)
+        self._buffer.clear()
+
+    def feed(self: object, chunk, parser: object = None) -> list:
+        """
+        Adds chunk, any buffer protocol object or list of byte values,
+        to the stream. Returns the responses of the frames completed by
+        it, oldest first.
+        """
+        if parser is None:
+            parser = self.parser
+
+        buffer = self._buffer
+        buffer += bytes(chunk) if isinstance(chunk, list) else chunk
+        responses = []
+
+        while buffer:
+            # Skip junk before the start flag
+            start = self.__start(0)
+            if start < 0:
+                self.skipped += len(buffer)
+                buffer.clear()
+                break
+            if start > 0:
+                self.skipped += start
+                del buffer[:start]
+
+            stop = buffer.find(csafe_dic.Stop_Frame_Flag, 1)
+            # A start flag before the stop flag means the frame was cut
+            # short, resync on the new start flag.
+            restart = self.__start(1)
+            if 0 < restart and (stop < 0 or restart < stop):
+                self.errors += 1
+                self.skipped += restart
+                del buffer[:restart]
+                continue
+
+            if stop < 0:
+                if len(buffer) > MAX_FRAME:
+                    self.errors += 1
+                    self.reset()
+                break
+
+            frame = bytes(buffer[: stop + 1])
+            del buffer[: stop + 1]
+            try:
+                responses.append(csafe_cmd.parse(frame, parser))
+                self.frames += 1
+            except (ValueError, KeyError, IndexError):
+                self.errors += 1
+
+        return responses
@@ -0,0 +1,198 @@
+"""
+Description:
+    Compiles the csafe_dic response layouts into precompiled struct
+    formats. A ResponseParser fuses the layouts of a whole command list
+    so the response unpacks with a single unpack_from call, responses
+    that do not match the expected layout are left to csafe_cmd.decode.
+"""
+# -----------------------------------------------------------------------------
+#                               Safe Imports
+# -----------------------------------------------------------------------------
+# Standard
+from operator import itemgetter
+from struct import Struct
+
+# local
+from . import csafe_dic
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Response length depends on the request, these have no fixed layout.
+VARIABLE = ("CSAFE_GETCAPS_CMD", "CSAFE_GETID_CMD")
+
+# Native little endian integer widths, anything else is unpacked as bytes.
+INTEGER = {1: "B", 2: "H", 4: "I"}
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def _field_format(numbytes: int) -> str:
+    """
+    Struct code for a single response field, negative numbytes for ASCII.
+    """
+    if numbytes in INTEGER:
+        return INTEGER[numbytes]
+
+    return f"{abs(numbytes)}s"
+
+
+def _field_convert(numbytes: int):
+    """
+    Converter for fields that are not unpacked as native integers.
+    """
+    if numbytes in INTEGER:
+        return None
+    if numbytes < 0:
+        return lambda raw: str(raw, "latin-1")
+
+    return lambda raw: int.from_bytes(raw, "little")
+
+
+def _response_struct(msgprop: tuple) -> Struct:
+    if msgprop.name in VARIABLE:
+        return None
+
+    return Struct("<" + "".join(_field_format(f) for f in msgprop.fields))
+
+
+def response_struct(cmdid: int) -> Struct:
+    """
+    Returns the precompiled struct for the data fields of the response
+    to cmdid, cmdid is (wrapper << 8) | command id.
+    """
+    layout = STRUCTS[cmdid]
+    if layout is None:
+        msgprop = csafe_dic.SCHEMA.responses[cmdid]
+        if msgprop is None:
+            raise KeyError(f"Unknown response {cmdid:#x}")
+        raise ValueError(f"{msgprop.name} has a variable length response")
+
+    return layout
+
+
+def compile_parser(commands: tuple) -> object:
+    """
+    Returns a ResponseParser for the command list or None when the
+    response has a variable length layout.
+    """
+    try:
+        return ResponseParser(commands)
+    except (KeyError, ValueError):
+        return None
+
+
+# Precompiled data field structs, indexed the same as SCHEMA.responses.
+STRUCTS = [None] * len(csafe_dic.SCHEMA.responses)
+for _cmdid, _msgprop in csafe_dic.SCHEMA.resp.items():
+    STRUCTS[_cmdid] = _response_struct(_msgprop)
+STRUCTS = tuple(STRUCTS)
+del _cmdid, _msgprop
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class ResponseParser(object):
+    """
+    Fused parser for the response to a command list.
+
+    The expected response is laid out the same way csafe_cmd.encode lays
+    out the request; status byte then [id, byte count, data] for each
+    command, with PM commands nested in their wrapper. Ids and byte counts
+    are unpacked with the data and checked against the expected values.
+
+    :param tuple commands: Command list as passed to csafe_cmd.encode
+    :raises KeyError: Unknown command or response
+    :raises ValueError: Variable length response in command list
+    """
+
+    def __init__(self: object, commands: tuple):
+        # struct format, expected header values and the result slices
+        fmt = ["<B"]
+        headers = []
+        results = []
+        # number of values unpacked so far
+        count = 1
+        # index of the open wrapper byte count in headers
+        wrapcount = None
+        wrapper = 0
+
+        i = 0
+        while i < len(commands):
+            cmdprop = csafe_dic.cmds[commands[i]]
+            # skip over the arguments of Long Commands
+            i += 1 + len(cmdprop[1])
+
+            # closes wrapper if required
+            if wrapper and (len(cmdprop) < 3 or cmdprop[2] != wrapper):
+                wrapper = 0
+
+            # create wrapper
+            if len(cmdprop) == 3 and cmdprop[2] != wrapper:
+                wrapper = cmdprop[2]
+                fmt.append("BB")
+                headers.append((count, wrapper))
+                wrapcount = len(headers)
+                headers.append((count + 1, 0))
+                count += 2
+
+            cmdid = (wrapper << 8) | cmdprop[0]
+            layout = response_struct(cmdid)
+            name, fields = csafe_dic.SCHEMA.responses[cmdid]
+            datalen = layout.size
+
+            fmt.append("BB")
+            fmt.append(layout.format[1:])
+            headers.append((count, cmdprop[0]))
+            headers.append((count + 1, datalen))
+            count += 2
+
+            # the wrapper byte count covers the nested id & byte count
+            if wrapper:
+                index, value = headers[wrapcount]
+                headers[wrapcount] = (index, value + datalen + 2)
+
+            converters = tuple(_field_convert(f) for f in fields)
+            if not any(converters):
+                converters = None
+            results.append((name, count, count + len(fields), converters))
+            count += len(fields)
+
+        self.commands = commands
+        self.struct = Struct("".join(fmt))
+        self.size = self.struct.size
+        self._results = tuple(results)
+
+        indexes = tuple(index for index, _ in headers)
+        self._headers = tuple(value for _, value in headers)
+        self._getheaders = (
+            itemgetter(*indexes) if len(indexes) > 1 else
+            lambda values: tuple(values[index] for index in indexes)
+        )
+
+    def __call__(self: object, message: memoryview) -> dict:
+        """
+        Unpacks an unstuffed message, without checksum. Returns the
+        response dictionary or None if the message does not match the
+        expected layout.
+        """
+        if len(message) != self.size:
+            return None
+
+        values = self.struct.unpack_from(message)
+        if self._getheaders(values) != self._headers:
+            return None
+
+        response = {"CSAFE_GETSTATUS_CMD": [values[0]]}
+        for name, start, stop, converters in self._results:
+            if converters is None:
+                response[name] = list(values[start:stop])
+            else:
+                response[name] = [
+                    value if convert is None else convert(value)
+                    for convert, value in zip(converters, values[start:stop])
+                ]
+
+        return response
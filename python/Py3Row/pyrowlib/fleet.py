@@ -0,0 +1,167 @@
+"""
+Description:
+    Polls several ergs at once. ErgFleet runs an ErgPoller per erg, each
+    on its own thread and pacing its own frame gap, so the refresh rate
+    does not drop with the number of ergs, and merges their samples into
+    time aligned frames keyed by erg serial number.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from bisect import bisect_right
+from operator import attrgetter
+from threading import Event
+from typing import NamedTuple
+import time
+
+# Local packages
+from pyrowlib import pyrow
+from pyrowlib.poller import ErgPoller, POLL_RATE, RING_SIZE
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class FleetFrame(NamedTuple):
+    """
+    :param float timestamp: time.monotonic() the frame is aligned to
+    :param dict samples: serial: newest ErgSample at or before timestamp,
+        ergs without one yet are left out
+    """
+
+    timestamp: float
+    samples: dict
+
+
+class ErgFleet(object):
+    """
+    Polls every erg in ergs from its own thread.
+
+    :param list ergs: Connected PyRow objects
+    :param float rate: Polls per second for each erg
+    :param int size: Number of samples kept for each erg
+    :param PollPolicy policy: Sets each erg's poll interval, replaces
+        rate
+    :return: ErgFleet Object
+    """
+
+    def __init__(
+        self: object,
+        ergs: list,
+        rate: float = POLL_RATE,
+        size: int = RING_SIZE,
+        policy: object = None,
+    ):
+        self.pollers = {}
+        for erg in ergs:
+            serial = erg.get_erg()["serial"]
+            self.pollers[serial] = ErgPoller(erg, rate, size, policy)
+        self._stop = Event()
+
+    @classmethod
+    def open(
+        cls: type,
+        rate: float = POLL_RATE,
+        size: int = RING_SIZE,
+        policy: object = None,
+    ):
+        """
+        Connects to every erg pyrow.find() returns, ergs that fail to open
+        are reported and skipped.
+        """
+        ergs = []
+        for device in pyrow.find():
+            try:
+                ergs.append(pyrow.PyRow(device))
+            except Exception as err:
+                print(f"Skipping {device}: {err}")
+
+        return cls(ergs, rate, size, policy)
+
+    def __enter__(self: object) -> object:
+        self.start()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.stop()
+
+    def __len__(self: object) -> int:
+        return len(self.pollers)
+
+    @property
+    def serials(self: object) -> list:
+        return list(self.pollers)
+
+    def start(self: object):
+        self._stop.clear()
+        for poller in self.pollers.values():
+            poller.start()
+
+    def stop(self: object):
+        self._stop.set()
+        for poller in self.pollers.values():
+            poller.stop()
+
+    def errors(self: object) -> dict:
+        """
+        Returns serial: exception for the ergs whose poller stopped on an
+        error.
+        """
+        return {
+            serial: poller.error
+            for serial, poller in self.pollers.items()
+            if poller.error is not None
+        }
+
+    def latest(self: object) -> FleetFrame:
+        """
+        Returns the newest sample of every erg.
+        """
+        samples = {}
+        for serial, poller in self.pollers.items():
+            sample = poller.latest()
+            if sample is not None:
+                samples[serial] = sample
+
+        return FleetFrame(time.monotonic(), samples)
+
+    def at(self: object, timestamp: float) -> FleetFrame:
+        """
+        Returns the newest sample of every erg at or before timestamp.
+        """
+        key = attrgetter("timestamp")
+        samples = {}
+        for serial, poller in self.pollers.items():
+            sample = poller.latest()
+            if sample is None:
+                continue
+            if sample.timestamp > timestamp:
+                # Only search the ring when it moved on since timestamp
+                history = poller.snapshot()
+                index = bisect_right(history, timestamp, key=key)
+                if index == 0:
+                    continue
+                sample = history[index - 1]
+            samples[serial] = sample
+
+        return FleetFrame(timestamp, samples)
+
+    def stream(self: object, rate: float = POLL_RATE, delay: float = 0.0):
+        """
+        Yields a FleetFrame rate times a second until stopped. Frames
+        are aligned delay seconds in the past, which gives samples still
+        in flight time to arrive.
+        """
+        period = 1.0 / rate
+        deadline = time.monotonic()
+
+        while not self._stop.is_set():
+            yield self.at(deadline - delay)
+
+            deadline += period
+            wait = deadline - time.monotonic()
+            if wait < 0:
+                deadline = time.monotonic()
+            else:
+                self._stop.wait(wait)
@@ -0,0 +1,167 @@
+"""
+Description:
+    Force curve capture. The PM samples the handle force every 15.625 ms
+    (64 Hz) from the catch to the end of the drive and hands the samples
+    out 16 at a time. ForceCapture follows the stroke state machine from
+    combined CSAFE_PM_GET_STROKESTATE + CSAFE_PM_GET_FORCEPLOTDATA
+    responses, one frame per poll, and reports how many points were
+    captured for each stroke against the number the drive time implies.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from typing import NamedTuple
+
+# Local packages
+from pyrowlib import csafe_dic
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+FORCE_RATE = 64.0  # force samples per second during the drive
+
+StrokeState = csafe_dic.STROKE_STATE
+DRIVE_STATES = (
+    StrokeState.DRIVING_STATE,
+    StrokeState.DWELLING_AFTER_DRIVE_STATE,
+)
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class StrokeForce(NamedTuple):
+    """
+    :param list force: Force curve of the stroke
+    :param float drivetime: Seconds from the first driving response to
+        the first response after the drive, to within a poll interval
+    :param int expected: Points the PM should have sampled in drivetime
+    """
+
+    force: list
+    drivetime: float
+    expected: int
+
+    @property
+    def captured(self: object) -> int:
+        return len(self.force)
+
+
+class ForceCapture(object):
+    """
+    Stroke state machine for force curves. feed() takes the stroke state
+    and force points of each response and returns a StrokeForce when the
+    drive ends in recovery, a drive that ends any other way is dropped.
+    A stroke starts at a driving response that follows one outside the
+    drive, so a drive already under way when the capture starts, or is
+    reset, is skipped: its drive time, and the points expected from it,
+    would come out short.
+    With analyzer set, a StrokeAnalyzer, each stroke is analyzed before
+    feed() returns it.
+
+    :return: ForceCapture Object
+    """
+
+    def __init__(self: object):
+        self.last = None
+        self.analyzer = None
+        # The last response was outside the drive, the next is a catch
+        self._ready = False
+        self.reset()
+        self.reset_stats()
+
+    @property
+    def active(self: object) -> bool:
+        """
+        True from the first driving response until the stroke completes.
+        """
+        return self._start is not None
+
+    @property
+    def pending(self: object) -> list:
+        """
+        Points captured so far for the stroke in progress.
+        """
+        return list(self._force)
+
+    def reset(self: object):
+        """
+        Drops the stroke in progress.
+        """
+        self._force = []
+        self._start = None
+        self._end = None
+
+    def reset_stats(self: object):
+        self._strokes = 0
+        self._captured = 0
+        self._expected = 0
+        self._dropped = 0
+
+    def feed(
+        self: object, strokestate: int, points: list, timestamp: float
+    ) -> StrokeForce:
+        """
+        Adds a response, timestamp is time.monotonic() when it arrived.
+        Returns the StrokeForce of a completed stroke, otherwise None.
+        """
+        if strokestate in DRIVE_STATES:
+            if self._start is None:
+                if not self._ready:
+                    # Joined mid drive, wait for the next catch
+                    return None
+                self._start = timestamp
+            self._ready = False
+            if self._end is None and (
+                strokestate == StrokeState.DWELLING_AFTER_DRIVE_STATE
+            ):
+                self._end = timestamp
+            self._force.extend(points)
+            return None
+
+        self._ready = True
+        if self._start is None:
+            return None
+
+        if strokestate != StrokeState.RECOVERY_STATE:
+            # Wheel stopped before the drive finished
+            self._dropped += 1
+            self.reset()
+            return None
+
+        # Last points of the drive come with the first recovery response
+        self._force.extend(points)
+        if self._end is None:
+            self._end = timestamp
+        drivetime = self._end - self._start
+        stroke = StrokeForce(
+            self._force, drivetime, round(drivetime * FORCE_RATE)
+        )
+        self.reset()
+
+        self.last = stroke
+        if self.analyzer is not None:
+            self.analyzer.analyze(stroke)
+        self._strokes += 1
+        self._captured += stroke.captured
+        self._expected += stroke.expected
+
+        return stroke
+
+    def stats(self: object) -> dict:
+        """
+        Returns capture statistics:
+            strokes, captured, expected, ratio, dropped
+        ratio is captured / expected points over all strokes, dropped
+        counts the drives that did not end in recovery.
+        """
+        return {
+            "strokes": self._strokes,
+            "captured": self._captured,
+            "expected": self._expected,
+            "ratio": (
+                self._captured / self._expected if self._expected else 0.0
+            ),
+            "dropped": self._dropped,
+        }
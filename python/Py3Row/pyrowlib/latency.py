@@ -0,0 +1,237 @@
+"""
+Description:
+    Per frame latency instrumentation for PyRow.send. Each stage of a
+    frame exchange (frame gap wait, encode, write, read wait, decode) is
+    recorded in nanoseconds in an HDR style log linear histogram, so
+    recording is a few integer operations and percentiles stay within
+    1% at any scale. Histograms are kept per command set signature.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from time import perf_counter_ns
+import sys
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Stages of a frame exchange, in order
+STAGES = ("gap", "encode", "write", "read", "decode")
+
+# Values below 2**SUB_BITS ns get a bucket each, above that every power
+# of two is split into 2**(SUB_BITS - 1) buckets
+SUB_BITS = 7
+SUB_COUNT = 1 << SUB_BITS
+HALF_COUNT = SUB_COUNT >> 1
+# Buckets up to 2**40 ns, about 18 minutes, larger values are clamped
+BUCKETS = SUB_COUNT + (40 - SUB_BITS) * HALF_COUNT
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def signature(commands: tuple) -> str:
+    """
+    Short name of a command list: the command names without the CSAFE_
+    prefix and _CMD suffix, arguments left out.
+    """
+    names = []
+    for command in commands:
+        if isinstance(command, str):
+            name = command.removeprefix("CSAFE_").removesuffix("_CMD")
+            names.append(name)
+
+    return "+".join(names)
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class LatencyHistogram(object):
+    """
+    Log linear histogram of durations in ns.
+
+    :return: LatencyHistogram Object
+    """
+
+    def __init__(self: object):
+        self.reset()
+
+    def reset(self: object):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        """
+        Bucket of value ns.
+        """
+        if value < SUB_COUNT:
+            return max(0, value)
+
+        shift = value.bit_length() - SUB_BITS
+        index = SUB_COUNT + (shift - 1) * HALF_COUNT
+        index += (value >> shift) - HALF_COUNT
+
+        return min(index, BUCKETS - 1)
+
+    @staticmethod
+    def upper(index: int) -> int:
+        """
+        Largest value ns that falls in bucket index.
+        """
+        if index < SUB_COUNT:
+            return index
+
+        shift, offset = divmod(index - SUB_COUNT, HALF_COUNT)
+        shift += 1
+
+        return ((HALF_COUNT + offset + 1) << shift) - 1
+
+    def record(self: object, value: int):
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def merge(self: object, other: object):
+        """
+        Adds the values recorded in other.
+        """
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(
+                self.min, other.min
+            )
+
+    def percentile(self: object, percent: float) -> int:
+        """
+        Returns the value ns at or below which percent of the values
+        are, to within the bucket width.
+        """
+        if not self.count:
+            return 0
+
+        rank = max(1, round(self.count * percent / 100.0))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper(index), self.max)
+
+        return self.max
+
+    def summary(self: object) -> dict:
+        """
+        Returns count and, in seconds, mean, min, p50, p90, p99, max.
+        """
+        count = self.count
+
+        return {
+            "count": count,
+            "mean": self.total / count / 1e9 if count else 0.0,
+            "min": (self.min or 0) / 1e9,
+            "p50": self.percentile(50) / 1e9,
+            "p90": self.percentile(90) / 1e9,
+            "p99": self.percentile(99) / 1e9,
+            "max": self.max / 1e9,
+        }
+
+
+class LatencyStats(object):
+    """
+    Stage histograms for each command set sent. With interval set the
+    statistics are printed to file every interval seconds.
+
+    :param float interval: Seconds between dumps, None for no dumps
+    :param file file: Where dumps are printed, default sys.stdout
+    :return: LatencyStats Object
+    """
+
+    def __init__(self: object, interval: float = None, file: object = None):
+        self.interval = interval
+        self.file = file
+        # signature: {stage: LatencyHistogram}, arguments are left out of
+        # the key so the table stays as small as the set of commands used
+        self._histograms = {}
+        self._lastdump = perf_counter_ns()
+
+    def reset(self: object):
+        self._histograms.clear()
+
+    def record(
+        self: object,
+        commands: tuple,
+        gap: int,
+        encode: int,
+        write: int,
+        read: int,
+        decode: int,
+    ):
+        """
+        Records the stage times, ns, of one exchange of commands. The
+        same commands sent with different arguments share histograms.
+        """
+        name = signature(commands)
+        histograms = self._histograms.get(name)
+        if histograms is None:
+            histograms = {stage: LatencyHistogram() for stage in STAGES}
+            self._histograms[name] = histograms
+        histograms["gap"].record(gap)
+        histograms["encode"].record(encode)
+        histograms["write"].record(write)
+        histograms["read"].record(read)
+        histograms["decode"].record(decode)
+
+        if self.interval is not None:
+            now = perf_counter_ns()
+            if now - self._lastdump >= self.interval * 1e9:
+                self._lastdump = now
+                self.dump()
+
+    def stats(self: object) -> dict:
+        """
+        Returns {signature: {stage: summary}}, see
+        LatencyHistogram.summary.
+        """
+        return {
+            name: {
+                stage: histogram.summary()
+                for stage, histogram in stages.items()
+            }
+            for name, stages in self._histograms.items()
+        }
+
+    def dump(self: object):
+        """
+        Prints the statistics as a table in ms.
+        """
+        file = self.file or sys.stdout
+        print(
+            f"{'stage':<8}{'count':>8}{'mean':>9}{'p50':>9}{'p90':>9}"
+            f"{'p99':>9}{'max':>9}",
+            file=file,
+        )
+        for name, stages in self.stats().items():
+            print(name, file=file)
+            for stage, summary in stages.items():
+                print(
+                    f"{stage:<8}{summary['count']:>8}"
+                    + "".join(
+                        f"{summary[key] * 1e3:>9.3f}"
+                        for key in ("mean", "p50", "p90", "p99", "max")
+                    ),
+                    file=file,
+                )
+        file.flush()
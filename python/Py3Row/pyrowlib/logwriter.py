@@ -0,0 +1,223 @@
+"""
+Description:
+    Writes session strokes on a background thread, so a slow disk, such
+    as the SD card of a Raspberry Pi, does not hold up polling the erg.
+    The acquisition loop hands each stroke to a bounded queue without
+    blocking; the writer thread drains it in batches into a
+    SessionWriter and flushes and fsyncs the file every interval
+    seconds. When the queue is full the stroke is dropped and counted.
+    close() writes and syncs everything queued.
+
+Example:
+    with BackgroundWriter(SessionWriter("workout.c2ss")) as logger:
+        logger.put(erg.get_sample(), force)
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+import time
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Strokes queued before new ones are dropped, about 15 minutes of rowing
+QUEUE_SIZE = 1024
+# Seconds between fsyncs
+SYNC_INTERVAL = 5.0
+
+# Queue entry that stops the writer thread
+_STOP = object()
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class BackgroundWriter(object):
+    """
+    Feeds writer, a SessionWriter, from a queue on its own thread. The
+    writer is closed by close().
+
+    :param SessionWriter writer: Session file the strokes go to
+    :param int size: Strokes queued before new ones are dropped
+    :param float interval: Seconds between flush and fsync
+    :return: BackgroundWriter Object
+    """
+
+    def __init__(
+        self: object,
+        writer: object,
+        size: int = QUEUE_SIZE,
+        interval: float = SYNC_INTERVAL,
+    ):
+        self.writer = writer
+        self.interval = interval
+        self.queue = Queue(size)
+        # Exception that stopped writing, if any
+        self.error = None
+
+        self._written = 0
+        self._dropped = 0
+        self._batches = 0
+        self._syncs = 0
+        self._maxbatch = 0
+        # _STOP has been queued
+        self._stopping = False
+        self._thread = Thread(
+            target=self._run, name="BackgroundWriter", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    @property
+    def running(self: object) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def put(
+        self: object, sample: object, force: list = (), timestamp: float = None
+    ) -> bool:
+        """
+        Queues a stroke for writer.append without blocking. Returns
+        False if the queue was full and the stroke was dropped.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        try:
+            self.queue.put_nowait((sample, force, timestamp))
+        except Full:
+            self._dropped += 1
+            return False
+
+        return True
+
+    def flush(self: object, timeout: float = None) -> bool:
+        """
+        Waits until the strokes queued so far are written and synced.
+        Returns False on timeout, including waiting for room in a full
+        queue, or if the writer has stopped.
+        """
+        if not self.running or self._stopping:
+            return False
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        done = Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except Full:
+            return False
+        if timeout is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+
+        return done.wait(timeout)
+
+    def close(self: object, timeout: float = None) -> bool:
+        """
+        Writes the queued strokes, syncs and closes the writer. Returns
+        False on timeout, close can be called again to keep waiting.
+        """
+        if self._thread is None:
+            return True
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        if not self._stopping:
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except Full:
+                return False
+            self._stopping = True
+        if timeout is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return False
+        self._thread = None
+
+        return True
+
+    def _run(self: object):
+        queue = self.queue
+        nextsync = time.monotonic() + self.interval
+        stop = False
+
+        while not stop:
+            try:
+                entries = [queue.get(timeout=self.interval)]
+            except Empty:
+                entries = []
+            # Take the rest of the queue as one batch
+            while True:
+                try:
+                    entries.append(queue.get_nowait())
+                except Empty:
+                    break
+            self._maxbatch = max(self._maxbatch, len(entries))
+
+            flushed = []
+            for entry in entries:
+                if entry is _STOP:
+                    stop = True
+                elif isinstance(entry, Event):
+                    flushed.append(entry)
+                else:
+                    self.__append(entry)
+            if entries:
+                self._batches += 1
+
+            if stop or flushed or time.monotonic() >= nextsync:
+                self.__sync()
+                nextsync = time.monotonic() + self.interval
+            for done in flushed:
+                done.set()
+
+        try:
+            self.writer.close()
+        except Exception as err:
+            # Keep the first error
+            if self.error is None:
+                self.error = err
+
+    def __append(self: object, entry: tuple):
+        if self.error is not None:
+            self._dropped += 1
+            return
+        try:
+            self.writer.append(*entry)
+        except Exception as err:
+            self.error = err
+            self._dropped += 1
+            return
+        self._written += 1
+
+    def __sync(self: object):
+        if self.error is not None:
+            return
+        try:
+            self.writer.sync()
+        except Exception as err:
+            self.error = err
+            return
+        self._syncs += 1
+
+    def stats(self: object) -> dict:
+        """
+        Returns writer statistics:
+            queued, maxbatch, written, dropped, batches, syncs
+        queued is the current queue depth, maxbatch the largest batch
+        drained at once; dropped counts strokes lost to a full queue or
+        a write error.
+        """
+        return {
+            "queued": self.queue.qsize(),
+            "maxbatch": self._maxbatch,
+            "written": self._written,
+            "dropped": self._dropped,
+            "batches": self._batches,
+            "syncs": self._syncs,
+        }
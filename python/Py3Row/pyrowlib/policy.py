@@ -0,0 +1,103 @@
+"""
+Description:
+    Polling policies for ErgPoller. A policy picks the interval to the
+    next poll from the latest sample and whether a poll should also read
+    force plot data. PollPolicy polls at a fixed rate, AdaptivePolicy
+    follows the stroke and workout state: as fast as the frame gap
+    allows during the drive, around 1 Hz when nobody is rowing.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Local packages
+from pyrowlib import csafe_dic
+from pyrowlib.forcecapture import DRIVE_STATES
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Poll intervals in seconds
+IDLE_INTERVAL = 1.0
+ACTIVE_INTERVAL = 0.1
+
+StrokeState = csafe_dic.STROKE_STATE
+WorkoutState = csafe_dic.WORKOUT_STATE
+# Workout states where no one is rowing
+IDLE_WORKOUT_STATES = (
+    WorkoutState.WAITTOBEGIN,
+    WorkoutState.WORKOUTEND,
+    WorkoutState.TERMINATE,
+    WorkoutState.WORKOUTLOGGED,
+    WorkoutState.REARM,
+)
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class PollPolicy(object):
+    """
+    Polls at a fixed rate, force plot data is only read in the drive.
+
+    :param float rate: Polls per second
+    :return: PollPolicy Object
+    """
+
+    def __init__(self: object, rate: float):
+        self.rate = rate
+
+    def interval(self: object, sample: object) -> float:
+        """
+        Returns the seconds from the poll of sample, None before the
+        first poll, to the next poll.
+        """
+        return 1.0 / self.rate
+
+    def force(self: object, sample: object, capturing: bool) -> bool:
+        """
+        Returns True if the poll of sample should read force plot data,
+        capturing is True while a stroke's force curve is incomplete.
+        Recovery is skipped once the first recovery response completed
+        the curve.
+        """
+        return capturing or sample.monitor["strokestate"] in DRIVE_STATES
+
+
+class AdaptivePolicy(PollPolicy):
+    """
+    Follows the rower: polls at the frame gap limit in the drive, every
+    active seconds during the rest of the stroke and every idle seconds
+    while the flywheel is stopped or the workout is not running. The
+    workout state is read from sample.monitor["workoutstate"] if there.
+
+    :param float active: Poll interval in recovery, seconds
+    :param float idle: Poll interval when idle, seconds
+    :return: AdaptivePolicy Object
+    """
+
+    def __init__(
+        self: object,
+        active: float = ACTIVE_INTERVAL,
+        idle: float = IDLE_INTERVAL,
+    ):
+        super().__init__(1.0 / active)
+        self.active = active
+        self.idle = idle
+
+    def interval(self: object, sample: object) -> float:
+        if sample is None:
+            return 0.0
+
+        monitor = sample.monitor
+        strokestate = monitor["strokestate"]
+        if strokestate in DRIVE_STATES:
+            # The frame gap scheduler sets the pace
+            return 0.0
+        if (
+            strokestate
+            == StrokeState.WAITING_FOR_WHEEL_TO_REACH_MIN_SPEED_STATE
+            or monitor.get("workoutstate") in IDLE_WORKOUT_STATES
+        ):
+            return self.idle
+
+        return self.active
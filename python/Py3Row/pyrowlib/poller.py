@@ -0,0 +1,288 @@
+"""
+Description:
+    Background polling of an erg. ErgPoller owns the PyRow connection on
+    a dedicated thread and publishes timestamped samples into a fixed
+    size ring buffer, so render and logging loops read the latest data
+    without waiting on USB. With reconnect set, USB errors do not stop
+    the poller: it reconnects while latest() returns the last sample
+    marked stale.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from collections import deque
+from threading import Event, Thread
+from traceback import print_exc
+from typing import NamedTuple
+import time
+
+# Local packages
+from pyrowlib.policy import PollPolicy
+from pyrowlib.reconnect import ERRORS, Reconnector
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Default poll rate in Hz, the frame gap caps the real rate.
+POLL_RATE = 20.0
+RING_SIZE = 1024
+# Polls averaged for the effective rate
+RATE_WINDOW = 16
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class ErgSample(NamedTuple):
+    """
+    :param int seq: Sample number, from 0
+    :param float timestamp: time.monotonic() when the response arrived
+    :param dict monitor: PyRow.get_monitor(strokestate=True) values
+    :param bool stale: The erg has been lost since, the values are the
+        last known
+    """
+
+    seq: int
+    timestamp: float
+    monitor: dict
+    stale: bool = False
+
+
+class SampleRing(object):
+    """
+    Fixed size ring buffer for a single writer and any number of readers.
+
+    The writer stores a sample in its slot before advancing the count, so
+    readers never see a slot that is being written. One slot more than
+    size is kept for the sample being stored, which has overwritten its
+    slot before the count says so. Readers copy without locking; slots
+    the writer laps during the copy are dropped from the result.
+
+    :param int size: Number of samples kept
+    :return: SampleRing Object
+    """
+
+    def __init__(self: object, size: int = RING_SIZE):
+        if size < 1:
+            raise ValueError(f"Ring size {size} is too small")
+        # The spare slot is the one the writer may be storing into
+        self._slots = [None] * (size + 1)
+        self._length = size + 1
+        self._size = size
+        # Total number of samples appended
+        self._count = 0
+
+    def __len__(self: object) -> int:
+        return min(self._count, self._size)
+
+    @property
+    def count(self: object) -> int:
+        return self._count
+
+    def append(self: object, sample: object):
+        """
+        Adds sample, overwriting the oldest once full. Writer only.
+        """
+        self._slots[self._count % self._length] = sample
+        self._count += 1
+
+    def latest(self: object) -> object:
+        """
+        Returns the newest sample, None if empty.
+        """
+        count = self._count
+        if count == 0:
+            return None
+
+        return self._slots[(count - 1) % self._length]
+
+    def since(self: object, count: int) -> tuple:
+        """
+        Returns (samples, count) for the samples appended after count, as
+        returned by a previous call, oldest first. Samples overwritten
+        before they were read are skipped.
+        """
+        end = self._count
+        start = max(count, end - self._size)
+        length = self._length
+        samples = [self._slots[i % length] for i in range(start, end)]
+
+        # Drop any slots the writer reused while copying, including the
+        # one it may be storing into before advancing the count
+        lapped = self._count + 1 - length - start
+        if lapped > 0:
+            samples = samples[lapped:]
+
+        return samples, end
+
+    def snapshot(self: object, number: int = None) -> list:
+        """
+        Returns up to number of the newest samples, oldest first.
+        """
+        end = self._count
+        if number is None or number > self._size:
+            number = self._size
+
+        return self.since(max(0, end - number))[0]
+
+
+class ErgPoller(object):
+    """
+    Polls an erg from a dedicated thread. Only the poller thread uses the
+    erg once started, other threads read the ring or subscribe.
+
+    Sample callbacks are called as callback(sample), stroke callbacks as
+    callback(previous, sample) when the stroke state changes. Callbacks
+    run on the poller thread and should return quickly.
+
+    :param PyRow erg: Connected erg
+    :param float rate: Polls per second
+    :param int size: Number of samples kept in the ring
+    :param PollPolicy policy: Sets the poll interval, replaces rate, see
+        policy.AdaptivePolicy
+    :param bool reconnect: Reconnect after USB errors, see
+        reconnect.Reconnector, rather than stop
+    :return: ErgPoller Object
+    """
+
+    def __init__(
+        self: object,
+        erg: object,
+        rate: float = POLL_RATE,
+        size: int = RING_SIZE,
+        policy: object = None,
+        reconnect: bool = False,
+    ):
+        self.erg = erg
+        self.rate = rate
+        self.policy = policy if policy is not None else PollPolicy(rate)
+        self.reconnector = Reconnector(erg) if reconnect else None
+        self.ring = SampleRing(size)
+        # Timestamps of the latest polls
+        self._polled = deque(maxlen=RATE_WINDOW)
+        # Exception that stopped the poller, if any
+        self.error = None
+
+        self._subscribers = []
+        self._stroke_subscribers = []
+        self._stop = Event()
+        self._thread = None
+
+    def __enter__(self: object) -> object:
+        self.start()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.stop()
+
+    @property
+    def running(self: object) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def subscribe(self: object, callback: object):
+        """
+        Calls callback(sample) for every new sample.
+        """
+        self._subscribers.append(callback)
+
+    def on_stroke(self: object, callback: object):
+        """
+        Calls callback(previous, sample) on stroke state transitions.
+        """
+        self._stroke_subscribers.append(callback)
+
+    @property
+    def effective_rate(self: object) -> float:
+        """
+        Polls per second over the last RATE_WINDOW polls.
+        """
+        polled = tuple(self._polled)
+        if len(polled) < 2 or polled[-1] == polled[0]:
+            return 0.0
+
+        return (len(polled) - 1) / (polled[-1] - polled[0])
+
+    @property
+    def stale(self: object) -> bool:
+        """
+        True while the erg is lost and being reconnected.
+        """
+        return self.reconnector is not None and self.reconnector.down
+
+    def latest(self: object) -> ErgSample:
+        sample = self.ring.latest()
+        if sample is not None and self.stale:
+            sample = sample._replace(stale=True)
+
+        return sample
+
+    def snapshot(self: object, number: int = None) -> list:
+        return self.ring.snapshot(number)
+
+    def start(self: object):
+        if self.running:
+            return
+        self._stop.clear()
+        self.error = None
+        self._thread = Thread(target=self._run, name="ErgPoller", daemon=True)
+        self._thread.start()
+
+    def stop(self: object, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def poll(self: object) -> ErgSample:
+        """
+        Reads one sample and publishes it. Called by the poller thread.
+        """
+        monitor = self.erg.get_monitor(strokestate=True)
+        sample = ErgSample(self.ring.count, time.monotonic(), monitor)
+        previous = self.ring.latest()
+        self.ring.append(sample)
+        self._polled.append(sample.timestamp)
+
+        self.__notify(self._subscribers, sample)
+        if previous is None or (
+            previous.monitor["strokestate"] != monitor["strokestate"]
+        ):
+            self.__notify(self._stroke_subscribers, previous, sample)
+
+        return sample
+
+    def __notify(self: object, callbacks: list, *args):
+        for callback in callbacks:
+            try:
+                callback(*args)
+            except Exception:
+                print_exc()
+
+    def _run(self: object):
+        deadline = time.monotonic()
+
+        while not self._stop.is_set():
+            try:
+                sample = self.poll()
+            except ERRORS as err:
+                if self.reconnector is None:
+                    self.error = err
+                    break
+                print(f"Lost erg: {err}")
+                if not self.reconnector.recover(self._stop):
+                    break
+                deadline = time.monotonic()
+                continue
+            except Exception as err:
+                self.error = err
+                break
+
+            # Deadline based so the rate does not drift with USB latency
+            deadline += self.policy.interval(sample)
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                # Running behind, do not try to catch up
+                deadline = time.monotonic()
+            else:
+                self._stop.wait(delay)
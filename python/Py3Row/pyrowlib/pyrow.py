@@ -7,8 +7,10 @@ Description:
 #                               Imports
 # -----------------------------------------------------------------------------
 # Standard
+from time import perf_counter_ns
 from traceback import format_exc
 import datetime
+import os
 import time
 import sys
 
@@ -18,7 +20,15 @@ import usb.util
 from usb import USBError
 
 # Local packages
+from pyrowlib import capture
 from pyrowlib import csafe_cmd
+from pyrowlib import csafe_stream
+from pyrowlib.forcecapture import ForceCapture
+from pyrowlib.latency import LatencyStats
+from pyrowlib.sample import MonitorSample
+from pyrowlib.scheduler import FrameGapScheduler
+from pyrowlib.strokemetrics import STROKE_WINDOW, StrokeAnalyzer
+from pyrowlib.units import calhr_to_watts, pace_to_watts, watts_to_calhr
 
 # -----------------------------------------------------------------------------
 #                           Global definitions
@@ -30,12 +40,26 @@ __version__ = "$Name: Release 0.1.0 $"[7:-2]
 C2_VENDOR_ID = 0x17A4
 MIN_FRAME_GAP = 0.050  # in seconds
 INTERFACE = 0
+WORKOUT_TTL = 1.0  # in seconds, get_workout cache lifetime
+STATUS_READY = 1  # status nibble of a PM with no workout in use
 
 
 # -----------------------------------------------------------------------------
 #                           Function definitions
 # -----------------------------------------------------------------------------
 def find() -> iter:
+    """
+    Returns the connected ergs. With PYROW_REPLAY set to a capture file
+    the capture is returned in their place, played at the speed in
+    PYROW_REPLAY_SPEED (default 1.0, 0 for as fast as possible). With
+    PYROW_RECORD set to a path the ergs' transfers are recorded there,
+    the second erg to path.1 and so on.
+    """
+    replay = os.environ.get("PYROW_REPLAY")
+    if replay:
+        speed = float(os.environ.get("PYROW_REPLAY_SPEED", 1.0))
+        return iter([capture.ReplayErg(replay, speed or None)])
+
     try:
         ergs = usb.core.find(find_all=True, idVendor=C2_VENDOR_ID)
         if ergs is None:
@@ -44,6 +68,12 @@ def find() -> iter:
         print(str(err))
         raise Exception
     finally:
+        record = os.environ.get("PYROW_RECORD")
+        if record and ergs is not None:
+            ergs = (
+                capture.RecordingErg(erg, f"{record}.{n}" if n else record)
+                for n, erg in enumerate(ergs)
+            )
         return ergs
 
 
@@ -51,10 +81,86 @@ def find() -> iter:
 #                           Classes
 # -----------------------------------------------------------------------------
 class PyRow(object):
+    # Precompiled frames for the built-in queries.
+    MONITOR_CMD = csafe_cmd.compile(
+        [
+            "CSAFE_PM_GET_WORKTIME",
+            "CSAFE_PM_GET_WORKDISTANCE",
+            "CSAFE_GETCADENCE_CMD",
+            "CSAFE_GETPOWER_CMD",
+            "CSAFE_GETPACE_CMD",
+            "CSAFE_GETCALORIES_CMD",
+            "CSAFE_GETHRCUR_CMD",
+        ]
+    )
+    MONITOR_STROKE_CMD = csafe_cmd.compile(
+        list(MONITOR_CMD.commands)
+        + ["CSAFE_PM_GET_STROKESTATE", "CSAFE_PM_GET_WORKOUTSTATE"]
+    )
+    # Stroke state and force plot in one frame
+    FORCEPLOT_CMD = csafe_cmd.compile(
+        ["CSAFE_PM_GET_STROKESTATE", "CSAFE_PM_GET_FORCEPLOTDATA", 32]
+    )
+    WORKOUT_CMD = csafe_cmd.compile(
+        [
+            "CSAFE_GETID_CMD",
+            "CSAFE_PM_GET_WORKOUTTYPE",
+            "CSAFE_PM_GET_WORKOUTSTATE",
+            "CSAFE_PM_GET_INTERVALTYPE",
+            "CSAFE_PM_GET_WORKOUTINTERVALCOUNT",
+        ]
+    )
+    ERG_CMD = csafe_cmd.compile(
+        [
+            "CSAFE_GETVERSION_CMD",
+            "CSAFE_GETSERIAL_CMD",
+            "CSAFE_GETCAPS_CMD",
+            0x00,
+        ]
+    )
+    STATUS_CMD = csafe_cmd.compile(
+        [
+            "CSAFE_PM_GET_STROKESTATE",
+            "CSAFE_GETSTATUS_CMD",
+        ]
+    )
+    RESET_CMD = csafe_cmd.compile(["CSAFE_RESET_CMD"])
+
     def __init__(self: object, erg: object):
         """
         Configures usb connection and sets erg value
         """
+        self.__claim(erg)
+
+        # Paces frames to the erg's min interframe gap
+        self.scheduler = FrameGapScheduler(MIN_FRAME_GAP)
+        # Reassembles responses from the USB reads
+        self.__stream = csafe_stream.CsafeStreamDecoder()
+        # Collects force curves, self.forcecapture.last is the newest
+        self.forcecapture = ForceCapture()
+
+        # Cached get_erg and get_workout results, see clear_cache
+        self.workout_ttl = WORKOUT_TTL
+        self.__ergdata = None
+        self.__workoutdata = None
+        self.__workouttime = 0.0
+        # Status nibble of the last response
+        self.__status = None
+        # Last workout set with set_workout, restored by reconnect
+        self.__workoutcommand = None
+        # Frame latency histograms, None when not instrumented
+        self.latency = None
+
+        # Use the min interframe gap the PM reports
+        try:
+            self.get_erg()
+        except Exception as err:
+            print(f"Using default frame gap: {err}")
+
+    def __claim(self: object, erg: object):
+        """
+        Claims the interface of erg and finds its endpoints
+        """
 
         if sys.platform != "win32":
             try:
@@ -86,15 +192,75 @@ class PyRow(object):
         self.inEndpoint = iface[0].bEndpointAddress
         self.outEndpoint = iface[1].bEndpointAddress
 
-        self.__lastsend = datetime.datetime.now()
-        # Collect forcedata
-        self.__forcedata = {}
+    def reconnect(self: object, erg: object = None, serial: str = None):
+        """
+        Claims erg, a device from find(), or the current device again
+        after a USB error and drops any partial response and cached
+        data. Raises ValueError if serial is given and erg has another
+        serial number, the current device is then kept and erg released.
+        If the PM lost the workout set with set_workout, it came back
+        ready after being in use, the workout is set again. Returns True
+        if the workout was restored.
+        """
+        if erg is None:
+            erg = self.erg
+        previous = (self.erg, self.inEndpoint, self.outEndpoint)
+        status = self.__status
+        gap = self.scheduler.gap
+
+        self.__stream = csafe_stream.CsafeStreamDecoder()
+        self.forcecapture.reset()
+        self.clear_cache()
+        try:
+            self.__claim(erg)
+            ergdata = self.get_erg()
+            if serial is not None and ergdata["serial"] != serial:
+                raise ValueError(
+                    f"Found erg {ergdata['serial']} not {serial}"
+                )
+        except Exception:
+            if erg is not previous[0]:
+                # Back to the device it had, as it was
+                self.__release(erg)
+                self.erg, self.inEndpoint, self.outEndpoint = previous
+                self.__status = status
+                self.scheduler.gap = gap
+                self.clear_cache()
+            raise
+        if erg is not previous[0]:
+            self.__release(previous[0])
+
+        if (
+            self.__workoutcommand is not None
+            and status not in (None, STATUS_READY)
+            and ergdata["status"] == STATUS_READY
+        ):
+            self.send(self.RESET_CMD)
+            self.send(self.__workoutcommand)
+            self.clear_cache()
+            return True
+
+        return False
+
+    def __release(self: object, erg: object):
+        """
+        Releases a device no longer used, closing its capture if it is
+        being recorded.
+        """
+        try:
+            usb.util.dispose_resources(erg)
+        except Exception:
+            pass
+        if isinstance(erg, capture.RecordingErg):
+            erg.close()
 
     def __enter__(self: object) -> object:
         return self
 
     def __exit__(self, *args, **kwargs):
         if self.erg is not None:
+            if isinstance(self.erg, capture.RecordingErg):
+                self.erg.close()
             del self.erg
 
     def __checkvalue(
@@ -117,70 +283,66 @@ class PyRow(object):
         finally:
             return isTrue
 
-    def get_monitor(self: object, forceplot: bool = False) -> dict:
+    def get_monitor(
+        self: object, forceplot: bool = False, strokestate: bool = False
+    ) -> dict:
         """
         Returns values from the monitor that relate to the current workout,
-        optionally returns force plot data and stroke state
+        optionally returns force plot data and stroke state, the stroke
+        and workout state are read in the same frame as the monitor values
         return monitor:
             time, distance, spm, power, pace, calhr, calories, heartrate,
-            forceplot, strokestate, state
+            forceplot, strokestate, workoutstate, state
         """
 
-        command = [
-            "CSAFE_PM_GET_WORKTIME",
-            "CSAFE_PM_GET_WORKDISTANCE",
-            "CSAFE_GETCADENCE_CMD",
-            "CSAFE_GETPOWER_CMD",
-            "CSAFE_GETPACE_CMD",
-            "CSAFE_GETCALORIES_CMD",
-            "CSAFE_GETHRCUR_CMD",
-        ]
+        monitor = self.get_sample(strokestate)._asdict()
+        if not strokestate:
+            del monitor["strokestate"], monitor["workoutstate"]
+        if forceplot:
+            # Collect force plot data and stroke state
+            monitor["forceplot"] = self.get_forceplot_data()
+
+        return monitor
 
+    def get_sample(self: object, strokestate: bool = False) -> MonitorSample:
+        """
+        Returns the get_monitor values as a MonitorSample, without the
+        intermediate dictionary. The stroke and workout state are 0
+        unless strokestate is set.
+        """
+
+        command = self.MONITOR_STROKE_CMD if strokestate else self.MONITOR_CMD
         results = self.send(command)
         if 0 == len(results):
             raise Exception(f"Empty response from cmd={str(command)}")
 
-        monitor = {}
-        monitor["time"] = (
-            results["CSAFE_PM_GET_WORKTIME"][0]
-            + results["CSAFE_PM_GET_WORKTIME"][1]
-        ) / 100.0
-
-        monitor["distance"] = (
-            results["CSAFE_PM_GET_WORKDISTANCE"][0]
-            + results["CSAFE_PM_GET_WORKDISTANCE"][1]
-        ) / 10.0
-
-        monitor["spm"] = results["CSAFE_GETCADENCE_CMD"][0]
-        # Pace is seconds per 1000m
-        monitor["pace"] = results["CSAFE_GETPACE_CMD"][0] / 2
+        worktime = results["CSAFE_PM_GET_WORKTIME"]
+        workdistance = results["CSAFE_PM_GET_WORKDISTANCE"]
         # Rowing machine always returns power as Watts
-        monitor["power"] = results["CSAFE_GETPOWER_CMD"][0]
-        if monitor["power"]:
-            monitor["calhr"] = (
-                results["CSAFE_GETPOWER_CMD"][0] * (4.0 * 0.8604) + 300.0
-            )
-        else:
-            monitor["calhr"] = 0
-
-        monitor["calories"] = results["CSAFE_GETCALORIES_CMD"][0]
-        monitor["heartrate"] = results["CSAFE_GETHRCUR_CMD"][0]
-
-        if forceplot:
-            # Collect force plot data and stroke state
-            monitor["forceplot"] = self.get_forceplot_data()
-
-        monitor["status"] = results["CSAFE_GETSTATUS_CMD"][0] & 0xF
-
-        return monitor
+        power = results["CSAFE_GETPOWER_CMD"][0]
+
+        return MonitorSample(
+            (worktime[0] + worktime[1]) / 100.0,
+            (workdistance[0] + workdistance[1]) / 10.0,
+            results["CSAFE_GETCADENCE_CMD"][0],
+            # Pace is seconds per 1000m
+            results["CSAFE_GETPACE_CMD"][0] / 2,
+            power,
+            watts_to_calhr(power) if power else 0,
+            results["CSAFE_GETCALORIES_CMD"][0],
+            results["CSAFE_GETHRCUR_CMD"][0],
+            results["CSAFE_GETSTATUS_CMD"][0] & 0xF,
+            results["CSAFE_PM_GET_STROKESTATE"][0] if strokestate else 0,
+            results["CSAFE_PM_GET_WORKOUTSTATE"][0] if strokestate else 0,
+        )
 
     def get_force_plot(self: object) -> dict:
         """
-        Returns force plot data and stroke state
+        Returns force plot data and stroke state, read in one frame
         """
         forceplot = {}
         datapoints = 1
-        command = ["CSAFE_PM_GET_FORCEPLOTDATA", 32]
+        command = self.FORCEPLOT_CMD
 
         results = self.send(command)
         if 0 == len(results):
@@ -190,72 +352,59 @@ class PyRow(object):
         forceplot["forceplot"] = results["CSAFE_PM_GET_FORCEPLOTDATA"][
             1:datapoints
         ]
+        forceplot["strokestate"] = results["CSAFE_PM_GET_STROKESTATE"][0]
+        forceplot["status"] = results["CSAFE_GETSTATUS_CMD"][0] & 0xF
 
         return forceplot
 
-    def get_forceplot_data(self: object) -> dict:
+    def get_forceplot_data(self: object, timeout: float = 5.0) -> list:
         """
-        Returns cumlative forceplot data after polling successive calls to
-        get_force_plot.
+        Returns the force curve of the next complete stroke, polling
+        get_force_plot until the drive ends in recovery. Returns the
+        points read so far after timeout seconds. The capture report of
+        the stroke is in self.forcecapture.last.
         """
-        forceplot = {}
-        force = []
-        StrokeState = csafe_cmd.csafe_dic.STROKE_STATE
-        RowState = csafe_cmd.csafe_dic.ROWING_STATE
-
-        # Break out of loop after transitioning from Dwelling to Recovery
-        # or state machine is not active.
-        trans2recovery = False
-        # Timeout in 5 seconds
-        start = time.monotonic_ns() + (10**9 * 5)
-
-        while True:
-            resp = self.get_status()
-            # Use a hard timeout until access to the operational state machine
-            # can be used.
-            if time.monotonic_ns() >= start:
-                break
-            match resp["strokestate"]:
-                case StrokeState.WAITING_FOR_WHEEL_TO_REACH_MIN_SPEED_STATE:
-                    continue
-                case StrokeState.WAITING_FOR_WHEEL_TO_ACCELERATE_STATE:
-                    continue
-                case StrokeState.DRIVING_STATE:
-                    forceplot = self.get_force_plot()
-                    force.extend(forceplot["forceplot"])
-                    continue
-                case StrokeState.DWELLING_AFTER_DRIVE_STATE:
-                    trans2recovery = True
-                    forceplot = self.get_force_plot()
-                    force.extend(forceplot["forceplot"])
-                    continue
-                case StrokeState.RECOVERY_STATE:
-                    if trans2recovery is True:
-                        forceplot = self.get_force_plot()
-                        force.extend(forceplot["forceplot"])
-                        break
-                    else:
-                        continue
-                case _:
-                    raise ValueError(
-                        f'No match state found: {forceplot["strokestate"]}'
-                    )
+        capture = self.forcecapture
+        capture.reset()
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            forceplot = self.get_force_plot()
+            stroke = capture.feed(
+                forceplot["strokestate"],
+                forceplot["forceplot"],
+                time.monotonic(),
+            )
+            if stroke is not None:
+                return stroke.force
+
+        force = capture.pending
+        capture.reset()
 
         return force
 
-    def get_workout(self: object) -> dict:
+    def clear_cache(self: object):
         """
-        Returns overall workout data
+        Drops the cached get_erg and get_workout results. Done on reset,
+        set_workout and when the status changes.
         """
+        self.__ergdata = None
+        self.__workoutdata = None
 
-        command = [
-            "CSAFE_GETID_CMD",
-            "CSAFE_PM_GET_WORKOUTTYPE",
-            "CSAFE_PM_GET_WORKOUTSTATE",
-            "CSAFE_PM_GET_INTERVALTYPE",
-            "CSAFE_PM_GET_WORKOUTINTERVALCOUNT",
-        ]
+    def get_workout(self: object, refresh: bool = False) -> dict:
+        """
+        Returns overall workout data, cached for self.workout_ttl seconds
+        unless refresh is set
+        """
 
+        if (
+            not refresh
+            and self.__workoutdata is not None
+            and time.monotonic() - self.__workouttime < self.workout_ttl
+        ):
+            return dict(self.__workoutdata)
+
+        command = self.WORKOUT_CMD
         results = self.send(command)
         if 0 == len(results):
             raise Exception(f"Empty response from cmd={str(command)}")
@@ -271,19 +420,21 @@ class PyRow(object):
 
         workoutdata["status"] = results["CSAFE_GETSTATUS_CMD"][0] & 0xF
 
-        return workoutdata
+        self.__workoutdata = workoutdata
+        self.__workouttime = time.monotonic()
+
+        return dict(workoutdata)
 
-    def get_erg(self: object) -> dict:
+    def get_erg(self: object, refresh: bool = False) -> dict:
         """
-        Returns all erg data that is not related to the workout
+        Returns all erg data that is not related to the workout, cached
+        for the connection unless refresh is set
         """
 
-        command = [
-            "CSAFE_GETVERSION_CMD",
-            "CSAFE_GETSERIAL_CMD",
-            "CSAFE_GETCAPS_CMD",
-            0x00,
-        ]
+        if not refresh and self.__ergdata is not None:
+            return dict(self.__ergdata)
+
+        command = self.ERG_CMD
         results = self.send(command)
         if 0 == len(results):
             raise Exception(f"Empty response from cmd={str(command)}")
@@ -301,20 +452,25 @@ class PyRow(object):
         ergdata["maxrx"] = results["CSAFE_GETCAPS_CMD"][0]
         ergdata["maxtx"] = results["CSAFE_GETCAPS_CMD"][1]
         ergdata["mininterframe"] = results["CSAFE_GETCAPS_CMD"][2]
+        if ergdata["mininterframe"]:
+            # Taken as ms, the PM5 reports 50. Nothing confirms the unit,
+            # so the gap is never paced below the documented 50 ms floor
+            self.scheduler.gap = max(
+                MIN_FRAME_GAP, ergdata["mininterframe"] / 1000.0
+            )
 
         ergdata["status"] = results["CSAFE_GETSTATUS_CMD"][0] & 0xF
 
-        return ergdata
+        self.__ergdata = ergdata
+
+        return dict(ergdata)
 
     def get_status(self: object) -> int:
         """
         Returns the status of the erg
         """
 
-        command = [
-            "CSAFE_PM_GET_STROKESTATE",
-            "CSAFE_GETSTATUS_CMD",
-        ]
+        command = self.STATUS_CMD
         results = self.send(command)
         if 0 == len(results):
             raise Exception(f"Empty response from cmd={str(command)}")
@@ -356,7 +512,7 @@ class PyRow(object):
         workout and display the start workout screen
         """
 
-        self.send(["CSAFE_RESET_CMD"])
+        self.send(self.RESET_CMD)
         command = []
 
         # Set Workout Goal
@@ -427,9 +583,9 @@ class PyRow(object):
 
         # Set Pace
         if pace is not None:
-            powerpace = int(round(2.8 / ((pace / 500.0) ** 3)))
+            powerpace = int(round(pace_to_watts(pace)))
         elif calpace is not None:
-            powerpace = int(round((calpace - 300.0) / (4.0 * 0.8604)))
+            powerpace = int(round(calhr_to_watts(calpace)))
         if powerpace is not None:
             command.extend(["CSAFE_SETPOWER_CMD", powerpace, 88])  # 88 = watts
 
@@ -443,43 +599,140 @@ class PyRow(object):
         results = self.send(command)
         if 0 == len(results):
             raise Exception(f"Empty response from cmd={str(command)}")
+        self.__workoutcommand = command
+        self.clear_cache()
+
+        return results
+
+    def query(self: object, message: list) -> dict:
+        """
+        Sends a command list of any length, split over as few frames as
+        will fit (see csafe_cmd.plan), and returns the merged response.
+        Status is taken from the last frame.
+        """
+        results = {}
+        for frame in csafe_cmd.plan(message):
+            results.update(self.send(frame))
 
         return results
 
+    def instrument(
+        self: object,
+        enable: bool = True,
+        interval: float = None,
+        file: object = None,
+    ):
+        """
+        Starts, or with enable False stops, recording the time each
+        frame spends in the frame gap wait, encoding, the USB write, the
+        read wait and decoding. With interval set the statistics are
+        printed to file, default stdout, every interval seconds.
+        """
+        self.latency = LatencyStats(interval, file) if enable else None
+
+    def analyze_strokes(
+        self: object, enable: bool = True, window: int = STROKE_WINDOW
+    ) -> StrokeAnalyzer:
+        """
+        Starts, or with enable False stops, working out the metrics of
+        each force curve get_forceplot_data captures, with consistency
+        scores over the last window strokes. Returns the StrokeAnalyzer,
+        also in self.forcecapture.analyzer.
+        """
+        analyzer = StrokeAnalyzer(window) if enable else None
+        self.forcecapture.analyzer = analyzer
+
+        return analyzer
+
+    def stats(self: object) -> dict:
+        """
+        Returns the frame latency statistics since instrument() by
+        command set, empty when not instrumented:
+            {signature: {stage: {count, mean, min, p50, p90, p99, max}}}
+        stage is one of gap, encode, write, read, decode; times are in
+        seconds.
+        """
+        if self.latency is None:
+            return {}
+
+        return self.latency.stats()
+
+    def __checkstatus(self: object, response: dict):
+        """
+        Clears the cache when the status nibble of response changed
+        """
+        if "CSAFE_GETSTATUS_CMD" not in response:
+            return
+        status = response["CSAFE_GETSTATUS_CMD"][0] & 0xF
+        if status != self.__status:
+            if self.__status is not None:
+                self.clear_cache()
+            self.__status = status
+
     def send(self: object, message: list) -> dict:
         """
         Converts and sends message to erg; receives, converts
-        and returns response.
+        and returns response. The message is either a command list
+        or a frame from csafe_cmd.compile().
         """
 
-        # Checks that enough time has passed since the last message was sent,
-        # if not program sleeps till time has passed
-        now = datetime.datetime.now()
-        delta = now - self.__lastsend
-        deltaraw = delta.seconds + delta.microseconds / 1000000.0
-        if deltaraw < MIN_FRAME_GAP:
-            time.sleep(MIN_FRAME_GAP - deltaraw)
-
-        # convert message to byte array
-        csafe = csafe_cmd.encode(message)
+        latency = self.latency
+        # Waits until the frame gap since the last message has passed
+        waited = self.scheduler.wait()
+        if latency is not None:
+            start = perf_counter_ns()
+
+        # convert message to byte array unless already compiled
+        parser = None
+        if isinstance(message, csafe_cmd.CompiledFrame):
+            csafe = message.frame
+            parser = message.parser
+            commands = message.commands
+        else:
+            csafe = csafe_cmd.encode(message)
+            commands = message
+        if "CSAFE_RESET_CMD" in commands:
+            self.clear_cache()
+        if latency is not None:
+            encoded = perf_counter_ns()
         # sends message to erg and records length of message
         length = self.erg.write(self.outEndpoint, csafe, timeout=2000)
         # records time when message was sent
-        self.__lastsend = datetime.datetime.now()
-
-        response = {}
-        while not response:
-            try:
-                # recieves byte array from erg
-                transmission = self.erg.read(
-                    self.inEndpoint, length, timeout=2000
-                )
-                response = csafe_cmd.decode(transmission)
-            except Exception as e:
-                raise e
-                # Replace with error or let error trigger?
-                # No message was recieved back from erg
-                # return []
+        self.scheduler.sent()
+        if latency is not None:
+            mark = written = perf_counter_ns()
+            reading = decoding = 0
+
+        # a response holds every command sent, frames without them are
+        # stale responses to earlier sends and are discarded
+        expected = [
+            command for command in commands if isinstance(command, str)
+        ]
+        response = None
+        while response is None:
+            # recieves byte array from erg, a response may be split
+            # over reads so keep reading until a frame completes
+            transmission = self.erg.read(self.inEndpoint, length, timeout=2000)
+            if latency is not None:
+                received = perf_counter_ns()
+                reading += received - mark
+            for frame in self.__stream.feed(transmission, parser):
+                self.__checkstatus(frame)
+                if all(command in frame for command in expected):
+                    response = frame
+            if latency is not None:
+                mark = perf_counter_ns()
+                decoding += mark - received
+
+        if latency is not None:
+            latency.record(
+                commands,
+                waited,
+                encoded - start,
+                written - encoded,
+                reading,
+                decoding,
+            )
 
         # convers byte array to response dictionary
         return response
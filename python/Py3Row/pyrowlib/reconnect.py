@@ -0,0 +1,201 @@
+"""
+Description:
+    Recovers a PyRow connection after the cable is pulled, the PM
+    restarts or USB errors out. Reconnector looks for the erg with
+    pyrow.find() at exponentially growing intervals, claims it again,
+    restores the workout set with set_workout if the PM lost it and
+    measures how long each outage lasted. It runs on the caller's thread
+    (recover) or in the background (start), so pollers and UI loops keep
+    going with the last known sample while the erg is away.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from threading import Event, Lock, Thread
+import time
+
+# Third party
+from usb.core import USBError
+
+# Local packages
+from pyrowlib import pyrow
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# First and longest wait between attempts, in seconds
+BACKOFF = 0.25
+MAX_BACKOFF = 5.0
+
+# Errors that mean the erg went away, USBTimeoutError is one
+ERRORS = (USBError,)
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class Reconnector(object):
+    """
+    Reconnects erg to the same erg, by serial number, after a USB error.
+
+    :param PyRow erg: Connected erg
+    :param float backoff: Seconds before the second attempt, doubled
+        after each failed attempt
+    :param float maxbackoff: Longest wait between attempts, seconds
+    :param object find: Returns the candidate devices, default
+        pyrow.find
+    :return: Reconnector Object
+    """
+
+    def __init__(
+        self: object,
+        erg: object,
+        backoff: float = BACKOFF,
+        maxbackoff: float = MAX_BACKOFF,
+        find: object = None,
+    ):
+        self.erg = erg
+        self.backoff = backoff
+        self.maxbackoff = maxbackoff
+        self.find = find if find is not None else pyrow.find
+        self.serial = erg.get_erg()["serial"]
+
+        # time.monotonic() the current outage began, None when connected
+        self.down_since = None
+        self._connected = Event()
+        self._connected.set()
+        self._stop = Event()
+        self._lock = Lock()
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def down(self: object) -> bool:
+        """
+        True from the error until the erg is connected again.
+        """
+        return not self._connected.is_set()
+
+    def reset_stats(self: object):
+        self._outages = 0
+        self._recovered = 0
+        self._attempts = 0
+        self._restored = 0
+        self._last = 0.0
+        self._total = 0.0
+        self._max = 0.0
+
+    def wait(self: object, timeout: float = None) -> bool:
+        """
+        Waits for the erg to be connected, returns False on timeout.
+        """
+        return self._connected.wait(timeout)
+
+    def mark_down(self: object):
+        """
+        Starts an outage, if one is not already in progress.
+        """
+        with self._lock:
+            if self.down_since is None:
+                self.down_since = time.monotonic()
+                self._outages += 1
+                self._connected.clear()
+
+    def recover(self: object, stop: object = None) -> bool:
+        """
+        Tries to reconnect until it succeeds or stop, an Event, is set.
+        Returns True once connected.
+        """
+        if stop is None:
+            stop = self._stop
+        delay = self.backoff
+
+        while not stop.is_set():
+            if self.attempt():
+                return True
+            if stop.wait(delay):
+                break
+            delay = min(delay * 2, self.maxbackoff)
+
+        return False
+
+    def attempt(self: object) -> bool:
+        """
+        Tries each device find() returns once, returns True if the erg
+        was found and connected.
+        """
+        self.mark_down()
+        self._attempts += 1
+        try:
+            devices = list(self.find() or ())
+        except Exception:
+            devices = []
+
+        for device in devices:
+            try:
+                restored = self.erg.reconnect(device, self.serial)
+            except (ValueError, *ERRORS):
+                continue
+            self.__connected(restored)
+            return True
+
+        return False
+
+    def __connected(self: object, restored: bool):
+        with self._lock:
+            outage = time.monotonic() - self.down_since
+            self.down_since = None
+            self._recovered += 1
+            self._restored += restored
+            self._last = outage
+            self._total += outage
+            self._max = max(self._max, outage)
+            self._connected.set()
+
+        print(f"Reconnected to {self.serial} after {outage:.2f} s")
+
+    def start(self: object):
+        """
+        Recovers in a background thread, the erg must not be used until
+        down is False.
+        """
+        self.mark_down()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(
+            target=self.recover, name="Reconnector", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self: object, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self: object) -> dict:
+        """
+        Returns outage statistics, times in seconds:
+            outages, recovered, attempts, restored, down, last, mean, max
+        down is the length of the current outage, 0 when connected;
+        restored counts the workouts set again after a PM restart.
+        """
+        down_since = self.down_since
+        recovered = self._recovered
+
+        return {
+            "outages": self._outages,
+            "recovered": recovered,
+            "attempts": self._attempts,
+            "restored": self._restored,
+            "down": (
+                time.monotonic() - down_since
+                if down_since is not None
+                else 0.0
+            ),
+            "last": self._last,
+            "mean": self._total / recovered if recovered else 0.0,
+            "max": self._max,
+        }
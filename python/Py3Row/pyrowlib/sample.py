@@ -0,0 +1,205 @@
+"""
+Description:
+    Compact monitor samples. MonitorSample holds the get_monitor values
+    in a typed NamedTuple instead of a dict with string keys, and
+    SampleBuffer keeps a session of them in preallocated typed arrays,
+    one per field, so appending does not allocate and the memory used
+    is fixed when the buffer is created.
+
+Example:
+    buffer = SampleBuffer.for_session(hours=2)
+    buffer.append(erg.get_sample())
+    print(buffer.memory())
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from array import array
+from typing import NamedTuple
+import time
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Fastest poll rate, one frame per 50 ms frame gap
+SESSION_RATE = 20.0
+SESSION_HOURS = 2.0
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class MonitorSample(NamedTuple):
+    """
+    get_monitor values, see PyRow.get_sample.
+
+    :param float time: Workout time, seconds
+    :param float distance: Workout distance, meters
+    :param int spm: Strokes per minute
+    :param float pace: Seconds per 500 m
+    :param int power: Watts
+    :param float calhr: Calories per hour
+    :param int calories: Calories burnt
+    :param int heartrate: Beats per minute
+    :param int status: CSAFE status nibble
+    :param int strokestate: Stroke state, 0 if not read
+    :param int workoutstate: Workout state, 0 if not read
+    """
+
+    time: float
+    distance: float
+    spm: int
+    pace: float
+    power: int
+    calhr: float
+    calories: int
+    heartrate: int
+    status: int
+    strokestate: int = 0
+    workoutstate: int = 0
+
+    @classmethod
+    def from_monitor(cls: type, monitor: dict) -> object:
+        """
+        Converts a get_monitor dictionary.
+        """
+        return cls(
+            monitor["time"],
+            monitor["distance"],
+            monitor["spm"],
+            monitor["pace"],
+            monitor["power"],
+            monitor["calhr"],
+            monitor["calories"],
+            monitor["heartrate"],
+            monitor["status"],
+            monitor.get("strokestate", 0),
+            monitor.get("workoutstate", 0),
+        )
+
+
+# Array type code for each SampleBuffer column
+TYPECODES = {
+    "timestamp": "d",
+    "time": "d",
+    "distance": "d",
+    "spm": "B",
+    "pace": "f",  # half seconds, exact
+    "power": "H",
+    "calhr": "d",
+    "calories": "H",
+    "heartrate": "B",
+    "status": "B",
+    "strokestate": "B",
+    "workoutstate": "B",
+}
+COLUMNS = tuple(TYPECODES)
+
+
+class SampleBuffer(object):
+    """
+    Fixed size columnar ring of MonitorSamples, each with the
+    time.monotonic() timestamp it was taken at. Once full the oldest
+    samples are overwritten.
+
+    :param int capacity: Number of samples kept
+    :return: SampleBuffer Object
+    """
+
+    def __init__(self: object, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"Sample buffer size {capacity} is too small")
+        self.capacity = capacity
+        self.columns = {
+            name: array(code, bytes(capacity * array(code).itemsize))
+            for name, code in TYPECODES.items()
+        }
+        self._arrays = tuple(self.columns.values())
+        # Columns of the MonitorSample fields, after the timestamp
+        self._fields = self._arrays[1:]
+        # Total number of samples appended
+        self.count = 0
+
+    @classmethod
+    def for_session(
+        cls: type, hours: float = SESSION_HOURS, rate: float = SESSION_RATE
+    ) -> object:
+        """
+        Returns a buffer that holds hours of samples at rate a second.
+        """
+        return cls(int(hours * 3600 * rate))
+
+    def __len__(self: object) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def overwritten(self: object) -> int:
+        return max(0, self.count - self.capacity)
+
+    @property
+    def nbytes(self: object) -> int:
+        return sum(
+            len(column) * column.itemsize for column in self._arrays
+        )
+
+    def memory(self: object) -> dict:
+        """
+        Returns the memory use:
+            capacity, samples, overwritten, nbytes, sample_bytes
+        nbytes is fixed at creation, sample_bytes is the bytes per
+        sample.
+        """
+        return {
+            "capacity": self.capacity,
+            "samples": len(self),
+            "overwritten": self.overwritten,
+            "nbytes": self.nbytes,
+            "sample_bytes": sum(column.itemsize for column in self._arrays),
+        }
+
+    def clear(self: object):
+        self.count = 0
+
+    def append(self: object, sample: MonitorSample, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        index = self.count % self.capacity
+
+        self._arrays[0][index] = timestamp
+        for column, value in zip(self._fields, sample):
+            column[index] = value
+        self.count += 1
+
+    def __index(self: object, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("Sample index out of range")
+
+        return (self.count - length + index) % self.capacity
+
+    def __getitem__(self: object, index: int) -> MonitorSample:
+        """
+        Sample index from the oldest kept.
+        """
+        index = self.__index(index)
+
+        return MonitorSample(*(column[index] for column in self._fields))
+
+    def timestamp(self: object, index: int) -> float:
+        return self._arrays[0][self.__index(index)]
+
+    def column(self: object, name: str) -> memoryview:
+        """
+        Returns the values of a column, oldest first. Until the buffer
+        wraps this is a view on the buffer, afterwards a copy.
+        """
+        column = self.columns[name]
+        length = len(self)
+        start = self.count % self.capacity
+        if self.count <= self.capacity or start == 0:
+            return memoryview(column)[:length]
+
+        return memoryview(column[start:] + column[:start])
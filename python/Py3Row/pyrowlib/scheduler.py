@@ -0,0 +1,142 @@
+"""
+Description:
+    Monotonic frame gap scheduler for the erg. Sends are paced from the
+    time of the previous send with perf_counter_ns, which is not stepped
+    by NTP, and the wait ends on a deadline rather than after a fixed
+    sleep; optionally the last fraction of a millisecond is busy waited
+    since time.sleep tends to overshoot.
+"""
+# -----------------------------------------------------------------------------
+#                               Safe Imports
+# -----------------------------------------------------------------------------
+# Standard
+from time import perf_counter_ns, sleep
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+MIN_FRAME_GAP = 0.050  # in seconds
+# Default busy wait at the end of the gap, in seconds
+SPIN = 0.0005
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class FrameGapScheduler(object):
+    """
+    Enforces a minimum gap between frames sent to the erg and records
+    the gaps achieved.
+
+    :param float gap: Minimum frame gap in seconds
+    :param float spin: Busy wait for this last part of the gap, in
+        seconds, 0 to only sleep
+    :return: FrameGapScheduler Object
+    """
+
+    def __init__(self: object, gap: float = MIN_FRAME_GAP, spin: float = SPIN):
+        self.gap = gap
+        self.spin = spin
+        # perf_counter_ns of the previous send, None before the first
+        self._lastsend = None
+        self.reset_stats()
+
+    @property
+    def gap(self: object) -> float:
+        return self._gap_ns / 1e9
+
+    @gap.setter
+    def gap(self: object, gap: float):
+        if gap < 0:
+            raise ValueError(f"Frame gap {gap} is negative")
+        self._gap_ns = int(gap * 1e9)
+
+    @property
+    def spin(self: object) -> float:
+        return self._spin_ns / 1e9
+
+    @spin.setter
+    def spin(self: object, spin: float):
+        self._spin_ns = max(0, int(spin * 1e9))
+
+    def reset_stats(self: object):
+        self._frames = 0
+        self._short = 0
+        self._total_ns = 0
+        self._min_ns = None
+        self._max_ns = 0
+        self._waited_ns = 0
+
+    def remaining(self: object) -> float:
+        """
+        Returns the seconds left until the next frame may be sent, 0 if
+        it may be sent now. For callers that wait without blocking, such
+        as asyncio timers, before calling wait().
+        """
+        if self._lastsend is None:
+            return 0.0
+
+        remaining = self._lastsend + self._gap_ns - perf_counter_ns()
+
+        return max(0, remaining) / 1e9
+
+    def wait(self: object) -> int:
+        """
+        Blocks until the frame gap since the previous send has passed.
+        Returns the time waited in ns.
+        """
+        if self._lastsend is None:
+            return 0
+
+        start = perf_counter_ns()
+        deadline = self._lastsend + self._gap_ns
+        remaining = deadline - start
+        if remaining <= 0:
+            return 0
+
+        if remaining > self._spin_ns:
+            sleep((remaining - self._spin_ns) / 1e9)
+        while perf_counter_ns() < deadline:
+            pass
+
+        waited = perf_counter_ns() - start
+        self._waited_ns += waited
+
+        return waited
+
+    def sent(self: object, now: int = None):
+        """
+        Records that a frame was just sent, now is perf_counter_ns.
+        """
+        if now is None:
+            now = perf_counter_ns()
+
+        if self._lastsend is not None:
+            achieved = now - self._lastsend
+            self._frames += 1
+            self._total_ns += achieved
+            self._max_ns = max(self._max_ns, achieved)
+            if self._min_ns is None or achieved < self._min_ns:
+                self._min_ns = achieved
+            if achieved < self._gap_ns:
+                self._short += 1
+
+        self._lastsend = now
+
+    def stats(self: object) -> dict:
+        """
+        Returns achieved frame gap statistics, times in seconds:
+            gap, frames, mean, min, max, waited, short
+        short counts the gaps below the minimum, which should be 0.
+        """
+        frames = self._frames
+
+        return {
+            "gap": self.gap,
+            "frames": frames,
+            "mean": self._total_ns / frames / 1e9 if frames else 0.0,
+            "min": (self._min_ns or 0) / 1e9,
+            "max": self._max_ns / 1e9,
+            "waited": self._waited_ns / 1e9,
+            "short": self._short,
+        }
@@ -0,0 +1,232 @@
+"""
+Description:
+    Force curve similarity. StrokeIndex resamples each force curve to a
+    fixed number of points, scales it to unit length so strokes compare
+    by shape rather than by how hard they were pulled, and keeps the
+    results as rows of one growing float32 array. Finding the strokes
+    most like a given one is then a single matrix product, and k-means
+    clustering of the rows shows how the technique changed over a
+    session. Requires NumPy.
+
+Example:
+    index = StrokeIndex.from_sessions(analysis.load(paths))
+    rows, distances = index.nearest(force, 10)
+    labels, centroids = index.cluster(4)
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Third party
+import numpy
+
+# Local packages
+from pyrowlib.analysis import CURVE_POINTS, resample
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Rows allocated for a new index, doubled when it fills
+INDEX_CAPACITY = 1024
+# k-means iterations, stops sooner once no stroke changes cluster
+CLUSTER_ITERATIONS = 50
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def normalize(curves: numpy.ndarray) -> numpy.ndarray:
+    """
+    Scales each row of curves to unit length in place and returns it,
+    rows of zeros are left as they are.
+    """
+    norms = numpy.sqrt(numpy.einsum("ij,ij->i", curves, curves))
+    norms[norms == 0] = 1.0
+    curves /= norms[:, None]
+
+    return curves
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class StrokeIndex(object):
+    """
+    Normalized, resampled force curves, one row per stroke, each with
+    the session and stroke number it came from.
+
+    :param int length: Points each curve is resampled to
+    :param int capacity: Rows allocated up front
+    :return: StrokeIndex Object
+    """
+
+    def __init__(
+        self: object,
+        length: int = CURVE_POINTS,
+        capacity: int = INDEX_CAPACITY,
+    ):
+        self.length = length
+        self.count = 0
+        self._rows = numpy.zeros((max(1, capacity), length), numpy.float32)
+        self._sessions = numpy.zeros(max(1, capacity), numpy.int32)
+        self._strokes = numpy.zeros(max(1, capacity), numpy.int32)
+
+    @classmethod
+    def from_sessions(
+        cls: type, data: object, length: int = CURVE_POINTS
+    ) -> object:
+        """
+        Returns an index of every stroke with a force curve in data, an
+        analysis.SessionArrays. Sessions are numbered in data's order.
+        """
+        index = cls(length, len(data))
+        sizes = numpy.diff(data.bounds)
+        sessions = numpy.repeat(numpy.arange(len(sizes)), sizes)
+        strokes = numpy.arange(len(data)) - numpy.repeat(
+            data.bounds[:-1], sizes
+        )
+        index.add_curves(data.offsets, data.points, sessions, strokes)
+
+        return index
+
+    def __len__(self: object) -> int:
+        return self.count
+
+    @property
+    def curves(self: object) -> numpy.ndarray:
+        """
+        View of the rows in use.
+        """
+        return self._rows[: self.count]
+
+    def key(self: object, row: int) -> tuple:
+        """
+        Returns (session, stroke) of row.
+        """
+        if not -self.count <= row < self.count:
+            raise IndexError("Stroke index out of range")
+
+        return int(self._sessions[row]), int(self._strokes[row])
+
+    def __reserve(self: object, rows: int):
+        capacity = len(self._rows)
+        if self.count + rows <= capacity:
+            return
+        while capacity < self.count + rows:
+            capacity *= 2
+
+        grown = numpy.zeros((capacity, self.length), numpy.float32)
+        grown[: self.count] = self._rows[: self.count]
+        self._rows = grown
+        for name in ("_sessions", "_strokes"):
+            column = numpy.zeros(capacity, numpy.int32)
+            column[: self.count] = getattr(self, name)[: self.count]
+            setattr(self, name, column)
+
+    def add_curves(
+        self: object,
+        offsets: numpy.ndarray,
+        points: numpy.ndarray,
+        sessions: numpy.ndarray = 0,
+        strokes: numpy.ndarray = None,
+    ) -> int:
+        """
+        Adds the force curves points[offsets[i] : offsets[i + 1]] of
+        strokes, numbered 0 up by default, in sessions, a session number
+        for each or one for all. Empty curves are skipped. Returns the
+        number of rows added.
+        """
+        offsets = numpy.asarray(offsets, dtype=numpy.int64)
+        count = len(offsets) - 1
+        sessions = numpy.broadcast_to(
+            numpy.asarray(sessions, dtype=numpy.int32), (count,)
+        )
+        if strokes is None:
+            strokes = numpy.arange(count, dtype=numpy.int32)
+        captured = numpy.diff(offsets) > 0
+
+        curves = normalize(resample(offsets, points, self.length)[captured])
+        added = len(curves)
+        self.__reserve(added)
+        end = self.count + added
+        self._rows[self.count : end] = curves
+        self._sessions[self.count : end] = sessions[captured]
+        self._strokes[self.count : end] = numpy.asarray(strokes)[captured]
+        self.count = end
+
+        return added
+
+    def add(self: object, force: list, session: int = 0, stroke: int = 0):
+        """
+        Adds one force curve.
+        """
+        self.add_curves([0, len(force)], force, session, [stroke])
+
+    def vector(self: object, force: list) -> numpy.ndarray:
+        """
+        Returns force resampled and normalized as the index rows are.
+        """
+        curve = resample([0, len(force)], force, self.length)
+
+        return normalize(curve)[0]
+
+    def nearest(self: object, force: list, number: int = 10) -> tuple:
+        """
+        Returns (rows, distances) of the number strokes whose curves are
+        closest in shape to force, closest first. distances are between
+        the normalized curves, 0 for the same shape and up to 2.
+        """
+        number = min(number, self.count)
+        if not number:
+            return numpy.zeros(0, numpy.int64), numpy.zeros(0)
+
+        similarity = self.curves @ self.vector(force)
+        rows = numpy.argpartition(-similarity, number - 1)[:number]
+        rows = rows[numpy.argsort(-similarity[rows])]
+        distances = numpy.sqrt(
+            numpy.maximum(0.0, 2.0 - 2.0 * similarity[rows].astype(float))
+        )
+
+        return rows, distances
+
+    def cluster(
+        self: object,
+        clusters: int,
+        iterations: int = CLUSTER_ITERATIONS,
+        seed: int = 0,
+    ) -> tuple:
+        """
+        Groups the strokes into clusters of similar curves with k-means.
+        Returns (labels, centroids), the cluster of each row and the
+        mean curve of each cluster.
+        """
+        curves = self.curves
+        if not 0 < clusters <= self.count:
+            raise ValueError(
+                f"Cannot make {clusters} clusters of {self.count} strokes"
+            )
+
+        random = numpy.random.default_rng(seed)
+        centroids = curves[random.choice(self.count, clusters, replace=False)]
+        members = numpy.zeros((self.count, clusters), numpy.float32)
+        everyone = numpy.arange(self.count)
+        labels = None
+        for _ in range(iterations):
+            # Rows have unit length, so the nearest centroid is the one
+            # with the least |c|^2 - 2 r.c
+            distances = numpy.einsum("ij,ij->i", centroids, centroids)
+            distances = distances - 2 * curves @ centroids.T
+            nearest = distances.argmin(axis=1)
+            if labels is not None and (nearest == labels).all():
+                break
+            labels = nearest
+
+            members[:] = 0
+            members[everyone, labels] = 1
+            counts = members.sum(axis=0)
+            # An emptied cluster keeps its centroid
+            filled = counts > 0
+            sums = members.T @ curves
+            centroids = centroids.copy()
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        return labels, centroids
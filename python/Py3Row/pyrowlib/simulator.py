@@ -0,0 +1,599 @@
+"""
+Description:
+    Simulated PM5 for running PyRow, the monitors and the loggers without
+    an erg. SimulatedErg stands in for the usb.core.Device that
+    pyrow.find() returns and answers CSAFE frames from a flywheel model
+    driven by a simulated rower, with configurable USB latency and frame
+    gap enforcement.
+
+Example:
+    erg = pyrow.PyRow(simulator.SimulatedErg(spm=24, power=200))
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from array import array
+from collections import deque
+from math import pi, sin
+import time
+
+# Third party
+from usb.core import USBError, USBTimeoutError
+
+# Local packages
+from pyrowlib import csafe_cmd
+from pyrowlib import csafe_dic
+from pyrowlib.units import WATTS_FACTOR, watts_to_calhr, watts_to_pace
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+C2_VENDOR_ID = 0x17A4
+IN_ENDPOINT = 0x83
+OUT_ENDPOINT = 0x04
+# HID report ID for each report size
+REPORTS = ((21, 0x01), (63, 0x04), (121, 0x02))
+
+# Flywheel moment of inertia, kg m^2
+INERTIA = 0.1001
+# Effective sprocket radius, m
+SPROCKET = 0.035
+# Integration steps per force sample
+SUBSTEPS = 10
+FORCE_RATE = 64.0  # force samples per second during the drive
+NEWTONS_PER_LBF = 4.44822
+# Flywheel speed, rad/s, below which the PM treats the wheel as stopped
+MIN_SPEED = 20.0
+# Stroke state timing, seconds
+DWELL = 0.03
+ACCELERATE = 0.15
+
+StrokeState = csafe_dic.STROKE_STATE
+WorkoutState = csafe_dic.WORKOUT_STATE
+
+# (wrapper, command id): (name, argument byte counts)
+COMMANDS = {
+    (getattr(cmd, "wrapper", 0), cmd.id): (name, cmd.args)
+    for name, cmd in csafe_dic.SCHEMA.cmds.items()
+}
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class Flywheel(object):
+    """
+    Air resisted flywheel: I dw/dt = torque - k w^2, with the drag
+    factor as the PM reports it, k * 10^6.
+
+    :param int dragfactor: Drag factor
+    :return: Flywheel Object
+    """
+
+    def __init__(self: object, dragfactor: int = 120):
+        self.dragfactor = dragfactor
+        self.omega = 0.0
+        # Radians turned, the PM's distance is proportional to it
+        self.angle = 0.0
+
+    @property
+    def drag(self: object) -> float:
+        return self.dragfactor * 1e-6
+
+    @property
+    def power(self: object) -> float:
+        """
+        Power dissipated by the air at the current speed, watts.
+        """
+        return self.drag * self.omega**3
+
+    def step(self: object, torque: float, dt: float):
+        omega = self.omega + (torque - self.drag * self.omega**2) / (
+            INERTIA
+        ) * dt
+        self.omega = max(0.0, omega)
+        self.angle += self.omega * dt
+
+
+class Rower(object):
+    """
+    Rows at a steady rate and power. The handle force over the drive is a
+    half sine, its peak is estimated for the flywheel at steady speed and
+    trimmed once the flywheel is up to speed.
+
+    :param float spm: Strokes per minute
+    :param float power: Target watts
+    :param float ratio: Drive fraction of the stroke
+    :param int dragfactor: Drag factor, for the first force estimate
+    :return: Rower Object
+    """
+
+    def __init__(
+        self: object,
+        spm: float = 24,
+        power: float = 200,
+        ratio: float = 1 / 3,
+        dragfactor: int = 120,
+    ):
+        self.spm = spm
+        self.power = power
+        self.ratio = ratio
+        self.rowing = True
+
+        # Force peak, N, that puts in a stroke's energy at steady speed
+        omega = (power / (dragfactor * 1e-6)) ** (1 / 3)
+        self.peak = power * self.period / (
+            2 / pi * self.drivetime * omega * SPROCKET
+        )
+
+    @property
+    def period(self: object) -> float:
+        return 60.0 / self.spm
+
+    @property
+    def drivetime(self: object) -> float:
+        return self.period * self.ratio
+
+    def force(self: object, phase: float) -> float:
+        """
+        Handle force, N, phase seconds after the catch.
+        """
+        if not self.rowing or phase >= self.drivetime:
+            return 0.0
+
+        return self.peak * sin(pi * phase / self.drivetime)
+
+    def adjust(self: object, power: float):
+        """
+        Corrects the force peak after a stroke that averaged power watts,
+        strokes while the flywheel spins up are ignored.
+        """
+        if 0.8 < power / self.power < 1.25:
+            self.peak *= (self.power / power) ** (1 / 3)
+
+
+class SimulatedPM(object):
+    """
+    PM state machine and monitor values. advance() runs the physics up to
+    a time and handle() answers a CSAFE message.
+
+    :param Rower rower: Simulated rower
+    :param Flywheel flywheel: Simulated flywheel
+    :param str serial: Serial number, 9 digits
+    :param float gap: Min interframe gap reported by GETCAPS, seconds
+    :return: SimulatedPM Object
+    """
+
+    def __init__(
+        self: object,
+        rower: object,
+        flywheel: object,
+        serial: str = "430000001",
+        gap: float = 0.050,
+    ):
+        self.rower = rower
+        self.flywheel = flywheel
+        self.serial = serial
+        self.gap = gap
+        self.now = None
+        self.reset()
+
+    def reset(self: object):
+        self.workoutstate = WorkoutState.WAITTOBEGIN
+        # Set by GOINUSE, the workout screen is up
+        self.inuse = False
+        self.workouttype = 0
+        self.goal = None
+        self.worktime = 0.0
+        self.distance = 0.0
+        self.calories = 0.0
+        self.strokepower = 0.0
+        self.strokes = 0
+        self.force = deque(maxlen=256)
+        self._phase = 0.0
+        self._strokeenergy = 0.0
+        self._sample = 0.0
+        self._frame = 0
+
+    @property
+    def strokestate(self: object) -> int:
+        rower = self.rower
+        if not rower.rowing and self.flywheel.omega < MIN_SPEED:
+            return StrokeState.WAITING_FOR_WHEEL_TO_REACH_MIN_SPEED_STATE
+        if not rower.rowing:
+            return StrokeState.RECOVERY_STATE
+
+        phase = self._phase
+        if phase < rower.drivetime:
+            return StrokeState.DRIVING_STATE
+        if phase < rower.drivetime + DWELL:
+            return StrokeState.DWELLING_AFTER_DRIVE_STATE
+        if phase < rower.period - ACCELERATE:
+            return StrokeState.RECOVERY_STATE
+
+        return StrokeState.WAITING_FOR_WHEEL_TO_ACCELERATE_STATE
+
+    @property
+    def pace(self: object) -> float:
+        """
+        Seconds per 500 m at the last stroke's power, 0 when stopped.
+        """
+        if self.strokepower <= 0:
+            return 0.0
+
+        return watts_to_pace(self.strokepower)
+
+    def advance(self: object, now: float):
+        """
+        Runs the rower and flywheel up to now seconds.
+        """
+        if self.now is None:
+            self.now = now
+        dt = 1.0 / (FORCE_RATE * SUBSTEPS)
+        rower = self.rower
+        flywheel = self.flywheel
+        # Meters per radian from P = 2.8 v^3 and P = k w^3
+        meters = (flywheel.drag / WATTS_FACTOR) ** (1 / 3)
+
+        while self.now + dt <= now:
+            self.now += dt
+            force = rower.force(self._phase)
+            flywheel.step(force * SPROCKET, dt)
+            self._strokeenergy += flywheel.power * dt
+
+            # Force curve samples at 64 Hz through the drive
+            if force > 0:
+                self._sample += dt * FORCE_RATE
+                if self._sample >= 1.0:
+                    self._sample -= 1.0
+                    self.force.append(round(force / NEWTONS_PER_LBF))
+
+            if rower.rowing and self.workoutstate in (
+                WorkoutState.WAITTOBEGIN,
+                WorkoutState.WORKOUTROW,
+            ):
+                self.workoutstate = WorkoutState.WORKOUTROW
+            if self.workoutstate == WorkoutState.WORKOUTROW:
+                self.worktime += dt
+                self.distance += flywheel.omega * meters * dt
+                self.calories += watts_to_calhr(flywheel.power) / 3600.0 * dt
+                self.__checkgoal()
+
+            self._phase += dt
+            if self._phase >= rower.period:
+                # Catch
+                self._phase -= rower.period
+                # The PM starts a new force plot with each drive
+                self._sample = 0.0
+                self.force.clear()
+                self.strokepower = self._strokeenergy / rower.period
+                self._strokeenergy = 0.0
+                self.strokes += 1
+                rower.adjust(self.strokepower)
+
+    def __checkgoal(self: object):
+        if self.goal is None:
+            return
+        kind, value = self.goal
+        done = self.worktime if kind == "time" else self.distance
+        if done >= value:
+            self.workoutstate = WorkoutState.WORKOUTEND
+
+    def handle(self: object, message: bytes) -> bytes:
+        """
+        Returns the response message, status first, for a command
+        message.
+        """
+        # Bit 7 of the status toggles with every frame
+        self._frame ^= 0x80
+        body = self.__commands(message, 0)
+
+        return bytes([self._frame | (self.__statusnibble() & 0xF)]) + body
+
+    def __statusnibble(self: object) -> int:
+        """
+        CSAFE state machine status of the PM state.
+        """
+        if self.workoutstate == WorkoutState.WORKOUTEND:
+            return 7  # Finished
+        if self.inuse or self.workoutstate == WorkoutState.WORKOUTROW:
+            return 5  # In use
+
+        return 1  # Ready
+
+    def __commands(self: object, message: bytes, wrapper: int) -> bytes:
+        response = bytearray()
+        k = 0
+
+        while k < len(message):
+            cmdid = message[k]
+            k += 1
+            data = b""
+            # Long commands carry a byte count and data
+            if cmdid < 0x80:
+                count = message[k]
+                data = message[k + 1 : k + 1 + count]
+                k += 1 + count
+
+            if wrapper == 0 and csafe_dic.SCHEMA.wrappers[cmdid]:
+                inner = self.__commands(data, cmdid)
+                response += bytes([cmdid, len(inner)]) + inner
+                continue
+
+            name, args = COMMANDS[(wrapper, cmdid)]
+            values = []
+            offset = 0
+            for width in args:
+                values.append(
+                    int.from_bytes(data[offset : offset + width], "little")
+                )
+                offset += width
+
+            fields = csafe_dic.SCHEMA.responses[(wrapper << 8) | cmdid].fields
+            result = self.__command(name, values, fields)
+            if result is None:
+                continue
+            response += bytes([cmdid, len(result)]) + result
+
+        return bytes(response)
+
+    def __command(
+        self: object, name: str, values: list, fields: tuple
+    ) -> bytes:
+        """
+        Runs a command, returns its response data or None for no
+        response.
+        """
+        match name:
+            case "CSAFE_GETSTATUS_CMD":
+                # Already in the status byte
+                return None
+            case "CSAFE_RESET_CMD":
+                self.reset()
+                return b""
+            case "CSAFE_GOINUSE_CMD":
+                self.workoutstate = WorkoutState.WAITTOBEGIN
+                self.inuse = True
+                return b""
+            case "CSAFE_SETTWORK_CMD":
+                hours, minutes, seconds = values
+                self.goal = ("time", hours * 3600 + minutes * 60 + seconds)
+                return b""
+            case "CSAFE_SETHORIZONTAL_CMD":
+                self.goal = ("distance", values[0])
+                return b""
+            case "CSAFE_SETPROGRAM_CMD":
+                self.workouttype = values[0]
+                return b""
+            case "CSAFE_GETCAPS_CMD":
+                # Max rx frame, max tx frame, min interframe gap in ms
+                return bytes([121, 121, round(self.gap * 1000)])
+            case "CSAFE_GETID_CMD":
+                return b"00000"
+            case "CSAFE_GETSERIAL_CMD":
+                return self.serial.encode("ascii")
+            case "CSAFE_PM_GET_FORCEPLOTDATA":
+                return self.__forceplot(values[0])
+
+        if name.startswith(("CSAFE_SET", "CSAFE_PM_SET")):
+            return b""
+        values = self.__values(name)
+        if values is None:
+            # Not modelled, zeros in the layout the PM answers with
+            values = [0] * len(fields)
+
+        result = bytearray()
+        for width, value in zip(fields, values):
+            if width < 0:
+                text = str(value).encode("ascii")[:-width]
+                result += text.rjust(-width, b"0")
+            else:
+                result += int(value).to_bytes(width, "little")
+
+        return bytes(result)
+
+    def __forceplot(self: object, blocklength: int) -> bytes:
+        points = []
+        while self.force and len(points) < min(blocklength // 2, 16):
+            points.append(self.force.popleft())
+
+        result = bytearray([len(points) * 2])
+        for point in points + [0] * (16 - len(points)):
+            result += min(point, 0xFFFF).to_bytes(2, "little")
+
+        return bytes(result)
+
+    def __values(self: object, name: str) -> list:
+        match name:
+            case "CSAFE_GETVERSION_CMD":
+                # Concept2, PM5, hardware and software versions
+                return [22, 16, 5, 500, 3100]
+            case "CSAFE_PM_GET_WORKTIME":
+                centiseconds = int(self.worktime * 100)
+                return [centiseconds, 0]
+            case "CSAFE_PM_GET_WORKDISTANCE":
+                decimeters = int(self.distance * 10)
+                return [decimeters, 0]
+            case "CSAFE_GETCADENCE_CMD":
+                spm = round(self.rower.spm) if self.strokes else 0
+                return [spm, 0]
+            case "CSAFE_GETPOWER_CMD":
+                return [round(self.strokepower), 88]
+            case "CSAFE_GETPACE_CMD":
+                # Seconds per km
+                return [round(self.pace * 2), 0]
+            case "CSAFE_GETCALORIES_CMD":
+                return [int(self.calories)]
+            case "CSAFE_GETHRCUR_CMD":
+                return [0]
+            case "CSAFE_PM_GET_STROKESTATE":
+                return [self.strokestate]
+            case "CSAFE_PM_GET_WORKOUTSTATE":
+                return [self.workoutstate]
+            case "CSAFE_PM_GET_WORKOUTTYPE":
+                return [self.workouttype]
+            case "CSAFE_PM_GET_INTERVALTYPE":
+                return [0xFF]
+            case "CSAFE_PM_GET_WORKOUTINTERVALCOUNT":
+                return [0]
+            case "CSAFE_PM_GET_DRAGFACTOR":
+                return [self.flywheel.dragfactor]
+
+        return None
+
+
+class Endpoint(object):
+    def __init__(self: object, address: int):
+        self.bEndpointAddress = address
+
+
+class _Context(object):
+    """
+    Stands in for the pyusb backend context used by usb.util.
+    """
+
+    def managed_claim_interface(self, device, interface):
+        pass
+
+    def managed_release_interface(self, device, interface):
+        pass
+
+    def dispose(self, device, close_handle=True):
+        pass
+
+
+class FakeDevice(object):
+    """
+    Base for objects that stand in for the usb.core.Device of an erg,
+    subclasses implement write() and read().
+
+    :return: FakeDevice Object
+    """
+
+    idVendor = C2_VENDOR_ID
+    idProduct = 0x0080
+    product = "Concept2 Performance Monitor 5 (PM5)"
+    _ctx = _Context()
+
+    def is_kernel_driver_active(self: object, interface: int) -> bool:
+        return False
+
+    def detach_kernel_driver(self: object, interface: int):
+        pass
+
+    def set_configuration(self: object):
+        pass
+
+    def __getitem__(self: object, index: int) -> dict:
+        # configuration[(interface, alternate)] -> endpoints
+        return {(0, 0): (Endpoint(IN_ENDPOINT), Endpoint(OUT_ENDPOINT))}
+
+
+class SimulatedErg(FakeDevice):
+    """
+    Fake usb.core.Device for PyRow. Each write is answered by the
+    simulated PM after latency seconds; a frame sent sooner than the
+    frame gap after the previous one is dropped, as the PM does, and the
+    next read raises USBTimeoutError straight away. unplug() and plug()
+    simulate the cable being pulled, USB transfers raise USBError while
+    unplugged.
+
+    :param float spm: Rower strokes per minute
+    :param float power: Rower target watts
+    :param int dragfactor: Flywheel drag factor
+    :param float latency: Seconds from write to response
+    :param float gap: Min interframe gap, seconds, 0 to not enforce
+    :param str serial: Serial number, 9 digits
+    :param object clock: Returns the simulated time in seconds, default
+        time.monotonic; latency and the frame gap are always real time
+    :return: SimulatedErg Object
+    """
+
+    def __init__(
+        self: object,
+        spm: float = 24,
+        power: float = 200,
+        dragfactor: int = 120,
+        latency: float = 0.0,
+        gap: float = 0.050,
+        serial: str = "430000001",
+        clock: object = time.monotonic,
+    ):
+        self.rower = Rower(spm, power, dragfactor=dragfactor)
+        self.pm = SimulatedPM(self.rower, Flywheel(dragfactor), serial, gap)
+        self.latency = latency
+        self.gap = gap
+        self.clock = clock
+        self.serial_number = serial
+
+        self.connected = True
+        # Frames dropped for arriving inside the frame gap
+        self.violations = 0
+        self._lastwrite = None
+        # (ready time, report) waiting to be read
+        self._responses = deque()
+
+    def __repr__(self: object) -> str:
+        return f"SimulatedErg(serial={self.serial_number})"
+
+    def unplug(self: object, reset: bool = False):
+        """
+        Disconnects the erg, with reset the PM also restarts and loses
+        its workout.
+        """
+        self.connected = False
+        self._responses.clear()
+        if reset:
+            self.pm.reset()
+
+    def plug(self: object):
+        self.connected = True
+
+    def __checkconnected(self: object):
+        if not self.connected:
+            raise USBError("No such device", errno=19)
+
+    def write(self: object, endpoint: int, data, timeout: int = None) -> int:
+        self.__checkconnected()
+        self.pm.advance(self.clock())
+        now = time.monotonic()
+
+        if (
+            self._lastwrite is not None
+            and self.gap
+            and now - self._lastwrite < self.gap
+        ):
+            self.violations += 1
+        else:
+            message = csafe_cmd.unframe(bytes(data)[1:])
+            response = csafe_cmd.frame(self.pm.handle(message))
+            self._responses.append(
+                (now + self.latency, self.__report(response))
+            )
+        self._lastwrite = now
+
+        return len(data)
+
+    def read(self: object, endpoint: int, length: int, timeout: int = None):
+        self.__checkconnected()
+        if not self._responses:
+            raise USBTimeoutError("Operation timed out")
+
+        ready, report = self._responses.popleft()
+        delay = ready - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        return report
+
+    def __report(self: object, frame: bytes) -> array:
+        """
+        Puts frame in the smallest report it fits.
+        """
+        for size, reportid in REPORTS:
+            if len(frame) + 1 <= size:
+                report = bytes([reportid]) + frame
+                return array("B", report + bytes(size - len(report)))
+
+        raise ValueError(f"Response is too long: {len(frame)}")
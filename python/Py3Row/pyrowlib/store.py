@@ -0,0 +1,418 @@
+"""
+Description:
+    Binary workout session store. SessionWriter appends strokes, the
+    monitor sample at the catch and the force curve of the drive, in
+    blocks: each column of a block is a fixed width typed array, as in
+    SampleBuffer, followed by the force curve offsets and the force
+    points. A block is written with a single os.write when it fills or
+    on flush(), so the file only ever grows and a crash loses at most
+    the strokes since the last flush. close() rewrites a session of
+    several blocks as one, so a finished session's columns are single
+    views on the map. Strokes are sampled at the catch,
+    so the work distance and time at the end of the workout, past the
+    last catch, are kept in the header by finish(). SessionReader maps
+    the file with one mmap and reads columns and curves in place,
+    without parsing.
+
+    Session file layout, little endian, sections padded to 8 bytes:
+        header  magic b"C2SS", version u16, workout type u16,
+                serial 16s, started f64 (time.time()),
+                distance f64, time f64 (0 until finish(), version 2)
+        block   strokes u32, points u32,
+                one array per sample.COLUMNS column of strokes values,
+                force offsets u32 x strokes + 1, force points u16
+
+Example:
+    with SessionWriter("workout.c2ss", serial, workouttype) as writer:
+        writer.append(erg.get_sample(), force)
+        writer.finish(distance, worktime)
+
+    with SessionReader("workout.c2ss") as session:
+        power = session.column("power")
+        force = session.force(-1)
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from array import array
+from struct import Struct
+import mmap
+import os
+import time
+
+# Local packages
+from pyrowlib.sample import COLUMNS, TYPECODES, MonitorSample, SampleBuffer
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+MAGIC = b"C2SS"
+VERSION = 2
+HEADER = Struct("<4sHH16sddd")
+# Magic and version, the start of every header
+PREFIX = Struct("<4sH")
+# Header of each version the reader accepts, version 1 has no totals
+HEADERS = {1: Struct("<4sHH16sd"), VERSION: HEADER}
+# Offset of the distance and time totals in the header
+TOTALS = Struct("<dd")
+TOTALS_OFFSET = HEADER.size - TOTALS.size
+BLOCK = Struct("<II")
+
+# Strokes per block, a block is written when it fills
+BLOCK_STROKES = 256
+OFFSET_CODE = "I"
+FORCE_CODE = "H"  # force points as the PM sends them
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+def _section(size: int) -> int:
+    return size + _padding(size)
+
+
+def _block(count: int, columns: list, offsets: object, force: object):
+    """
+    Returns a block of count strokes, the COLUMNS arrays, the force
+    curve offsets and the force points, each section padded.
+    """
+    block = bytearray(BLOCK.pack(count, len(force)))
+    for part in (*columns, offsets, force):
+        block += part
+        block += bytes(_padding(len(block)))
+
+    return block
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class SessionWriter(object):
+    """
+    Appends strokes to a new session file at path.
+
+    :param str path: Session file
+    :param str serial: Erg serial number
+    :param int workouttype: PM workout type, get_workout()["type"]
+    :param int block: Strokes kept in memory before a block is written
+    :return: SessionWriter Object
+    """
+
+    def __init__(
+        self: object,
+        path: str,
+        serial: str = "",
+        workouttype: int = 0,
+        block: int = BLOCK_STROKES,
+    ):
+        self.path = path
+        self.serial = serial
+        self.workouttype = workouttype
+        self.started = time.time()
+        # Work distance and time at the end of the workout, see finish()
+        self.distance = 0.0
+        self.time = 0.0
+        # Strokes and blocks written to the file
+        self.strokes = 0
+        self.blocks = 0
+
+        self._samples = SampleBuffer(block)
+        self._offsets = array(OFFSET_CODE, [0])
+        self._force = array(FORCE_CODE)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        self._fd = os.open(path, flags | getattr(os, "O_BINARY", 0), 0o644)
+        os.write(self._fd, self.__header())
+
+    def __header(self: object) -> bytes:
+        return HEADER.pack(
+            MAGIC,
+            VERSION,
+            self.workouttype,
+            self.serial.encode("ascii")[:16],
+            self.started,
+            self.distance,
+            self.time,
+        )
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    @property
+    def closed(self: object) -> bool:
+        return self._fd is None
+
+    @property
+    def pending(self: object) -> int:
+        """
+        Strokes appended but not yet written.
+        """
+        return len(self._samples)
+
+    def append(
+        self: object,
+        sample: MonitorSample,
+        force: list = (),
+        timestamp: float = None,
+    ):
+        """
+        Adds a stroke, its sample and force curve. timestamp defaults to
+        time.monotonic().
+        """
+        self._samples.append(sample, timestamp)
+        self._force.extend(force)
+        self._offsets.append(len(self._force))
+        if len(self._samples) == self._samples.capacity:
+            self.flush()
+
+    def flush(self: object):
+        """
+        Writes the pending strokes as a block.
+        """
+        count = len(self._samples)
+        if not count or self._fd is None:
+            return
+
+        columns = [self._samples.column(name) for name in COLUMNS]
+        os.write(self._fd, _block(count, columns, self._offsets, self._force))
+
+        self.strokes += count
+        self.blocks += 1
+        self._samples.clear()
+        self._offsets = array(OFFSET_CODE, [0])
+        self._force = array(FORCE_CODE)
+
+    def finish(self: object, distance: float, worktime: float):
+        """
+        Sets the work distance, meters, and time, seconds, the workout
+        ended at. They are written to the header on close().
+        """
+        self.distance = distance
+        self.time = worktime
+
+    def sync(self: object):
+        """
+        Flushes and waits for the file to reach the disk.
+        """
+        self.flush()
+        if self._fd is not None:
+            os.fsync(self._fd)
+
+    def close(self: object):
+        """
+        Writes the pending strokes and the totals, then joins the blocks
+        into one if there are several.
+        """
+        if self._fd is None:
+            return
+        self.flush()
+        if self.distance or self.time:
+            os.lseek(self._fd, TOTALS_OFFSET, os.SEEK_SET)
+            os.write(self._fd, TOTALS.pack(self.distance, self.time))
+        os.close(self._fd)
+        self._fd = None
+        if self.blocks > 1:
+            self.__coalesce()
+
+    def __coalesce(self: object):
+        """
+        Rewrites the session as a single block. The new file replaces
+        the old one only once it is on disk.
+        """
+        with SessionReader(self.path) as session:
+            columns = [session.column(name) for name in COLUMNS]
+            offsets, force = session.forces()
+            block = _block(len(session), columns, offsets, force)
+            del columns, offsets, force
+
+        path = os.fspath(self.path)
+        temp = f"{path}.tmp"
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        fd = os.open(temp, flags | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, self.__header())
+            os.write(fd, block)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(temp, path)
+        self.blocks = 1
+
+
+class SessionReader(object):
+    """
+    Read only view of the session file at path, mapped with one mmap.
+    Columns and force curves are memoryviews into the map, valid until
+    close(). Raises ValueError if it is not a session file.
+
+    :param str path: Session file
+    :return: SessionReader Object
+    """
+
+    def __init__(self: object, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self._map)
+        self._data = data
+
+        if len(data) < HEADERS[1].size:
+            self.close()
+            raise ValueError(f"{path} is not a session file")
+        magic, version = PREFIX.unpack_from(data)
+        header = HEADERS.get(version)
+        if magic != MAGIC or header is None or len(data) < header.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} session")
+        fields = header.unpack_from(data)
+        self.workouttype, serial, self.started = fields[2:5]
+        self.serial = serial.rstrip(b"\x00").decode("ascii")
+        # Work distance and time at the end, 0 if never finished
+        self.distance, self.time = fields[5:] or (0.0, 0.0)
+        self._header = header.size
+
+        # Per block: {column: view}, force offsets view, force view
+        self._blocks = []
+        # Index of the first stroke of each block, then the total
+        self._starts = [0]
+        self.__index()
+
+    def __index(self: object):
+        data = self._data
+        offset = self._header
+        end = len(data)
+        while offset + BLOCK.size <= end:
+            count, points = BLOCK.unpack_from(data, offset)
+            sections = [
+                (name, TYPECODES[name], count) for name in COLUMNS
+            ]
+            sections.append(("offsets", OFFSET_CODE, count + 1))
+            sections.append(("force", FORCE_CODE, points))
+            size = BLOCK.size + sum(
+                _section(length * array(code).itemsize)
+                for _, code, length in sections
+            )
+            if offset + size > end:
+                # Block cut short by a crash mid write
+                break
+
+            offset += BLOCK.size
+            views = {}
+            for name, code, length in sections:
+                nbytes = length * array(code).itemsize
+                views[name] = data[offset : offset + nbytes].cast(code)
+                offset += _section(nbytes)
+            self._blocks.append(views)
+            self._starts.append(self._starts[-1] + count)
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def __len__(self: object) -> int:
+        return self._starts[-1]
+
+    @property
+    def blocks(self: object) -> int:
+        return len(self._blocks)
+
+    def close(self: object):
+        """
+        Releases the map, views handed out must not be used afterwards.
+        """
+        if self._map is None:
+            return
+        for views in getattr(self, "_blocks", ()):
+            for view in views.values():
+                view.release()
+        self._blocks = []
+        self._starts = [0]
+        self._data.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Columns the caller still holds, closed when they are freed
+            pass
+        self._map = None
+
+    def __locate(self: object, index: int) -> tuple:
+        """
+        Returns the block views of stroke index and its index within it.
+        """
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("Stroke index out of range")
+
+        low, high = 0, len(self._blocks) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._starts[middle] <= index:
+                low = middle
+            else:
+                high = middle - 1
+
+        return self._blocks[low], index - self._starts[low]
+
+    def __getitem__(self: object, index: int) -> MonitorSample:
+        views, index = self.__locate(index)
+
+        return MonitorSample(*(views[name][index] for name in COLUMNS[1:]))
+
+    def timestamp(self: object, index: int) -> float:
+        views, index = self.__locate(index)
+
+        return views["timestamp"][index]
+
+    def force(self: object, index: int) -> memoryview:
+        """
+        Force curve of stroke index.
+        """
+        views, index = self.__locate(index)
+        offsets = views["offsets"]
+
+        return views["force"][offsets[index] : offsets[index + 1]]
+
+    def column(self: object, name: str) -> memoryview:
+        """
+        Returns the values of a column of every stroke. For a session
+        written as one block this is a view on the map, otherwise the
+        blocks are joined into a copy.
+        """
+        if name not in TYPECODES:
+            raise KeyError(name)
+        if len(self._blocks) == 1:
+            return self._blocks[0][name]
+
+        values = array(TYPECODES[name])
+        for views in self._blocks:
+            values.frombytes(views[name].cast("B"))
+
+        return memoryview(values)
+
+    def forces(self: object) -> tuple:
+        """
+        Returns (offsets, points), every force curve joined: the curve of
+        stroke i is points[offsets[i] : offsets[i + 1]].
+        """
+        if len(self._blocks) == 1:
+            return self._blocks[0]["offsets"], self._blocks[0]["force"]
+
+        offsets = array(OFFSET_CODE, [0])
+        points = array(FORCE_CODE)
+        for views in self._blocks:
+            base = len(points)
+            offsets.extend(base + offset for offset in views["offsets"][1:])
+            points.frombytes(views["force"].cast("B"))
+
+        return memoryview(offsets), memoryview(points)
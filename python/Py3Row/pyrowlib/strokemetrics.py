@@ -0,0 +1,237 @@
+"""
+Description:
+    Per stroke force curve metrics. StrokeAnalyzer works out the peak
+    force and where in the drive it falls, the average force, drive
+    length, impulse, smoothness and average to peak ratio of each curve
+    in one pass over its points, and scores how consistent the last
+    strokes were. It runs inside ForceCapture.feed, so the metrics of a
+    stroke are ready in the poll that sees the drive end. NumPy is used
+    when it is installed, otherwise plain Python.
+
+Example:
+    erg.analyze_strokes(window=10)
+    force = erg.get_forceplot_data()
+    print(erg.forcecapture.analyzer.last)
+    print(erg.forcecapture.analyzer.consistency())
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from collections import deque
+from time import perf_counter_ns
+from typing import NamedTuple
+import math
+
+# Third party
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Local packages
+from pyrowlib.forcecapture import FORCE_RATE
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Strokes the consistency scores are taken over
+STROKE_WINDOW = 10
+# Curves shorter than this are summed in Python, NumPy only pays off on
+# longer arrays
+NUMPY_POINTS = 32
+
+# Metrics scored by StrokeAnalyzer.consistency
+SCORED = ("peak", "peakpos", "drivetime", "impulse", "ratio")
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def _summary_python(force: list) -> tuple:
+    """
+    Returns peak, peak index, sum and total variation of force.
+    """
+    peak = force[0]
+    index = 0
+    total = 0
+    variation = 0
+    previous = peak
+    for i, value in enumerate(force):
+        total += value
+        variation += abs(value - previous)
+        previous = value
+        if value > peak:
+            peak = value
+            index = i
+
+    return peak, index, total, variation
+
+
+def _summary_numpy(force: list) -> tuple:
+    values = numpy.asarray(force, dtype=numpy.float64)
+    index = int(values.argmax())
+
+    return (
+        float(values[index]),
+        index,
+        float(values.sum()),
+        float(numpy.abs(numpy.diff(values)).sum()),
+    )
+
+
+def stroke_metrics(force: list, usenumpy: bool = None) -> tuple:
+    """
+    Returns the StrokeMetrics of a force curve, None if it is empty.
+    usenumpy defaults to True for long curves; without NumPy installed
+    it is ignored.
+    """
+    points = len(force)
+    if not points:
+        return None
+
+    if usenumpy is None:
+        usenumpy = numpy is not None and points >= NUMPY_POINTS
+    if usenumpy and numpy is not None:
+        peak, index, total, variation = _summary_numpy(force)
+    else:
+        peak, index, total, variation = _summary_python(force)
+
+    # Going up from the first point to the peak and down to the last is
+    # the least variation a curve with this peak can have
+    least = 2 * peak - force[0] - force[-1]
+    mean = total / points
+
+    return StrokeMetrics(
+        float(peak),
+        index / (points - 1) if points > 1 else 0.0,
+        mean,
+        points,
+        points / FORCE_RATE,
+        total / FORCE_RATE,
+        least / variation if variation else 1.0,
+        mean / peak if peak > 0 else 0.0,
+    )
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class StrokeMetrics(NamedTuple):
+    """
+    Metrics of one force curve, force in the PM's units (lbs).
+
+    :param float peak: Highest force
+    :param float peakpos: Position of the peak, 0 at the catch to 1 at
+        the end of the drive
+    :param float mean: Average force over the drive
+    :param int points: Force points, one every 1 / FORCE_RATE seconds
+    :param float drivetime: Drive length, points / FORCE_RATE seconds
+    :param float impulse: Force integrated over the drive, force x s
+    :param float smoothness: 1 for a curve that only rises to its peak
+        and falls, lower the more it goes up and down on the way
+    :param float ratio: Average force / peak force
+    """
+
+    peak: float
+    peakpos: float
+    mean: float
+    points: int
+    drivetime: float
+    impulse: float
+    smoothness: float
+    ratio: float
+
+
+class StrokeAnalyzer(object):
+    """
+    Keeps the StrokeMetrics of the last window strokes, self.last is the
+    newest. Set it as a ForceCapture's analyzer to analyze each stroke
+    as it is captured.
+
+    :param int window: Strokes the consistency scores are taken over
+    :param bool usenumpy: See stroke_metrics
+    :return: StrokeAnalyzer Object
+    """
+
+    def __init__(
+        self: object, window: int = STROKE_WINDOW, usenumpy: bool = None
+    ):
+        if window < 2:
+            raise ValueError(f"Stroke window {window} is too small")
+        self.window = window
+        self.usenumpy = usenumpy
+        self.history = deque(maxlen=window)
+        self.last = None
+        self.reset_stats()
+
+    def __len__(self: object) -> int:
+        return len(self.history)
+
+    def reset(self: object):
+        self.history.clear()
+        self.last = None
+
+    def reset_stats(self: object):
+        self._strokes = 0
+        self._elapsed = 0
+        self._max = 0
+
+    def analyze(self: object, stroke: object) -> StrokeMetrics:
+        """
+        Adds a stroke, a StrokeForce or a force curve list, and returns
+        its metrics. Empty curves are ignored and return None.
+        """
+        start = perf_counter_ns()
+        force = getattr(stroke, "force", stroke)
+        metrics = stroke_metrics(force, self.usenumpy)
+        if metrics is None:
+            return None
+
+        self.history.append(metrics)
+        self.last = metrics
+
+        elapsed = perf_counter_ns() - start
+        self._strokes += 1
+        self._elapsed += elapsed
+        self._max = max(self._max, elapsed)
+
+        return metrics
+
+    def consistency(self: object) -> dict:
+        """
+        Returns {metric: score} over the last window strokes for peak,
+        peakpos, drivetime, impulse and ratio, plus their average as
+        overall. A score is 1 - coefficient of variation, clamped to
+        0..1; 1 means every stroke had the same value. Empty until there
+        are two strokes.
+        """
+        count = len(self.history)
+        if count < 2:
+            return {}
+
+        scores = {}
+        for name in SCORED:
+            values = [getattr(metrics, name) for metrics in self.history]
+            mean = sum(values) / count
+            if mean <= 0:
+                scores[name] = 0.0
+                continue
+            variance = sum((value - mean) ** 2 for value in values) / count
+            scores[name] = min(1.0, max(0.0, 1 - math.sqrt(variance) / mean))
+        scores["overall"] = sum(scores.values()) / len(SCORED)
+
+        return scores
+
+    def stats(self: object) -> dict:
+        """
+        Returns strokes analyzed and the mean and max time analyzing a
+        stroke took, in seconds.
+        """
+        strokes = self._strokes
+
+        return {
+            "strokes": strokes,
+            "mean": self._elapsed / strokes / 1e9 if strokes else 0.0,
+            "max": self._max / 1e9,
+        }
@@ -0,0 +1,393 @@
+"""
+Description:
+    Shared memory telemetry bus. Only one process can claim the erg's USB
+    interface; TelemetryPublisher polls the erg and writes the latest
+    sample and a rolling buffer of force curves into a shared memory
+    segment, any number of local TelemetryClient readers use the same
+    get_monitor()/get_forceplot_data() calls as PyRow without touching
+    USB.
+
+    The segment is protected by a seqlock: the writer makes the sequence
+    odd while it writes and even when done, readers retry if the sequence
+    was odd or changed while they copied. A publisher that dies mid write
+    leaves the sequence odd, readers give up with TimeoutError after
+    READ_TIMEOUT seconds. On POSIX the segment outlives a publisher that
+    died without close(); the next publisher on the name removes it if
+    the process recorded in the header is gone.
+"""
+# -----------------------------------------------------------------------------
+#                               Imports
+# -----------------------------------------------------------------------------
+# Standard
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from struct import Struct
+import os
+import time
+
+# Local packages
+from pyrowlib.forcecapture import ForceCapture
+from pyrowlib.poller import ErgPoller, POLL_RATE
+
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+SEGMENT_NAME = "pyrow-telemetry"
+MAGIC = b"C2TM"
+VERSION = 2
+# Force curves kept and points per curve
+CURVES = 32
+POINTS = 256
+
+# Seconds a reader retries a segment left mid write
+READ_TIMEOUT = 1.0
+
+# magic, version, curves, points, publisher pid, seqlock sequence
+HEADER = Struct("<4sHHIIQ")
+# timestamp, time, distance, spm, pace, power, calhr, calories, heartrate,
+# status, strokestate
+SAMPLE = Struct("<dddIdIdIIBB")
+SAMPLE_KEYS = (
+    "time",
+    "distance",
+    "spm",
+    "pace",
+    "power",
+    "calhr",
+    "calories",
+    "heartrate",
+    "status",
+    "strokestate",
+)
+# seqlock sequence and number of curves published
+COUNTER = Struct("<Q")
+# points in the curve, then the points
+CURVE_LENGTH = Struct("<H")
+
+SEQ_OFFSET = HEADER.size - 8
+SAMPLE_OFFSET = HEADER.size
+CURVE_COUNT_OFFSET = SAMPLE_OFFSET + SAMPLE.size
+CURVES_OFFSET = CURVE_COUNT_OFFSET + COUNTER.size
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def segment_size(curves: int = CURVES, points: int = POINTS) -> int:
+    return _curve_offset(curves, points)
+
+
+def _curve_offset(slot: int, points: int) -> int:
+    return CURVES_OFFSET + slot * (CURVE_LENGTH.size + points * 2)
+
+
+def _attach(name: str) -> SharedMemory:
+    """
+    Attaches to an existing segment without registering it with the
+    resource tracker, which would unlink it when this process exits.
+    """
+    try:
+        return SharedMemory(name, track=False)
+    except TypeError:
+        # Python < 3.13
+        shm = SharedMemory(name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _running(pid: int) -> bool:
+    """
+    True if process pid is running. Windows frees a segment with the
+    last process using it, so one found there is never stale.
+    """
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Another user's process
+        pass
+
+    return True
+
+
+def _remove_stale(name: str):
+    """
+    Unlinks the telemetry segment name if the publisher recorded in it
+    is no longer running, otherwise raises FileExistsError.
+    """
+    shm = _attach(name)
+    header = None
+    if shm.size >= HEADER.size:
+        header = HEADER.unpack_from(shm.buf, 0)
+    shm.close()
+
+    if header is None or header[:2] != (MAGIC, VERSION) or _running(
+        header[4]
+    ):
+        raise FileExistsError(f"Shared memory segment {name} is in use")
+    # Tracked again so unlink() can unregister it
+    stale = SharedMemory(name)
+    stale.close()
+    stale.unlink()
+
+
+# -----------------------------------------------------------------------------
+#                           Classes
+# -----------------------------------------------------------------------------
+class TelemetryPublisher(ErgPoller):
+    """
+    ErgPoller that also collects force curves and publishes both to shared
+    memory. Force plot data is read during the drive and the curve is
+    published when the stroke moves from the drive to recovery, the
+    capture reports are in self.forcecapture. A segment left on name by
+    a publisher that died is replaced, FileExistsError is raised if its
+    publisher is still running.
+
+    :param PyRow erg: Connected erg
+    :param str name: Shared memory segment name
+    :param float rate: Polls per second
+    :param int curves: Number of force curves kept
+    :param int points: Max points per force curve
+    :param PollPolicy policy: Sets the poll interval, replaces rate
+    :param bool reconnect: Reconnect after USB errors rather than stop
+    :return: TelemetryPublisher Object
+    """
+
+    def __init__(
+        self: object,
+        erg: object,
+        name: str = SEGMENT_NAME,
+        rate: float = POLL_RATE,
+        curves: int = CURVES,
+        points: int = POINTS,
+        policy: object = None,
+        reconnect: bool = False,
+    ):
+        super().__init__(erg, rate, policy=policy, reconnect=reconnect)
+        self.curves = curves
+        self.points = points
+
+        size = segment_size(curves, points)
+        try:
+            self.shm = SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            _remove_stale(name)
+            self.shm = SharedMemory(name, create=True, size=size)
+        self._buf = self.shm.buf
+        self._seq = 0
+        self._curvecount = 0
+        self.forcecapture = ForceCapture()
+
+        HEADER.pack_into(
+            self._buf, 0, MAGIC, VERSION, curves, points, os.getpid(), 0
+        )
+
+    def close(self: object):
+        """
+        Stops polling and removes the segment.
+        """
+        self.stop()
+        self._buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def poll(self: object) -> object:
+        sample = super().poll()
+
+        curve = None
+        if self.policy.force(sample, self.forcecapture.active):
+            forceplot = self.erg.get_force_plot()
+            stroke = self.forcecapture.feed(
+                forceplot["strokestate"],
+                forceplot["forceplot"],
+                time.monotonic(),
+            )
+            if stroke is not None:
+                curve = stroke.force[: self.points]
+        else:
+            # Outside the drive, so the capture takes the next catch
+            self.forcecapture.feed(
+                sample.monitor["strokestate"], [], time.monotonic()
+            )
+
+        self.publish(sample, curve)
+
+        return sample
+
+    def publish(self: object, sample: object, curve: list = None):
+        """
+        Writes sample, and curve if given, to the segment.
+        """
+        buf = self._buf
+        monitor = sample.monitor
+
+        # odd while writing
+        self._seq += 1
+        COUNTER.pack_into(buf, SEQ_OFFSET, self._seq)
+
+        SAMPLE.pack_into(
+            buf,
+            SAMPLE_OFFSET,
+            sample.timestamp,
+            *(monitor.get(key, 0) for key in SAMPLE_KEYS),
+        )
+        if curve is not None:
+            offset = _curve_offset(self._curvecount % self.curves, self.points)
+            CURVE_LENGTH.pack_into(buf, offset, len(curve))
+            Struct(f"<{len(curve)}H").pack_into(
+                buf, offset + CURVE_LENGTH.size, *curve
+            )
+            self._curvecount += 1
+            COUNTER.pack_into(buf, CURVE_COUNT_OFFSET, self._curvecount)
+
+        self._seq += 1
+        COUNTER.pack_into(buf, SEQ_OFFSET, self._seq)
+
+
+class TelemetryClient(object):
+    """
+    Read only view of a TelemetryPublisher segment with the PyRow read
+    interface. Reads raise TimeoutError if the publisher stopped part
+    way through a write, attach again once it has restarted.
+
+    :param str name: Shared memory segment name
+    :param float timeout: Seconds a read retries a segment being written
+    :return: TelemetryClient Object
+    """
+
+    def __init__(
+        self: object, name: str = SEGMENT_NAME, timeout: float = READ_TIMEOUT
+    ):
+        self.timeout = timeout
+        self.shm = _attach(name)
+        self._buf = self.shm.buf
+
+        magic, version, self.curves, self.points, *_ = HEADER.unpack_from(
+            self._buf, 0
+        )
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{name} is not a telemetry segment")
+
+        # curves published when last read by get_forceplot_data
+        self._curvecount = self.__read(
+            lambda buf: COUNTER.unpack_from(buf, CURVE_COUNT_OFFSET)[0]
+        )
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self: object):
+        self._buf = None
+        self.shm.close()
+
+    def __read(self: object, copy: object) -> object:
+        """
+        Runs copy(buf) under the seqlock, retrying until it got a
+        consistent copy. Raises TimeoutError if there was none within
+        self.timeout seconds.
+        """
+        buf = self._buf
+        deadline = None
+        while True:
+            before = COUNTER.unpack_from(buf, SEQ_OFFSET)[0]
+            if not before & 1:
+                result = copy(buf)
+                if COUNTER.unpack_from(buf, SEQ_OFFSET)[0] == before:
+                    return result
+
+            if deadline is None:
+                deadline = time.monotonic() + self.timeout
+            elif time.monotonic() > deadline:
+                raise TimeoutError("Telemetry publisher stopped mid write")
+            time.sleep(0)
+
+    def sample(self: object) -> tuple:
+        """
+        Returns (timestamp, monitor) of the latest sample, timestamp is
+        the publisher's time.monotonic(), 0 before the first sample.
+        """
+        values = self.__read(
+            lambda buf: SAMPLE.unpack_from(buf, SAMPLE_OFFSET)
+        )
+
+        return values[0], dict(zip(SAMPLE_KEYS, values[1:]))
+
+    def age(self: object) -> float:
+        """
+        Seconds since the latest sample was published.
+        """
+        return time.monotonic() - self.sample()[0]
+
+    def get_monitor(self: object, forceplot: bool = False, **kwargs) -> dict:
+        """
+        Returns the latest monitor values, as PyRow.get_monitor, always
+        including strokestate.
+        """
+        monitor = self.sample()[1]
+        if forceplot:
+            monitor["forceplot"] = self.get_forceplot_data()
+
+        return monitor
+
+    def get_status(self: object) -> dict:
+        monitor = self.sample()[1]
+
+        return {
+            "strokestate": monitor["strokestate"],
+            "status": monitor["status"],
+        }
+
+    def __curve(self: object, buf: object, number: int) -> list:
+        offset = _curve_offset(number % self.curves, self.points)
+        # A torn length is capped, the copy is retried anyway
+        length = min(CURVE_LENGTH.unpack_from(buf, offset)[0], self.points)
+
+        return list(
+            Struct(f"<{length}H").unpack_from(buf, offset + CURVE_LENGTH.size)
+        )
+
+    def get_curves(self: object, number: int = None) -> list:
+        """
+        Returns up to number of the newest force curves, oldest first.
+        """
+
+        def copy(buf):
+            count = COUNTER.unpack_from(buf, CURVE_COUNT_OFFSET)[0]
+            first = max(0, count - min(number or self.curves, self.curves))
+            return [self.__curve(buf, n) for n in range(first, count)]
+
+        return self.__read(copy)
+
+    def get_forceplot_data(self: object, timeout: float = 5.0) -> list:
+        """
+        Waits for the next force curve, as PyRow.get_forceplot_data.
+        Returns an empty list on timeout.
+        """
+        deadline = time.monotonic() + timeout
+
+        def copy(buf):
+            count = COUNTER.unpack_from(buf, CURVE_COUNT_OFFSET)[0]
+            # Skip to the oldest kept if the reader fell a ring behind
+            number = max(self._curvecount, count - self.curves)
+            if number >= count:
+                return number, None
+            return number, self.__curve(buf, number)
+
+        while time.monotonic() < deadline:
+            number, curve = self.__read(copy)
+            if curve is not None:
+                self._curvecount = number + 1
+                return curve
+            time.sleep(0.01)
+
+        return []
@@ -0,0 +1,42 @@
+"""
+Description:
+    Concept2 pace, power and calorie conversions. Each works on a single
+    value or, unchanged, on a NumPy array of them.
+
+    P = 2.8 / (pace / 500)^3, pace in seconds per 500 m and P in watts
+    cal/hr = 4 * 0.8604 * P + 300
+"""
+# -----------------------------------------------------------------------------
+#                           Global definitions
+# -----------------------------------------------------------------------------
+# Watts at 1 m/s
+WATTS_FACTOR = 2.8
+# Calories per hour per watt, 4 for muscle efficiency times kcal/hr per W
+CALORIES_PER_WATT = 4.0 * 0.8604
+# Calories per hour at rest
+CALORIES_BASE = 300.0
+
+
+# -----------------------------------------------------------------------------
+#                           Function definitions
+# -----------------------------------------------------------------------------
+def pace_to_watts(pace: float) -> float:
+    """
+    Watts of pace, seconds per 500 m.
+    """
+    return WATTS_FACTOR / (pace / 500.0) ** 3
+
+
+def watts_to_pace(watts: float) -> float:
+    """
+    Seconds per 500 m at watts.
+    """
+    return 500.0 * (WATTS_FACTOR / watts) ** (1 / 3)
+
+
+def watts_to_calhr(watts: float) -> float:
+    return watts * CALORIES_PER_WATT + CALORIES_BASE
+
+
+def calhr_to_watts(calhr: float) -> float:
+    return (calhr - CALORIES_BASE) / CALORIES_PER_WATT
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Description:
+    Queries the session catalog strokelog.py keeps. Lists sessions,
+    totals them or ranks the best, optionally only those on one erg,
+    in a date range or of one distance, without opening the session
+    files. add indexes session files recorded elsewhere.
+
+Example:
+    %prog list --since 2026-10-01
+    %prog top time --distance 2000 --since 2026-10-01 -n 1
+    %prog total --serial 430000001
+    %prog add workout-*.c2ss
+"""
+# -----------------------------------------------------------------------------
+#                               Safe Imports
+# -----------------------------------------------------------------------------
+# Standard
+import argparse
+import sys
+from datetime import datetime
+
+# Local packages
+try:
+    sys.path.append("../")
+    from pyrowlib.catalog import CATALOG_PATH, RANKED, SessionCatalog
+except ImportError as err:
+    print(f"Module import failed due to {err}")
+    sys.exit(1)
+
+
+def date(value: str) -> float:
+    """
+    time.time() value of an ISO date, local time.
+    """
+    return datetime.fromisoformat(value).timestamp()
+
+
+def show(summary: dict):
+    started = datetime.fromtimestamp(summary["started"])
+    minutes, seconds = divmod(summary["time"], 60)
+    print(
+        f"{started:%Y-%m-%d %H:%M}  {summary['serial']:>10}"
+        f"{summary['distance']:>8.0f} m{int(minutes):>5}:{seconds:04.1f}"
+        f"{summary['avgpower']:>7.0f} W{summary['maxpower']:>5} W max"
+        f"{summary['strokes']:>6} strokes  {summary['path']}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=CATALOG_PATH, help="catalog file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="index session files")
+    add.add_argument("files", nargs="+")
+
+    queries = []
+    for name, text in (
+        ("list", "list sessions, oldest first"),
+        ("top", "best sessions by a metric"),
+        ("total", "totals over sessions"),
+    ):
+        query = commands.add_parser(name, help=text)
+        query.add_argument("--serial", help="only sessions on this erg")
+        query.add_argument("--since", type=date, help="from this date")
+        query.add_argument("--until", type=date, help="before this date")
+        query.add_argument(
+            "--distance", type=float, help="only sessions of this distance"
+        )
+        queries.append(query)
+    queries[1].add_argument("metric", choices=tuple(RANKED))
+    queries[1].add_argument("-n", "--number", type=int, default=10)
+    args = parser.parse_args()
+
+    with SessionCatalog(args.db) as catalog:
+        if args.command == "add":
+            for path in args.files:
+                try:
+                    show(catalog.add(path))
+                except (OSError, ValueError) as err:
+                    print(f"{path}: {err}", file=sys.stderr)
+            return 0
+
+        filters = {
+            "serial": args.serial,
+            "since": args.since,
+            "until": args.until,
+            "distance": args.distance,
+        }
+        if args.command == "list":
+            for summary in catalog.sessions(**filters):
+                show(summary)
+        elif args.command == "top":
+            for summary in catalog.top(args.metric, args.number, **filters):
+                show(summary)
+        else:
+            total = catalog.aggregate(**filters)
+            hours, minutes = divmod(int(total["time"]) // 60, 60)
+            print(
+                f"{total['sessions']} sessions, {total['strokes']} strokes,"
+                f" {total['distance']:.0f} m in {hours}:{minutes:02d},"
+                f" average {total['avgpower']:.0f} W,"
+                f" max {total['maxpower']} W"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
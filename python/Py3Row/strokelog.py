@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 """
 Description:
-    Writes the workout data to a file after the workout is completed.
-    
+    Logs each stroke of a workout, the monitor values at the catch and
+    the force curve of the drive, to a pyrowlib.store session file. The
+    file is written by a background thread and synced every few
+    seconds, and once more when the workout ends or on Ctrl-C, then
+    added to the session catalog, see sessions.py.
+
 Example:
     %prog (no arguments)
 """
@@ -10,6 +14,7 @@ Example:
 #                               Safe Imports
 # -----------------------------------------------------------------------------
 # Standard
+from datetime import datetime
 import time
 import sys
 
@@ -19,6 +24,9 @@ import sys
 try:
     sys.path.append("../")
     from pyrowlib import pyrow
+    from pyrowlib.catalog import SessionCatalog
+    from pyrowlib.logwriter import BackgroundWriter
+    from pyrowlib.store import SessionWriter
 except ImportError as err:
     print(f"Module import failed due to {err}")
     sys.exit(1)
@@ -31,13 +39,9 @@ if __name__ == "__main__":
     if len(ergs) == 0:
         exit("No ergs found.")
 
-    erg = pyrow.pyrow(ergs[0])
+    erg = pyrow.PyRow(ergs[0])
     print("Connected to erg.")
 
-    # Open and prepare file
-    write_file = open("workout.csv", "w")
-    write_file.write("Time, Distance, SPM, Pace, Force Plot\n")
-
     # Loop until workout has begun
     workout = erg.get_workout()
     print("Waiting for workout to start ...")
@@ -46,47 +50,74 @@ if __name__ == "__main__":
         workout = erg.get_workout()
     print("Workout has begun")
 
-    # Loop until workout ends
-    while workout["state"] == 1:
+    # Open the session file, strokes are written in blocks by a
+    # background thread
+    serial = erg.get_erg()["serial"]
+    writer = SessionWriter(
+        f"workout-{serial}-{datetime.now():%Y%m%d-%H%M%S}.c2ss",
+        serial,
+        workout["type"],
+    )
+    logger = BackgroundWriter(writer)
+    # Sample the session totals are taken from
+    final = None
+
+    try:
+        # Loop until workout ends
+        while workout["state"] == 1:
 
-        forceplot = erg.get_force_plot()
-        # Loop while waiting for drive
-        while forceplot["strokestate"] != 2 and workout["state"] == 1:
-            # ToDo: sleep?
             forceplot = erg.get_force_plot()
-            workout = erg.get_workout()
+            # Loop while waiting for drive
+            while forceplot["strokestate"] != 2 and workout["state"] == 1:
+                # ToDo: sleep?
+                forceplot = erg.get_force_plot()
+                workout = erg.get_workout()
+
+            # Record force data during the drive
+            force = forceplot[
+                "forceplot"
+            ]  # start of pull (when strokestate first changed to 2)
+            monitor = erg.get_sample()  # get monitor data for start of stroke
+            # Loop during drive
+            while forceplot["strokestate"] == 2:
+                # ToDo: sleep?
+                forceplot = erg.get_force_plot()
+                force.extend(forceplot["forceplot"])
 
-        # Record force data during the drive
-        force = forceplot[
-            "forceplot"
-        ]  # start of pull (when strokestate first changed to 2)
-        monitor = erg.get_monitor()  # get monitor data for start of stroke
-        # Loop during drive
-        while forceplot["strokestate"] == 2:
-            # ToDo: sleep?
             forceplot = erg.get_force_plot()
             force.extend(forceplot["forceplot"])
 
-        forceplot = erg.get_force_plot()
-        force.extend(forceplot["forceplot"])
-
-        # Write data to write_file
-        workoutdata = (
-            str(monitor["time"])
-            + ","
-            + str(monitor["distance"])
-            + ","
-            + str(monitor["spm"])
-            + ","
-            + str(monitor["pace"])
-            + ","
-        )
-
-        forcedata = ",".join([str(f) for f in force])
-        write_file.write(workoutdata + forcedata + "\n")
-
-        # Get workout conditions
-        workout = erg.get_workout()
+            # Add the stroke to the session
+            logger.put(monitor, force)
+            final = monitor
+
+            # Get workout conditions
+            workout = erg.get_workout()
+
+        # The work distance and time at WORKOUTEND, past the last catch
+        final = erg.get_sample()
+
+    except KeyboardInterrupt:
+        print("Interrupted")
+
+    finally:
+        # Interrupted sessions keep the totals of the last stroke
+        if final is not None:
+            writer.finish(final.distance, final.time)
+        # Writes and syncs the strokes still queued
+        logger.close()
 
-    write_file.close()
     print("Workout has ended")
+    stats = logger.stats()
+    print(
+        f"{writer.strokes} strokes written to {writer.path}, "
+        f"{stats['dropped']} dropped"
+    )
+
+    # Index the session for sessions.py
+    with SessionCatalog() as catalog:
+        summary = catalog.add(writer.path)
+    print(
+        f"{summary['distance']:.0f} m, {summary['avgpower']:.0f} W average,"
+        f" {summary['maxpower']} W max"
+    )
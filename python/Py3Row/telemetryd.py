@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Description:
+    Telemetry publisher daemon. Claims the first erg found and publishes
+    its samples and force curves to shared memory until interrupted, any
+    number of local programs then read it with TelemetryClient.
+
+Example:
+    %prog
+    %prog --name pyrow-telemetry --rate 20
+    %prog --adaptive
+    %prog --reconnect
+"""
+# -----------------------------------------------------------------------------
+#                               Safe Imports
+# -----------------------------------------------------------------------------
+# Standard
+import argparse
+import sys
+import time
+from traceback import print_exc
+
+# Local packages
+from pyrowlib import pyrow
+from pyrowlib import telemetry
+from pyrowlib.policy import AdaptivePolicy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--name", default=telemetry.SEGMENT_NAME)
+    parser.add_argument("--rate", type=float, default=telemetry.POLL_RATE)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="poll fast in the drive and slowly when idle",
+    )
+    parser.add_argument(
+        "--reconnect",
+        action="store_true",
+        help="reconnect to the erg after USB errors instead of exiting",
+    )
+    args = parser.parse_args()
+
+    try:
+        ergs = list(pyrow.find())
+        if len(ergs) == 0:
+            raise Exception("No ergs found.")
+        erg = pyrow.PyRow(ergs[0])
+        publisher = telemetry.TelemetryPublisher(
+            erg,
+            args.name,
+            args.rate,
+            policy=AdaptivePolicy() if args.adaptive else None,
+            reconnect=args.reconnect,
+        )
+    except Exception:
+        print_exc()
+        return 1
+
+    ret = 0
+    print(f"Publishing {erg.get_erg()['serial']} on {args.name}")
+    with publisher:
+        try:
+            while publisher.running:
+                time.sleep(1.0)
+            print(str(publisher.error))
+            ret = 1
+        except KeyboardInterrupt:
+            print("\nShutting Down\n")
+
+    return ret
+
+
+if __name__ == "__main__":
+    sys.exit(main())
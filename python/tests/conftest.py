@@ -6,6 +6,7 @@ from random import randrange
 from multiprocessing import Process
 try:
     sys.path.append("../")
+    sys.path.append("../Py3Row")
     from servers.tcp_server import MPTCPServer, TCPMessageHandler
     from servers.serverfirst import MPServer, MessageHandler
     import servers.http_server as webserver
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+from pyrowlib import units
+from pyrowlib.sample import MonitorSample
+from pyrowlib.store import SessionWriter
+
+numpy = pytest.importorskip("numpy")
+from pyrowlib import analysis  # noqa: E402
+
+
+def record(path, strokes, power=200, interval=2.5, spm=24, serial="1"):
+    """
+    Writes a session of strokes interval seconds apart at a steady power,
+    stroke n has a force curve of n % 5 + 10 points. Returns the path.
+    """
+    pace = units.watts_to_pace(power)
+    with SessionWriter(path, serial, 1, block=64) as writer:
+        for n in range(1, strokes + 1):
+            seconds = n * interval
+            writer.append(
+                MonitorSample(
+                    seconds,
+                    seconds * 500 / pace,
+                    spm + n % 2,
+                    pace,
+                    power,
+                    units.watts_to_calhr(power),
+                    0,
+                    0,
+                    5,
+                ),
+                [10 * point for point in range(n % 5 + 10)],
+            )
+    return str(path)
+
+
+class TestConversions:
+    def test_arrays(self):
+        pace = numpy.array([0.0, 120.0, 100.0])
+        watts = analysis.pace_to_watts(pace)
+        assert watts[0] == 0.0
+        assert watts[1] == pytest.approx(units.pace_to_watts(120.0))
+        assert analysis.watts_to_pace(watts)[1:] == pytest.approx(pace[1:])
+        calhr = analysis.watts_to_calhr(numpy.array([0, 200]))
+        assert list(calhr) == [0.0, units.watts_to_calhr(200)]
+
+
+class TestAnalysis:
+    def test_splits(self):
+        distance = numpy.array([100.0, 600.0, 1100.0, 1200.0])
+        time = numpy.array([20.0, 120.0, 220.0, 240.0])
+        assert list(analysis.splits(distance, time)) == [100.0, 100.0]
+        assert analysis.splits([], []).size == 0
+
+    def test_rolling_pace(self):
+        time = numpy.arange(1.0, 101.0)
+        distance = time * 4.0
+        pace = analysis.rolling_pace(distance, time, window=10)
+        assert pace[0] == 0.0
+        assert pace[20:] == pytest.approx(125.0)
+
+    def test_stroke_rate_histogram(self):
+        counts, rates = analysis.stroke_rate_histogram([20, 20, 22, 5, 70])
+        assert counts[list(rates).index(20)] == 2
+        assert counts.sum() == 3
+
+    def test_resample(self):
+        offsets = numpy.array([0, 3, 3, 5])
+        points = numpy.array([0, 10, 20, 5, 5])
+        curves = analysis.resample(offsets, points, 5)
+        assert list(curves[0]) == [0, 5, 10, 15, 20]
+        assert not curves[1].any()
+        assert list(curves[2]) == [5] * 5
+
+    def test_load(self, tmp_path):
+        paths = [
+            record(tmp_path / "a.c2ss", 100, power=150, serial="1"),
+            record(tmp_path / "b.c2ss", 200, power=250, serial="2"),
+        ]
+        data = analysis.load(paths)
+        assert len(data) == 300 and data.sessions == 2
+        assert data.serials == ["1", "2"]
+        assert list(data.bounds) == [0, 100, 300]
+        assert data["power"][99] == 150 and data["power"][100] == 250
+        assert list(data.force(100)) == [10 * p for p in range(11)]
+
+        second = data.session(1)
+        assert len(second) == 200
+        assert list(second.force(0)) == list(data.force(100))
+        assert analysis.load(paths[0])["power"][0] == 150
+
+        curve = analysis.power_curve(data, (10, 300, 3600))
+        assert list(curve) == pytest.approx([250.0, 250.0, 0.0])
+        splits = analysis.splits(second["distance"], second["time"])
+        assert splits == pytest.approx(units.watts_to_pace(250))
+        average = analysis.force_average(data, 11)
+        assert average[0] == 0.0 and average[-1] > average[5]
+
+    def test_season(self):
+        # A season of strokes, about 140 hours of rowing
+        strokes = 200000
+        time_ = numpy.arange(strokes) * 2.5
+        distance = time_ * 4.0
+        sizes = numpy.random.randint(30, 60, strokes)
+        offsets = numpy.concatenate(([0], numpy.cumsum(sizes)))
+        points = numpy.random.randint(0, 300, offsets[-1])
+        spm = numpy.random.randint(18, 36, strokes)
+
+        start = time.perf_counter()
+        analysis.rolling_pace(distance, time_)
+        analysis.splits(distance, time_)
+        analysis.stroke_rate_histogram(spm)
+        analysis.resample(offsets, points).mean(axis=0)
+        assert time.perf_counter() - start < 5.0
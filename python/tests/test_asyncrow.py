@@ -0,0 +1,122 @@
+import asyncio
+import threading
+from time import perf_counter_ns
+from pyrowlib.asyncrow import AsyncPyRow
+from pyrowlib.forcecapture import ForceCapture
+from pyrowlib.scheduler import FrameGapScheduler
+
+Driving = 2
+Dwelling = 3
+Recovery = 4
+
+
+class GapErg:
+    """
+    Stands in for PyRow, records the send times and the threads used.
+    """
+
+    def __init__(self, states=(), gap=0.005):
+        self.scheduler = FrameGapScheduler(gap)
+        self.states = list(states)
+        self.sends = []
+        self.threads = set()
+        self.forcecapture = ForceCapture()
+
+    def send(self, message):
+        self.scheduler.wait()
+        self.sends.append(perf_counter_ns())
+        self.threads.add(threading.current_thread().name)
+        self.scheduler.sent(self.sends[-1])
+        return {"message": message}
+
+    def get_monitor(self, forceplot=False, strokestate=False):
+        self.send("monitor")
+        return {"time": len(self.sends) / 10.0, "strokestate": 1}
+
+    def get_status(self):
+        self.send("status")
+        return {"strokestate": self.states.pop(0), "status": 5}
+
+    def get_force_plot(self):
+        self.send("force")
+        return {
+            "forceplot": [len(self.sends)],
+            "strokestate": self.states.pop(0),
+        }
+
+
+class TestAsyncPyRow:
+    def test_gap_enforced(self):
+        erg = GapErg()
+
+        async def run():
+            async with AsyncPyRow(erg) as aerg:
+                await asyncio.gather(*(aerg.get_monitor() for _ in range(8)))
+
+        asyncio.run(run())
+        gaps = [b - a for a, b in zip(erg.sends, erg.sends[1:])]
+        assert len(erg.sends) == 8
+        assert min(gaps) >= erg.scheduler.gap * 1e9
+        assert erg.threads == {"AsyncPyRow_0"}
+        # the event loop waited out the gaps, not the executor
+        assert erg.scheduler.stats()["waited"] < erg.scheduler.gap * 2
+
+    def test_loop_not_blocked(self):
+        erg = GapErg(gap=0.05)
+        ticks = []
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(perf_counter_ns())
+                await asyncio.sleep(0.005)
+
+        async def run():
+            async with AsyncPyRow(erg) as aerg:
+                await asyncio.gather(
+                    aerg.get_monitor(), aerg.get_monitor(), tick()
+                )
+
+        asyncio.run(run())
+        assert len(ticks) == 5
+        assert ticks[-1] < erg.sends[-1]
+
+    def test_forceplot_data(self):
+        erg = GapErg([1, Driving, Driving, Dwelling, Recovery])
+
+        async def run():
+            async with AsyncPyRow(erg) as aerg:
+                return await aerg.get_forceplot_data()
+
+        # one frame for each poll
+        assert asyncio.run(run()) == [2, 3, 4, 5]
+        assert len(erg.sends) == 5
+        # shared with the erg
+        assert erg.forcecapture.last.force == [2, 3, 4, 5]
+
+    def test_stream(self):
+        erg = GapErg()
+
+        async def run():
+            samples = []
+            async with AsyncPyRow(erg) as aerg:
+                async for sample in aerg.stream(rate=100):
+                    samples.append(sample)
+                    if len(samples) == 3:
+                        break
+            return samples
+
+        samples = asyncio.run(run())
+        assert [s.seq for s in samples] == [0, 1, 2]
+        assert samples[0].monitor["strokestate"] == 1
+        assert samples[0].timestamp < samples[2].timestamp
+
+    def test_query(self):
+        erg = GapErg()
+
+        async def run():
+            async with AsyncPyRow(erg) as aerg:
+                return await aerg.query(["CSAFE_GETSTATUS_CMD"])
+
+        result = asyncio.run(run())
+        assert list(result) == ["message"]
+        assert len(erg.sends) == 1
@@ -0,0 +1,155 @@
+import time
+
+import pytest
+from pyrowlib import capture, pyrow, simulator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """
+    Records a few queries to a simulated erg, returns the capture path
+    and the responses.
+    """
+    path = tmp_path / "workout.c2rc"
+    clock = Clock()
+    device = capture.RecordingErg(
+        simulator.SimulatedErg(gap=0, clock=clock), path
+    )
+    erg = pyrow.PyRow(device)
+    erg.scheduler.gap = 0
+    responses = [erg.get_workout()]
+    for second in range(1, 4):
+        clock.now = second * 10.0
+        responses.append(erg.get_monitor(strokestate=True))
+    device.close()
+
+    return path, responses
+
+
+def replay(path, speed=None):
+    erg = pyrow.PyRow(capture.ReplayErg(path, speed))
+    erg.scheduler.gap = 0
+    return erg
+
+
+class TestCapture:
+    def test_records(self, recording):
+        path, responses = recording
+        records = list(capture.read_capture(path))
+        kinds = [record.kind for record in records]
+        # get_erg, get_workout and three get_monitor
+        assert kinds == [capture.WRITE, capture.READ] * 5
+        timestamps = [record.timestamp for record in records]
+        assert timestamps == sorted(timestamps)
+        # padding is restored
+        sizes = {len(record.data) for record in records[1::2]}
+        assert sizes <= {21, 63, 121}
+
+    def test_padding_not_stored(self, recording):
+        path, responses = recording
+        size = sum(
+            capture.RECORD.size + len(record.data.rstrip(b"\x00"))
+            for record in capture.read_capture(path)
+        )
+        assert path.stat().st_size == capture.HEADER.size + size
+
+    def test_not_a_capture(self, tmp_path):
+        path = tmp_path / "junk"
+        path.write_bytes(b"junk" * 4)
+        with pytest.raises(ValueError):
+            list(capture.read_capture(path))
+
+    def test_timeout_recorded(self, tmp_path):
+        path = tmp_path / "timeout.c2rc"
+        device = capture.RecordingErg(simulator.SimulatedErg(gap=0), path)
+        with pytest.raises(capture.USBTimeoutError):
+            device.read(0x83, 121)
+        device.close()
+        records = list(capture.read_capture(path))
+        assert [record.kind for record in records] == [capture.TIMEOUT]
+
+        path = tmp_path / "replay.c2rc"
+        with capture.CaptureWriter(path) as writer:
+            writer.write(capture.WRITE, b"\x01\xf1\x80\x80\xf2")
+            writer.write(capture.TIMEOUT, b"")
+        replayed = capture.ReplayErg(path)
+        replayed.write(0x04, b"\x01\xf1\x80\x80\xf2")
+        with pytest.raises(capture.USBTimeoutError):
+            replayed.read(0x83, 21)
+        assert replayed.mismatches == 0
+
+    def test_replay(self, recording):
+        path, responses = recording
+        erg = replay(path)
+        assert erg.get_erg()["serial"] == "430000001"
+        assert erg.get_workout() == responses[0]
+        for response in responses[1:]:
+            assert erg.get_monitor(strokestate=True) == response
+        assert erg.erg.done
+        assert erg.erg.mismatches == 0
+
+    def test_replay_skips(self, recording):
+        path, responses = recording
+        erg = replay(path)
+        # skips the first two get_monitor responses
+        erg.get_monitor(strokestate=True)
+        assert erg.get_monitor(strokestate=True) == responses[2]
+
+    def test_replay_mismatch(self, recording):
+        path, responses = recording
+        erg = replay(path)
+        with pytest.raises(capture.USBTimeoutError):
+            erg.get_force_plot()
+        assert erg.erg.mismatches == 1
+        # the capture did not move on
+        assert erg.get_workout() == responses[0]
+
+    def test_replay_speed(self, tmp_path):
+        path = tmp_path / "speed.c2rc"
+        with capture.CaptureWriter(path) as writer:
+            writer.write(capture.WRITE, b"\x01\xf1\x80\x80\xf2", 100.0)
+            writer.write(capture.READ, b"\x01\xf1\x81\x81\xf2", 100.2)
+        device = capture.ReplayErg(path, speed=2.0)
+        start = time.monotonic()
+        device.write(0x04, b"\x01\xf1\x80\x80\xf2")
+        report = device.read(0x83, 21)
+        assert time.monotonic() - start == pytest.approx(0.1, abs=0.05)
+        assert bytes(report) == b"\x01\xf1\x81\x81\xf2"
+
+    def test_record_reconnect(self, tmp_path, monkeypatch):
+        path = tmp_path / "workout.c2rc"
+        device = simulator.SimulatedErg(gap=0)
+        monkeypatch.setenv("PYROW_RECORD", str(path))
+        monkeypatch.setattr(pyrow.usb.core, "find", lambda **_: [device])
+        with pyrow.PyRow(next(pyrow.find())) as erg:
+            erg.scheduler.gap = 0
+            erg.get_monitor()
+            first = erg.erg
+            # find() again, as Reconnector does, must not truncate
+            erg.reconnect(next(pyrow.find()))
+            assert first.closed and not first.capture.closed
+            erg.get_monitor()
+        assert first.capture.closed
+        records = list(capture.read_capture(path))
+        # get_erg, get_monitor, then both again after the reconnect
+        assert [r.kind for r in records].count(capture.WRITE) == 4
+        times = [record.timestamp for record in records]
+        assert times == sorted(times)
+
+    def test_find(self, recording, monkeypatch):
+        path, responses = recording
+        monkeypatch.setenv("PYROW_REPLAY", str(path))
+        monkeypatch.setenv("PYROW_REPLAY_SPEED", "0")
+        ergs = list(pyrow.find())
+        assert len(ergs) == 1
+        assert ergs[0].speed is None
+        erg = pyrow.PyRow(ergs[0])
+        assert erg.get_workout() == responses[0]
@@ -0,0 +1,128 @@
+import pytest
+from pyrowlib.catalog import SessionCatalog, summarize
+from pyrowlib.sample import MonitorSample
+from pyrowlib.store import SessionWriter
+
+DAY = 86400.0
+
+
+def record(path, serial, strokes, power, distance, pace=120.0):
+    """
+    Writes a session of strokes at power watts reaching distance meters,
+    returns its path.
+    """
+    with SessionWriter(path, serial, 3, block=16) as writer:
+        for n in range(1, strokes + 1):
+            writer.append(
+                MonitorSample(
+                    distance / 500 * pace * n / strokes,
+                    distance * n / strokes,
+                    24 + n % 2,
+                    pace,
+                    power + n % 3,
+                    1000.0,
+                    n,
+                    0,
+                    5,
+                ),
+                [10, 20, 10],
+            )
+    return str(path)
+
+
+def summary(path, started, serial="430000001", **values):
+    base = {
+        "path": path,
+        "started": started,
+        "serial": serial,
+        "workouttype": 3,
+        "strokes": 200,
+        "distance": 2000.0,
+        "time": 480.0,
+        "avgpower": 200.0,
+        "maxpower": 300,
+        "avgspm": 24.0,
+    }
+    base.update(values)
+    return base
+
+
+@pytest.fixture
+def catalog():
+    catalog = SessionCatalog(":memory:")
+    catalog.insert(summary("a", 0 * DAY, time=450.0))
+    catalog.insert(summary("b", 10 * DAY, time=440.0, avgpower=250.0))
+    catalog.insert(summary("c", 20 * DAY, time=460.0, serial="430000002"))
+    catalog.insert(summary("d", 30 * DAY, distance=5000.0, time=1200.0))
+    catalog.insert(summary("e", 31 * DAY, distance=1995.0, time=445.0))
+    yield catalog
+    catalog.close()
+
+
+class TestSessionCatalog:
+    def test_summarize(self, tmp_path):
+        path = record(tmp_path / "s.c2ss", "430000001", 40, 200, 2000.0)
+        result = summarize(path)
+        assert result["serial"] == "430000001"
+        assert result["workouttype"] == 3
+        assert result["strokes"] == 40
+        assert result["distance"] == 2000.0
+        assert result["time"] == pytest.approx(480.0)
+        assert result["maxpower"] == 202
+        assert 200 < result["avgpower"] < 202
+        assert result["avgspm"] == 24.5
+
+    def test_workout_end(self, tmp_path):
+        # The last catch is short of 2000 m, the workout ended at 2000 m
+        path = tmp_path / "s.c2ss"
+        with SessionWriter(path, "430000001", 3) as writer:
+            for n in range(1, 201):
+                sample = MonitorSample(
+                    n * 2.4, n * 9.85, 24, 120.0, 200, 0, 0, 0, 5
+                )
+                writer.append(sample)
+            writer.finish(2000.0, 481.2)
+        result = summarize(str(path))
+        assert result["distance"] == 2000.0
+        assert result["time"] == 481.2
+        with SessionCatalog(":memory:") as catalog:
+            catalog.add(str(path))
+            assert len(catalog.top("time", 1, distance=2000)) == 1
+
+    def test_add(self, tmp_path):
+        path = record(tmp_path / "s.c2ss", "430000001", 20, 150, 1000.0)
+        with SessionCatalog(str(tmp_path / "sessions.db")) as catalog:
+            catalog.add(path)
+            catalog.add(path)
+            assert len(catalog) == 1
+        with SessionCatalog(str(tmp_path / "sessions.db")) as catalog:
+            assert catalog.sessions()[0]["path"] == path
+            catalog.remove(path)
+            assert len(catalog) == 0
+
+    def test_best_2k(self, catalog):
+        best = catalog.top("time", 2, distance=2000)
+        assert [row["path"] for row in best] == ["b", "e"]
+        month = catalog.top("time", 1, distance=2000, since=15 * DAY)
+        assert month[0]["path"] == "e"
+        erg = catalog.top("time", 1, serial="430000002")
+        assert erg[0]["path"] == "c"
+
+    def test_top_power(self, catalog):
+        assert catalog.top("avgpower", 1)[0]["path"] == "b"
+        with pytest.raises(ValueError):
+            catalog.top("path; DROP TABLE sessions", 1)
+
+    def test_aggregate(self, catalog):
+        total = catalog.aggregate(serial="430000001", until=30 * DAY)
+        assert total["sessions"] == 2
+        assert total["strokes"] == 400
+        assert total["distance"] == 4000.0
+        assert total["avgpower"] == 225.0
+        assert total["first"] == 0.0 and total["last"] == 10 * DAY
+        empty = catalog.aggregate(serial="none")
+        assert empty["sessions"] == 0 and empty["avgpower"] == 0.0
+
+    def test_sessions(self, catalog):
+        rows = catalog.sessions(since=5 * DAY, until=31 * DAY)
+        assert [row["path"] for row in rows] == ["b", "c", "d"]
@@ -0,0 +1,183 @@
+import pytest
+from array import array
+from pyrowlib import csafe_cmd, csafe_dic, csafe_struct
+
+
+class TestCompile:
+    commands = [
+        "CSAFE_PM_GET_WORKTIME",
+        "CSAFE_PM_GET_WORKDISTANCE",
+        "CSAFE_GETCADENCE_CMD",
+        "CSAFE_GETPOWER_CMD",
+    ]
+
+    def test_matches_encode(self):
+        compiled = csafe_cmd.compile(self.commands)
+        assert compiled.frame == bytes(csafe_cmd.encode(self.commands))
+        assert compiled.commands == tuple(self.commands)
+
+    def test_cached(self):
+        first = csafe_cmd.compile(self.commands)
+        second = csafe_cmd.compile(list(self.commands))
+        assert first is second
+
+    def test_report_size(self):
+        compiled = csafe_cmd.compile(["CSAFE_GETSTATUS_CMD"])
+        assert compiled.frame[0] == 0x01
+        assert len(compiled.frame) == 21
+        assert compiled.maxresponse <= 21
+
+    def test_immutable(self):
+        compiled = csafe_cmd.compile(self.commands)
+        with pytest.raises(TypeError):
+            compiled.frame[0] = 0
+
+
+class TestDecode:
+    # PM5 response to get_monitor, includes a stuffed byte (0xF3 0x03)
+    monitor = bytes.fromhex(
+        "04f1851a0ea00540e2010007a3056eb2000003a7031c0054b403f3030058a603d4"
+        "0039a3026000b00198b9f2"
+    )
+    erg = bytes.fromhex(
+        "04f18591071610050002aa00940934333031323334353670037940326df2"
+    )
+
+    def test_unstuffing(self):
+        for message in (
+            bytes([0xF0, 0xF1, 0xF2, 0xF3]),
+            bytes([0x01, 0xF3, 0x02, 0x03, 0xF0, 0x04, 0x05, 0xF1]),
+            bytes(range(0xE8, 0x100)) * 4,
+            b"\x00" * 20,
+        ):
+            assert csafe_cmd.unframe(csafe_cmd.frame(message)) == message
+
+    def test_monitor(self):
+        response = csafe_cmd.decode(array("B", self.monitor + bytes(21)))
+        assert response == {
+            "CSAFE_GETSTATUS_CMD": [0x85],
+            "CSAFE_PM_GET_WORKTIME": [123456, 7],
+            "CSAFE_PM_GET_WORKDISTANCE": [45678, 3],
+            "CSAFE_GETCADENCE_CMD": [28, 84],
+            "CSAFE_GETPOWER_CMD": [243, 88],
+            "CSAFE_GETPACE_CMD": [212, 57],
+            "CSAFE_GETCALORIES_CMD": [96],
+            "CSAFE_GETHRCUR_CMD": [152],
+        }
+
+    def test_variable_length(self):
+        response = csafe_cmd.decode(self.erg)
+        assert response["CSAFE_GETSERIAL_CMD"] == ["430123456"]
+        assert response["CSAFE_GETCAPS_CMD"] == [121, 64, 50]
+        assert response["CSAFE_GETVERSION_CMD"] == [22, 16, 5, 512, 170]
+
+    def test_buffer_types(self):
+        expected = csafe_cmd.decode(self.erg)
+        assert csafe_cmd.decode(list(self.erg)) == expected
+        assert csafe_cmd.decode(bytearray(self.erg)) == expected
+        assert csafe_cmd.decode(memoryview(self.erg)) == expected
+
+    def test_bad_checksum(self):
+        frame = bytearray(self.erg)
+        frame[-2] ^= 0x01
+        assert csafe_cmd.decode(frame) is None
+
+    def test_no_stop_flag(self):
+        assert csafe_cmd.decode(self.erg[:-1]) is None
+
+
+class TestResponseParser:
+    monitor = TestDecode.monitor
+    commands = (
+        "CSAFE_PM_GET_WORKTIME",
+        "CSAFE_PM_GET_WORKDISTANCE",
+        "CSAFE_GETCADENCE_CMD",
+        "CSAFE_GETPOWER_CMD",
+        "CSAFE_GETPACE_CMD",
+        "CSAFE_GETCALORIES_CMD",
+        "CSAFE_GETHRCUR_CMD",
+    )
+
+    def test_fused_matches_decode(self):
+        parser = csafe_cmd.compile(self.commands).parser
+        assert parser is not None
+        assert csafe_cmd.decode(self.monitor, parser) == csafe_cmd.decode(
+            self.monitor
+        )
+
+    def test_layout(self):
+        parser = csafe_struct.ResponseParser(("CSAFE_PM_GET_FORCEPLOTDATA", 32))
+        # status, wrapper id & count, command id & count, 1 + 16 * 2 data
+        assert parser.size == 1 + 2 + 2 + 33
+
+    def test_ascii_field(self):
+        parser = csafe_struct.ResponseParser(("CSAFE_GETSERIAL_CMD",))
+        message = bytes([0x85, 0x94, 9]) + b"430123456"
+        assert parser(memoryview(message)) == {
+            "CSAFE_GETSTATUS_CMD": [0x85],
+            "CSAFE_GETSERIAL_CMD": ["430123456"],
+        }
+
+    def test_mismatch_falls_back(self):
+        # parser for a different command list does not match the response
+        parser = csafe_cmd.compile(self.commands[:-1]).parser
+        assert csafe_cmd.decode(self.monitor, parser) == csafe_cmd.decode(
+            self.monitor
+        )
+
+    def test_variable_length(self):
+        assert csafe_struct.compile_parser(("CSAFE_GETID_CMD",)) is None
+
+
+class TestSchema:
+    schema = csafe_dic.SCHEMA
+
+    def test_lookup_arrays(self):
+        assert len(self.schema.responses) == 0x10000
+        assert len(self.schema.wrappers) == 0x100
+        assert self.schema.responses[0x1AA0] == ("CSAFE_PM_GET_WORKTIME", (4, 1))
+        assert self.schema.responses[0x1AA0] is csafe_dic.resp[0x1AA0]
+        assert self.schema.wrappers[csafe_dic.CSAFE_SETUSERCFG1_CMD]
+
+    def test_read_only(self):
+        with pytest.raises(TypeError):
+            csafe_dic.cmds["CSAFE_GETSTATUS_CMD"] = [0x80, []]
+        with pytest.raises(TypeError):
+            csafe_dic.resp[0x92][1][0] = 0
+
+    def test_decode_does_not_modify(self):
+        csafe_cmd.decode(TestDecode.erg)
+        assert csafe_dic.resp[0x70].fields == (11,)
+        assert csafe_dic.resp[0x92].fields == (-5,)
+
+
+class TestPlan:
+    commands = [
+        *TestResponseParser.commands,
+        "CSAFE_GETID_CMD",
+        "CSAFE_PM_GET_WORKOUTTYPE",
+        "CSAFE_PM_GET_WORKOUTSTATE",
+        "CSAFE_PM_GET_STROKESTATE",
+        "CSAFE_PM_GET_FORCEPLOTDATA",
+        32,
+        "CSAFE_PM_GET_HEARTBEATDATA",
+        32,
+    ]
+
+    def test_single_frame(self):
+        frames = csafe_cmd.plan(TestResponseParser.commands)
+        assert frames == (csafe_cmd.compile(TestResponseParser.commands),)
+
+    def test_split(self):
+        frames = csafe_cmd.plan(self.commands)
+        assert len(frames) == 3
+        # order and arguments are kept
+        commands = [c for frame in frames for c in frame.commands]
+        assert commands == self.commands
+        for frame in frames:
+            assert len(frame.frame) in (21, 63, 121)
+            assert frame.maxresponse <= 121
+
+    def test_unknown_command(self):
+        with pytest.raises(KeyError):
+            csafe_cmd.plan(["CSAFE_GETPACE_CMD", "CSAFE_BADCMD"])
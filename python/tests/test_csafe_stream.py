@@ -0,0 +1,63 @@
+import pytest
+from pyrowlib import csafe_cmd
+from pyrowlib.csafe_stream import CsafeStreamDecoder
+from test_csafe import TestDecode
+
+
+class TestStreamDecoder:
+    # report padded to 63 bytes, the way the erg returns it
+    monitor = TestDecode.monitor + bytes(63 - len(TestDecode.monitor))
+    erg = TestDecode.erg
+    expected = csafe_cmd.decode(monitor)
+
+    def test_whole_report(self):
+        decoder = CsafeStreamDecoder()
+        assert decoder.feed(self.monitor) == [self.expected]
+        assert len(decoder) == 0
+
+    @pytest.mark.parametrize("size", [1, 2, 7, 20])
+    def test_split_frame(self, size):
+        decoder = CsafeStreamDecoder()
+        responses = []
+        for i in range(0, len(self.monitor), size):
+            responses.extend(decoder.feed(self.monitor[i : i + size]))
+        assert responses == [self.expected]
+
+    def test_concatenated_frames(self):
+        decoder = CsafeStreamDecoder()
+        responses = decoder.feed(self.monitor + self.erg + self.monitor)
+        assert responses == [
+            self.expected,
+            csafe_cmd.decode(self.erg),
+            self.expected,
+        ]
+        assert decoder.frames == 3
+
+    def test_junk_and_truncated_frame(self):
+        decoder = CsafeStreamDecoder()
+        # junk, then a frame cut short by the start of the next one
+        chunk = b"\x00\x17" + self.erg[:12] + self.monitor
+        assert decoder.feed(chunk) == [self.expected]
+        assert decoder.errors == 1
+
+    def test_bad_checksum(self):
+        frame = bytearray(self.erg)
+        frame[-2] ^= 0x01
+        decoder = CsafeStreamDecoder()
+        assert decoder.feed(frame + self.monitor) == [self.expected]
+        assert decoder.errors == 1
+
+    def test_parser(self):
+        parser = csafe_cmd.compile(
+            [
+                "CSAFE_PM_GET_WORKTIME",
+                "CSAFE_PM_GET_WORKDISTANCE",
+                "CSAFE_GETCADENCE_CMD",
+                "CSAFE_GETPOWER_CMD",
+                "CSAFE_GETPACE_CMD",
+                "CSAFE_GETCALORIES_CMD",
+                "CSAFE_GETHRCUR_CMD",
+            ]
+        ).parser
+        decoder = CsafeStreamDecoder(parser)
+        assert decoder.feed(list(self.monitor)) == [self.expected]
@@ -0,0 +1,57 @@
+from pyrowlib.fleet import ErgFleet
+from pyrowlib.poller import ErgSample
+
+
+class SerialErg:
+    """
+    Stands in for PyRow, returns its serial and a poll count.
+    """
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.polls = 0
+
+    def get_erg(self):
+        return {"serial": self.serial}
+
+    def get_monitor(self, forceplot=False, strokestate=False):
+        self.polls += 1
+        return {"time": self.polls / 10.0, "strokestate": 1}
+
+
+class TestErgFleet:
+    def test_serials(self):
+        fleet = ErgFleet([SerialErg("430001"), SerialErg("430002")])
+        assert fleet.serials == ["430001", "430002"]
+        assert len(fleet) == 2
+        assert fleet.latest().samples == {}
+
+    def test_at(self):
+        fleet = ErgFleet([SerialErg("a"), SerialErg("b")], size=8)
+        a, b = fleet.pollers["a"].ring, fleet.pollers["b"].ring
+        for n in range(4):
+            a.append(ErgSample(n, 1.0 + n, {}))
+        b.append(ErgSample(0, 2.5, {}))
+
+        frame = fleet.at(2.7)
+        assert frame.timestamp == 2.7
+        assert frame.samples["a"].timestamp == 2.0
+        assert frame.samples["b"].timestamp == 2.5
+        # b has no sample that old
+        assert list(fleet.at(1.5).samples) == ["a"]
+        assert fleet.latest().samples["a"].seq == 3
+
+    def test_concurrent(self):
+        ergs = [SerialErg(str(n)) for n in range(4)]
+        with ErgFleet(ergs, rate=100) as fleet:
+            frames = []
+            for frame in fleet.stream(rate=50):
+                frames.append(frame)
+                if len(frames) == 10:
+                    break
+        assert fleet.errors() == {}
+        assert set(frames[-1].samples) == {"0", "1", "2", "3"}
+        # every erg polled at its own rate, not a share of it
+        assert min(erg.polls for erg in ergs) > 10
+        stamps = [frame.timestamp for frame in frames]
+        assert stamps == sorted(stamps)
@@ -0,0 +1,107 @@
+import pytest
+from pyrowlib.forcecapture import ForceCapture, FORCE_RATE
+
+Waiting = 0
+Accelerate = 1
+Driving = 2
+Dwelling = 3
+Recovery = 4
+
+
+def feed(capture, responses, period=0.05):
+    """
+    Feeds (strokestate, points) responses period seconds apart, returns
+    the completed strokes.
+    """
+    strokes = []
+    for n, (state, points) in enumerate(responses):
+        stroke = capture.feed(state, points, n * period)
+        if stroke is not None:
+            strokes.append(stroke)
+    return strokes
+
+
+class TestForceCapture:
+    def test_stroke(self):
+        capture = ForceCapture()
+        strokes = feed(
+            capture,
+            [
+                (Accelerate, []),
+                (Driving, [1, 2, 3]),
+                (Driving, [4, 5, 6]),
+                (Driving, [7, 8, 9]),
+                (Dwelling, [10]),
+                (Recovery, []),
+                (Recovery, []),
+            ],
+        )
+        assert len(strokes) == 1
+        stroke = strokes[0]
+        assert stroke.force == list(range(1, 11))
+        assert stroke.captured == 10
+        assert stroke.drivetime == pytest.approx(0.15)
+        assert stroke.expected == round(0.15 * FORCE_RATE)
+        assert capture.last is stroke
+        assert not capture.active
+
+    def test_recovery_ends_drive(self):
+        capture = ForceCapture()
+        strokes = feed(
+            capture,
+            [(Recovery, []), (Driving, [1]), (Driving, [2]), (Recovery, [3])],
+        )
+        assert strokes[0].force == [1, 2, 3]
+        assert strokes[0].drivetime == pytest.approx(0.1)
+
+    def test_joined_mid_drive(self):
+        capture = ForceCapture()
+        strokes = feed(
+            capture,
+            [
+                (Driving, [1] * 16),
+                (Dwelling, [1] * 8),
+                (Recovery, []),
+                (Driving, [2] * 16),
+                (Driving, [2] * 16),
+                (Recovery, []),
+            ],
+            period=0.25,
+        )
+        assert len(strokes) == 1
+        assert strokes[0].force == [2] * 32
+        assert capture.stats()["ratio"] == 1.0
+        # Reset mid drive skips the rest of it
+        feed(capture, [(Recovery, []), (Driving, [3])])
+        capture.reset()
+        assert feed(capture, [(Driving, [3]), (Recovery, [])]) == []
+        assert capture.stats()["strokes"] == 1
+
+    def test_stopped_drive_dropped(self):
+        capture = ForceCapture()
+        strokes = feed(
+            capture,
+            [
+                (Accelerate, []),
+                (Driving, [1]),
+                (Waiting, []),
+                (Recovery, []),
+                (Driving, [5]),
+            ],
+        )
+        assert strokes == []
+        assert capture.active
+        assert capture.pending == [5]
+        assert capture.stats()["dropped"] == 1
+
+    def test_stats(self):
+        capture = ForceCapture()
+        stroke = [(Driving, [1] * 16), (Driving, [1] * 16), (Recovery, [])]
+        feed(capture, [(Recovery, [])] + stroke * 3, period=0.25)
+        stats = capture.stats()
+        assert stats["strokes"] == 3
+        assert stats["captured"] == 96
+        assert stats["expected"] == 96
+        assert stats["ratio"] == 1.0
+        capture.reset_stats()
+        assert capture.stats()["ratio"] == 0.0
@@ -0,0 +1,105 @@
+import io
+import random
+
+import pytest
+from pyrowlib import latency, pyrow, simulator
+from pyrowlib.latency import LatencyHistogram
+
+
+@pytest.fixture
+def erg():
+    erg = pyrow.PyRow(simulator.SimulatedErg(gap=0))
+    erg.scheduler.gap = 0
+    return erg
+
+
+class TestHistogram:
+    def test_buckets(self):
+        for value in [0, 1, 127, 128, 129, 255, 256, 10**6, 10**9]:
+            index = LatencyHistogram.index(value)
+            assert value <= LatencyHistogram.upper(index)
+            if index:
+                assert value > LatencyHistogram.upper(index - 1)
+
+    def test_precision(self):
+        histogram = LatencyHistogram()
+        values = [random.randrange(10**3, 10**9) for _ in range(10000)]
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for percent in (50, 90, 99):
+            exact = values[round(len(values) * percent / 100) - 1]
+            assert histogram.percentile(percent) == pytest.approx(
+                exact, rel=0.02
+            )
+        assert histogram.percentile(100) == max(values)
+
+    def test_clamped(self):
+        histogram = LatencyHistogram()
+        histogram.record(2**50)
+        assert histogram.counts[-1] == 1
+        assert histogram.summary()["max"] == 2**50 / 1e9
+
+    def test_merge(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(1000)
+        second.record(3000)
+        first.merge(second)
+        summary = first.summary()
+        assert summary["count"] == 2
+        assert summary["mean"] == pytest.approx(2e-6)
+        assert summary["min"] == 1e-6
+        assert summary["max"] == 3e-6
+
+    def test_empty(self):
+        summary = LatencyHistogram().summary()
+        assert summary["count"] == 0
+        assert summary["p99"] == 0.0
+
+
+class TestPyRowStats:
+    def test_disabled(self, erg):
+        erg.get_monitor()
+        assert erg.stats() == {}
+
+    def test_stats(self, erg):
+        erg.instrument()
+        for _ in range(3):
+            erg.get_monitor()
+        erg.send(["CSAFE_GETPACE_CMD"])
+        stats = erg.stats()
+        assert stats["GETPACE"]["read"]["count"] == 1
+        monitor = latency.signature(erg.MONITOR_CMD.commands)
+        assert set(stats[monitor]) == set(latency.STAGES)
+        for summary in stats[monitor].values():
+            assert summary["count"] == 3
+            assert 0 <= summary["min"] <= summary["p50"] <= summary["max"]
+
+    def test_arguments_merged(self, erg):
+        erg.instrument()
+        erg.send(["CSAFE_PM_GET_FORCEPLOTDATA", 32])
+        erg.send(["CSAFE_PM_GET_FORCEPLOTDATA", 16])
+        stats = erg.stats()
+        assert stats["PM_GET_FORCEPLOTDATA"]["decode"]["count"] == 2
+
+    def test_arguments_bounded(self):
+        stats = latency.LatencyStats()
+        for value in range(100):
+            stats.record(("CSAFE_SETPROGRAM_CMD", value, 0), 1, 1, 1, 1, 1)
+        assert len(stats._histograms) == 1
+        summary = stats.stats()["SETPROGRAM"]["write"]
+        assert summary["count"] == 100
+
+    def test_dump(self, erg):
+        out = io.StringIO()
+        erg.instrument(interval=0, file=out)
+        erg.get_status()
+        assert "PM_GET_STROKESTATE" in out.getvalue()
+        assert "decode" in out.getvalue()
+
+    def test_stop(self, erg):
+        erg.instrument()
+        erg.get_status()
+        erg.instrument(False)
+        assert erg.latency is None
+        assert erg.stats() == {}
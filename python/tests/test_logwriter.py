@@ -0,0 +1,100 @@
+import threading
+
+from pyrowlib.logwriter import BackgroundWriter
+from pyrowlib.sample import MonitorSample
+from pyrowlib.store import SessionReader, SessionWriter
+
+
+def sample(n):
+    return MonitorSample(n, n * 10.0, 24, 120.0, 200, 1000.0, n, 0, 5)
+
+
+class SlowWriter:
+    """
+    SessionWriter stand in that blocks in append until released.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.appended = []
+        self.syncs = 0
+        self.closed = False
+
+    def append(self, sample, force, timestamp):
+        self.release.wait()
+        self.appended.append(sample)
+
+    def sync(self):
+        self.syncs += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FullDisk:
+    def __call__(self, *args):
+        raise OSError(28, "No space left on device")
+
+
+class TestBackgroundWriter:
+    def test_written(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        with BackgroundWriter(SessionWriter(path, block=8)) as logger:
+            for n in range(20):
+                assert logger.put(sample(n), [n, n + 1])
+        stats = logger.stats()
+        assert stats["written"] == 20
+        assert stats["dropped"] == 0
+        assert stats["queued"] == 0
+        assert stats["syncs"] >= 1
+        assert logger.writer.closed
+        with SessionReader(path) as session:
+            assert len(session) == 20
+            assert session[19] == sample(19)
+            assert list(session.force(19)) == [19, 20]
+
+    def test_flush(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        logger = BackgroundWriter(SessionWriter(path), interval=60)
+        logger.put(sample(0))
+        assert logger.flush(1.0)
+        with SessionReader(path) as session:
+            assert len(session) == 1
+        logger.close()
+        assert not logger.flush()
+
+    def test_dropped(self):
+        writer = SlowWriter()
+        logger = BackgroundWriter(writer, size=4)
+        results = [logger.put(sample(n)) for n in range(10)]
+        assert not all(results)
+        stats = logger.stats()
+        assert stats["dropped"] == results.count(False)
+        assert stats["queued"] > 0
+        writer.release.set()
+        logger.close()
+        assert len(writer.appended) == results.count(True)
+        assert writer.closed and writer.syncs >= 1
+
+    def test_full_timeout(self):
+        writer = SlowWriter()
+        logger = BackgroundWriter(writer, size=2)
+        while logger.put(sample(0)):
+            pass
+        assert not logger.flush(0.1)
+        assert not logger.close(0.1)
+        assert logger.running
+        writer.release.set()
+        assert logger.close(5.0)
+        assert writer.closed
+
+    def test_error(self):
+        writer = SlowWriter()
+        writer.append = FullDisk()
+        logger = BackgroundWriter(writer)
+        logger.put(sample(0))
+        logger.put(sample(1))
+        logger.close()
+        assert isinstance(logger.error, OSError)
+        assert logger.stats()["dropped"] == 2
+        assert writer.closed
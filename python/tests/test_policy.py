@@ -0,0 +1,81 @@
+import time
+from pyrowlib.poller import ErgPoller, ErgSample
+from pyrowlib.policy import AdaptivePolicy, PollPolicy
+
+Waiting = 0
+Accelerate = 1
+Driving = 2
+Dwelling = 3
+Recovery = 4
+
+WaitToBegin = 0
+WorkoutRow = 1
+
+
+def sample(strokestate, workoutstate=WorkoutRow):
+    return ErgSample(
+        0, 0.0, {"strokestate": strokestate, "workoutstate": workoutstate}
+    )
+
+
+class TestPollPolicy:
+    def test_fixed(self):
+        policy = PollPolicy(20.0)
+        assert policy.interval(None) == 0.05
+        assert policy.interval(sample(Driving)) == 0.05
+
+    def test_force(self):
+        policy = PollPolicy(20.0)
+        assert policy.force(sample(Driving), False)
+        assert policy.force(sample(Dwelling), False)
+        # the first recovery response completes the curve
+        assert policy.force(sample(Recovery), True)
+        assert not policy.force(sample(Recovery), False)
+        assert not policy.force(sample(Accelerate), False)
+
+
+class TestAdaptivePolicy:
+    def test_interval(self):
+        policy = AdaptivePolicy(active=0.1, idle=1.0)
+        assert policy.interval(None) == 0.0
+        assert policy.interval(sample(Driving)) == 0.0
+        assert policy.interval(sample(Dwelling)) == 0.0
+        assert policy.interval(sample(Recovery)) == 0.1
+        assert policy.interval(sample(Accelerate)) == 0.1
+        assert policy.interval(sample(Waiting)) == 1.0
+        assert policy.interval(sample(Recovery, WaitToBegin)) == 1.0
+
+    def test_without_workoutstate(self):
+        policy = AdaptivePolicy()
+        assert policy.interval(ErgSample(0, 0.0, {"strokestate": 4})) == 0.1
+
+
+class IdleErg:
+    def __init__(self, strokestate):
+        self.strokestate = strokestate
+
+    def get_monitor(self, forceplot=False, strokestate=False):
+        return {"strokestate": self.strokestate}
+
+
+class TestEffectiveRate:
+    def test_rate(self):
+        poller = ErgPoller(IdleErg(Waiting))
+        assert poller.effective_rate == 0.0
+        for n in range(5):
+            poller._polled.append(n * 0.5)
+        assert poller.effective_rate == 2.0
+
+    def test_adaptive_backs_off(self):
+        policy = AdaptivePolicy(active=0.01, idle=0.05)
+        erg = IdleErg(Waiting)
+        poller = ErgPoller(erg, policy=policy)
+        poller.start()
+        time.sleep(0.3)
+        idle = poller.ring.count
+        erg.strokestate = Recovery
+        time.sleep(0.3)
+        poller.stop()
+        assert 3 <= idle <= 8
+        assert poller.ring.count - idle > 2 * idle
+        assert poller.effective_rate > 50
@@ -0,0 +1,91 @@
+import time
+from pyrowlib.poller import ErgPoller, SampleRing
+
+
+class StrokeErg:
+    """
+    Stands in for PyRow, cycles through the stroke states.
+    """
+
+    def __init__(self):
+        self.polls = 0
+
+    def get_monitor(self, forceplot=False, strokestate=False):
+        self.polls += 1
+        return {"time": self.polls / 10.0, "strokestate": self.polls // 3 % 5}
+
+
+class TestSampleRing:
+    def test_empty(self):
+        ring = SampleRing(4)
+        assert ring.latest() is None
+        assert ring.snapshot() == []
+
+    def test_wraps(self):
+        ring = SampleRing(4)
+        for i in range(10):
+            ring.append(i)
+        assert len(ring) == 4
+        assert ring.latest() == 9
+        assert ring.snapshot() == [6, 7, 8, 9]
+        assert ring.snapshot(2) == [8, 9]
+
+    def test_since(self):
+        ring = SampleRing(4)
+        ring.append(0)
+        samples, count = ring.since(0)
+        assert samples == [0]
+        for i in range(1, 7):
+            ring.append(i)
+        # samples 1 and 2 were overwritten before being read
+        samples, count = ring.since(count)
+        assert samples == [3, 4, 5, 6]
+        assert ring.since(count) == ([], 7)
+
+    def test_since_during_append(self):
+        ring = SampleRing(4)
+        for i in range(4):
+            ring.append(i)
+        # the writer has stored sample 4 but not yet advanced the count
+        ring._slots[ring.count % len(ring._slots)] = 4
+        assert ring.since(0) == ([0, 1, 2, 3], 4)
+        assert ring.snapshot() == [0, 1, 2, 3]
+
+
+class TestErgPoller:
+    def test_poll(self):
+        poller = ErgPoller(StrokeErg(), size=8)
+        samples = []
+        strokes = []
+        poller.subscribe(samples.append)
+        poller.on_stroke(lambda previous, sample: strokes.append(sample.seq))
+        for _ in range(7):
+            poller.poll()
+        assert [s.seq for s in samples] == list(range(7))
+        # first sample, then state changes at polls 3 and 6
+        assert strokes == [0, 2, 5]
+        assert poller.latest().monitor["time"] == 0.7
+
+    def test_thread(self):
+        erg = StrokeErg()
+        with ErgPoller(erg, rate=200) as poller:
+            time.sleep(0.1)
+            assert poller.running
+        assert not poller.running
+        assert poller.error is None
+        assert 0 < len(poller.snapshot()) == erg.polls
+
+    def test_error_stops(self):
+        erg = StrokeErg()
+        erg.get_monitor = None
+        poller = ErgPoller(erg)
+        poller.start()
+        poller._thread.join(1)
+        assert isinstance(poller.error, TypeError)
+        assert not poller.running
+
+    def test_callback_error(self, capsys):
+        poller = ErgPoller(StrokeErg())
+        poller.subscribe(lambda sample: 1 / 0)
+        poller.poll()
+        assert "ZeroDivisionError" in capsys.readouterr().err
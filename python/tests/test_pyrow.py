@@ -0,0 +1,144 @@
+from array import array
+from functools import reduce
+from operator import xor
+from pyrowlib import pyrow
+
+
+def response(status, *body):
+    """
+    Returns a PM response frame in a 121 byte report.
+    """
+    message = bytes([status, *body])
+    stuffed = bytearray()
+    for byte in message + bytes([reduce(xor, message)]):
+        if 0xF0 <= byte <= 0xF3:
+            stuffed += bytes([0xF3, byte - 0xF0])
+        else:
+            stuffed.append(byte)
+    frame = bytes([0x02, 0xF1]) + stuffed + bytes([0xF2])
+    return array("B", frame + bytes(121 - len(frame)))
+
+
+# version, serial, caps (21 byte frames, 21 byte tx, 50 ms gap)
+ERG = (0x91, 7, 22, 16, 5, 0, 2, 170, 0,
+       0x94, 9, *b"430123456",
+       0x70, 3, 21, 21, 50)
+# id, PM workout type, state, interval type and count
+WORKOUT = (0x92, 3, *b"042",
+           0x1A, 12, 0x89, 1, 1, 0x8D, 1, 1, 0x8E, 1, 0xFF, 0x9F, 1, 0)
+
+
+class Endpoint:
+    def __init__(self, address):
+        self.bEndpointAddress = address
+
+
+class Context:
+    def managed_claim_interface(self, device, interface):
+        pass
+
+
+class ScriptedDevice:
+    """
+    Stands in for the usb device, answers each write with the next
+    scripted response.
+    """
+
+    def __init__(self, *responses):
+        self._ctx = Context()
+        self.responses = list(responses)
+        self.writes = []
+
+    def is_kernel_driver_active(self, interface):
+        return False
+
+    def set_configuration(self):
+        pass
+
+    def __getitem__(self, index):
+        return {(0, 0): [Endpoint(0x83), Endpoint(0x04)]}
+
+    def write(self, endpoint, data, timeout=None):
+        self.writes.append(bytes(data))
+        return len(data)
+
+    def read(self, endpoint, length, timeout=None):
+        return self.responses.pop(0)
+
+
+class TestCache:
+    def test_erg_cached(self):
+        device = ScriptedDevice(response(0x85, *ERG), response(0x85, *ERG))
+        erg = pyrow.PyRow(device)
+        assert erg.scheduler.gap == 0.05
+        assert len(device.writes) == 1
+        first = erg.get_erg()
+        assert first["serial"] == "430123456"
+        assert len(device.writes) == 1
+        # copies, the cache cannot be changed through them
+        first["serial"] = None
+        assert erg.get_erg()["serial"] == "430123456"
+        erg.get_erg(refresh=True)
+        assert len(device.writes) == 2
+
+    def test_frame_gap(self):
+        for reported, gap in ((5, 0.05), (100, 0.1)):
+            caps = ERG[:-1] + (reported,)
+            erg = pyrow.PyRow(ScriptedDevice(response(0x85, *caps)))
+            assert erg.scheduler.gap == gap
+
+    def test_workout_ttl(self):
+        device = ScriptedDevice(
+            response(0x85, *ERG),
+            response(0x85, *WORKOUT),
+            response(0x85, *WORKOUT),
+        )
+        erg = pyrow.PyRow(device)
+        assert erg.get_workout()["userid"] == "042"
+        assert erg.get_workout()["state"] == 1
+        assert len(device.writes) == 2
+        erg.workout_ttl = 0
+        erg.get_workout()
+        assert len(device.writes) == 3
+
+    def test_reset_clears(self):
+        device = ScriptedDevice(
+            response(0x85, *ERG),
+            response(0x85, *WORKOUT),
+            response(0x85, 0x81, 0),
+            response(0x85, *ERG),
+            response(0x85, *WORKOUT),
+        )
+        erg = pyrow.PyRow(device)
+        erg.get_workout()
+        erg.send(erg.RESET_CMD)
+        erg.get_erg()
+        erg.get_workout()
+        assert len(device.writes) == 5
+
+    def test_status_change_clears(self):
+        device = ScriptedDevice(
+            response(0x85, *ERG),
+            response(0x85, *WORKOUT),
+            response(0x81, *WORKOUT),
+            response(0x81, *ERG),
+        )
+        erg = pyrow.PyRow(device)
+        erg.get_workout()
+        # In use to ready
+        assert erg.get_workout(refresh=True)["status"] == 1
+        assert erg.get_erg()["status"] == 1
+        assert len(device.writes) == 4
+
+
+class TestSend:
+    def test_stale_discarded(self):
+        device = ScriptedDevice(
+            response(0x85, *ERG),
+            # late response to an earlier send
+            response(0x85, *ERG),
+            response(0x85, *WORKOUT),
+        )
+        erg = pyrow.PyRow(device)
+        assert erg.get_workout()["userid"] == "042"
+        assert not device.responses
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+from pyrowlib import pyrow, simulator
+from pyrowlib.poller import ErgPoller
+from pyrowlib.reconnect import Reconnector, USBError
+
+
+@pytest.fixture
+def device():
+    return simulator.SimulatedErg(gap=0)
+
+
+@pytest.fixture
+def erg(device):
+    erg = pyrow.PyRow(device)
+    erg.scheduler.gap = 0
+    return erg
+
+
+def plugged(*devices):
+    """
+    find() for the simulated devices, only lists those plugged in.
+    """
+    return lambda: [device for device in devices if device.connected]
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+class TestReconnector:
+    def test_recover(self, device, erg):
+        reconnector = Reconnector(erg, 0.01, find=plugged(device))
+        device.unplug()
+        with pytest.raises(USBError):
+            erg.get_monitor()
+
+        threading.Timer(0.1, device.plug).start()
+        assert reconnector.recover()
+        assert not reconnector.down
+        assert erg.get_monitor()["time"] >= 0
+
+        stats = reconnector.stats()
+        assert stats["outages"] == stats["recovered"] == 1
+        assert stats["attempts"] > 1
+        assert stats["down"] == 0.0
+        assert 0.1 <= stats["last"] == stats["max"] < 1.0
+
+    def test_other_erg(self, device, erg):
+        other = simulator.SimulatedErg(gap=0, serial="430000002")
+        reconnector = Reconnector(erg, find=plugged(other, device))
+        device.unplug()
+        assert not reconnector.attempt()
+        device.plug()
+        assert reconnector.attempt()
+        assert erg.get_erg()["serial"] == "430000001"
+
+    def test_wrong_serial(self, device, erg):
+        other = simulator.SimulatedErg(gap=0, serial="430000002")
+        with pytest.raises(ValueError):
+            erg.reconnect(other, "430000001")
+        assert erg.erg is device
+        assert erg.get_erg()["serial"] == "430000001"
+
+    def test_stop(self, erg):
+        stop = threading.Event()
+        reconnector = Reconnector(erg, 0.01, 0.04, find=list)
+        threading.Timer(0.2, stop.set).start()
+        start = time.monotonic()
+        assert not reconnector.recover(stop)
+        assert time.monotonic() - start < 1.0
+        assert reconnector.down
+        assert reconnector.stats()["down"] > 0.0
+        # 0.01 + 0.02 + 0.04 + 0.04 ...
+        assert 3 < reconnector.stats()["attempts"] < 10
+
+    def test_background(self, device, erg):
+        reconnector = Reconnector(erg, 0.01, find=plugged(device))
+        device.unplug()
+        reconnector.start()
+        assert reconnector.down
+        assert not reconnector.wait(0.05)
+        device.plug()
+        assert reconnector.wait(1.0)
+        reconnector.stop()
+
+    def test_workout_restored(self):
+        # A stopped clock, the rower would start the workout after reset
+        device = simulator.SimulatedErg(gap=0, clock=lambda: 0.0)
+        erg = pyrow.PyRow(device)
+        erg.scheduler.gap = 0
+        reconnector = Reconnector(erg, find=plugged(device))
+        erg.set_workout(distance=2000, split=500)
+        assert erg.get_status()["status"] == 5
+        # PM restarted while unplugged
+        device.unplug(reset=True)
+        device.plug()
+        assert reconnector.attempt()
+        assert reconnector.stats()["restored"] == 1
+        assert device.pm.goal == ("distance", 2000)
+        assert erg.get_status()["status"] == 5
+
+    def test_workout_kept(self, device, erg):
+        reconnector = Reconnector(erg, find=plugged(device))
+        erg.set_workout(distance=2000)
+        device.pm.goal = ("distance", 3000)
+        device.unplug()
+        device.plug()
+        assert reconnector.attempt()
+        assert reconnector.stats()["restored"] == 0
+        assert device.pm.goal == ("distance", 3000)
+
+
+class TestPoller:
+    def test_stale(self, device, erg):
+        poller = ErgPoller(erg, rate=100, reconnect=True)
+        poller.reconnector.find = plugged(device)
+        poller.reconnector.backoff = 0.01
+        with poller:
+            wait_for(lambda: poller.latest() is not None)
+            device.unplug()
+            wait_for(lambda: poller.stale)
+            last = poller.latest()
+            assert last.stale
+            assert poller.snapshot()[-1].seq == last.seq
+            device.plug()
+            wait_for(lambda: poller.latest().seq > last.seq)
+            assert not poller.latest().stale
+            assert poller.running
+        assert poller.error is None
+
+    def test_no_reconnect(self, device, erg):
+        poller = ErgPoller(erg, rate=100)
+        with poller:
+            wait_for(lambda: poller.latest() is not None)
+            device.unplug()
+            wait_for(lambda: not poller.running)
+        assert isinstance(poller.error, USBError)
@@ -0,0 +1,80 @@
+import tracemalloc
+
+import pytest
+from pyrowlib import pyrow, simulator
+from pyrowlib.sample import COLUMNS, MonitorSample, SampleBuffer
+
+
+def sample(n):
+    return MonitorSample(n / 10, n * 1.5, 24, 120.5, 200, 988.32, n, 0, 5)
+
+
+@pytest.fixture
+def erg():
+    erg = pyrow.PyRow(simulator.SimulatedErg(gap=0))
+    erg.scheduler.gap = 0
+    return erg
+
+
+class TestMonitorSample:
+    def test_get_sample(self, erg):
+        monitor = erg.get_monitor(strokestate=True)
+        value = erg.get_sample(strokestate=True)
+        assert isinstance(value, MonitorSample)
+        assert set(value._fields) == set(monitor)
+        assert value.status == monitor["status"]
+
+    def test_from_monitor(self, erg):
+        monitor = erg.get_monitor()
+        assert "strokestate" not in monitor
+        value = MonitorSample.from_monitor(monitor)
+        assert value._asdict() == dict(
+            monitor, strokestate=0, workoutstate=0
+        )
+
+
+class TestSampleBuffer:
+    def test_append(self):
+        buffer = SampleBuffer(8)
+        for n in range(5):
+            buffer.append(sample(n), timestamp=100.0 + n)
+        assert len(buffer) == 5
+        assert buffer[0] == sample(0)
+        assert buffer[-1] == sample(4)
+        assert buffer.timestamp(-1) == 104.0
+        assert list(buffer.column("calories")) == [0, 1, 2, 3, 4]
+        # a view until the buffer wraps
+        assert buffer.column("time").obj is buffer.columns["time"]
+        with pytest.raises(IndexError):
+            buffer[5]
+
+    def test_wrap(self):
+        buffer = SampleBuffer(4)
+        for n in range(10):
+            buffer.append(sample(n))
+        assert len(buffer) == 4
+        assert buffer.overwritten == 6
+        assert buffer[0] == sample(6)
+        assert list(buffer.column("calories")) == [6, 7, 8, 9]
+        assert buffer.column("distance").tolist() == [9.0, 10.5, 12.0, 13.5]
+
+    def test_memory_bounded(self):
+        buffer = SampleBuffer.for_session(hours=2)
+        assert buffer.capacity == 2 * 3600 * 20
+        memory = buffer.memory()
+        assert memory["nbytes"] == buffer.capacity * memory["sample_bytes"]
+        assert memory["nbytes"] < 8 * 2**20
+        assert set(buffer.columns) == set(COLUMNS)
+
+        value = sample(1)
+        buffer.append(value)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for n in range(1000):
+            buffer.append(value, 1.0)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        stats = after.compare_to(before, "filename")
+        grown = sum(stat.size_diff for stat in stats)
+        assert grown < 4096
+        assert buffer.memory()["nbytes"] == memory["nbytes"]
@@ -0,0 +1,48 @@
+import pytest
+from time import perf_counter_ns
+from pyrowlib.scheduler import FrameGapScheduler
+
+
+class TestFrameGapScheduler:
+    gap = 0.005
+
+    def test_first_frame_does_not_wait(self):
+        scheduler = FrameGapScheduler(self.gap)
+        assert scheduler.wait() == 0
+
+    def test_gap_enforced(self):
+        scheduler = FrameGapScheduler(self.gap)
+        sends = []
+        for _ in range(10):
+            scheduler.wait()
+            sends.append(perf_counter_ns())
+            scheduler.sent(sends[-1])
+        gaps = [b - a for a, b in zip(sends, sends[1:])]
+        assert min(gaps) >= self.gap * 1e9
+        stats = scheduler.stats()
+        assert stats["frames"] == 9
+        assert stats["short"] == 0
+        assert stats["min"] >= self.gap
+        assert stats["mean"] < self.gap * 2
+
+    def test_no_wait_after_gap(self):
+        scheduler = FrameGapScheduler(self.gap)
+        scheduler.sent(perf_counter_ns() - int(self.gap * 2e9))
+        assert scheduler.wait() == 0
+
+    def test_remaining(self):
+        scheduler = FrameGapScheduler(self.gap)
+        assert scheduler.remaining() == 0
+        scheduler.sent()
+        assert 0 < scheduler.remaining() <= self.gap
+        scheduler.sent(perf_counter_ns() - int(self.gap * 2e9))
+        assert scheduler.remaining() == 0
+
+    def test_sleep_only(self):
+        scheduler = FrameGapScheduler(self.gap, spin=0)
+        scheduler.sent()
+        assert scheduler.wait() >= self.gap * 1e9 * 0.5
+
+    def test_negative_gap(self):
+        with pytest.raises(ValueError):
+            FrameGapScheduler(-1)
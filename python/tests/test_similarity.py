@@ -0,0 +1,103 @@
+import math
+import time
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+from pyrowlib import analysis  # noqa: E402
+from pyrowlib.similarity import StrokeIndex, normalize  # noqa: E402
+
+
+def early(points, peak=100.0):
+    """
+    Curve peaking a quarter of the way through the drive.
+    """
+    return [
+        peak
+        * math.sin(math.pi * min(1.0, n / points * 2) / 2)
+        * (1 - n / points)
+        for n in range(points)
+    ]
+
+
+def even(points, peak=100.0):
+    return [
+        peak * math.sin(math.pi * (n + 0.5) / points) for n in range(points)
+    ]
+
+
+def flatten(curves):
+    sizes = [len(curve) for curve in curves]
+    offsets = numpy.concatenate(([0], numpy.cumsum(sizes)))
+    return offsets, numpy.concatenate([numpy.array(c) for c in curves])
+
+
+class TestStrokeIndex:
+    def test_normalize(self):
+        curves = normalize(numpy.array([[3.0, 4.0], [0.0, 0.0]]))
+        assert list(curves[0]) == [0.6, 0.8]
+        assert not curves[1].any()
+
+    def test_nearest(self):
+        index = StrokeIndex(length=32, capacity=2)
+        for stroke in range(10):
+            index.add(even(40 + stroke, 100 + stroke), 0, stroke)
+        for stroke in range(10):
+            index.add(early(40 + stroke, 200 + stroke), 1, stroke)
+        assert len(index) == 20
+
+        rows, distances = index.nearest(early(45, 50), 5)
+        assert all(index.key(row)[0] == 1 for row in rows)
+        assert list(distances) == sorted(distances)
+        assert distances[0] < 0.05
+        rows, _ = index.nearest(even(60), 30)
+        assert len(rows) == 20 and index.key(rows[0])[0] == 0
+
+    def test_skips_empty(self):
+        index = StrokeIndex()
+        offsets, points = flatten([even(40), [], even(30)])
+        assert index.add_curves(offsets, points, 3) == 2
+        assert index.key(1) == (3, 2)
+        with pytest.raises(IndexError):
+            index.key(2)
+
+    def test_cluster(self):
+        curves = [even(40 + n % 7) for n in range(30)]
+        curves += [early(40 + n % 7) for n in range(30)]
+        index = StrokeIndex()
+        index.add_curves(*flatten(curves))
+        labels, centroids = index.cluster(2)
+        assert centroids.shape == (2, index.length)
+        assert len(set(labels[:30])) == 1 and len(set(labels[30:])) == 1
+        assert labels[0] != labels[30]
+        with pytest.raises(ValueError):
+            index.cluster(61)
+
+    def test_from_sessions(self):
+        offsets, points = flatten([even(40), early(40), even(40)])
+        data = analysis.SessionArrays(
+            ["a", "b"],
+            ["1", "2"],
+            numpy.zeros(2),
+            numpy.zeros(2),
+            numpy.array([0, 1, 3]),
+            {},
+            offsets,
+            points,
+        )
+        index = StrokeIndex.from_sessions(data)
+        keys = [index.key(row) for row in range(3)]
+        assert keys == [(0, 0), (1, 0), (1, 1)]
+
+    def test_season(self):
+        strokes = 200000
+        sizes = numpy.random.randint(30, 60, strokes)
+        offsets = numpy.concatenate(([0], numpy.cumsum(sizes)))
+        points = numpy.random.randint(0, 300, offsets[-1])
+        index = StrokeIndex()
+        index.add_curves(offsets, points)
+
+        start = time.perf_counter()
+        rows, _ = index.nearest(even(45), 10)
+        assert time.perf_counter() - start < 0.5
+        assert len(rows) == 10
@@ -0,0 +1,108 @@
+import pytest
+from pyrowlib import csafe_cmd, csafe_dic, pyrow, simulator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def erg(clock):
+    erg = pyrow.PyRow(simulator.SimulatedErg(gap=0, clock=clock))
+    erg.scheduler.gap = 0
+    return erg
+
+
+class TestFraming:
+    def test_round_trip(self):
+        message = bytes([0x91, 0xF0, 0xF3, 0x00])
+        frame = csafe_cmd.frame(message)
+        assert frame[0] == 0xF1 and frame[-1] == 0xF2
+        assert not set(frame[1:-1]) & {0xF0, 0xF1, 0xF2}
+        assert csafe_cmd.unframe(frame) == message
+
+
+class TestSimulatedErg:
+    def test_erg(self, erg):
+        data = erg.get_erg()
+        assert data["serial"] == "430000001"
+        assert data["mininterframe"] == 0
+
+    def test_rowing(self, erg, clock):
+        assert erg.get_status()["status"] == 1
+        clock.now = 60.0
+        monitor = erg.get_monitor(strokestate=True)
+        assert monitor["status"] == 5
+        assert monitor["spm"] == 24
+        assert monitor["power"] == pytest.approx(200, rel=0.05)
+        assert monitor["pace"] == pytest.approx(
+            500 * (2.8 / monitor["power"]) ** (1 / 3), abs=1
+        )
+        assert monitor["time"] == pytest.approx(60.0, abs=0.1)
+        assert 200 < monitor["distance"] < 260
+        assert (
+            monitor["workoutstate"] == csafe_dic.WORKOUT_STATE.WORKOUTROW
+        )
+
+    def test_workout_goal(self, erg, clock):
+        erg.set_workout(distance=100)
+        clock.now = 60.0
+        monitor = erg.get_monitor(strokestate=True)
+        assert monitor["status"] == 7
+        assert monitor["distance"] == pytest.approx(100, abs=1)
+        assert (
+            monitor["workoutstate"] == csafe_dic.WORKOUT_STATE.WORKOUTEND
+        )
+
+    def test_force_curve(self, erg, clock):
+        clock.now = 20.0
+        erg.get_monitor()
+        device = erg.erg
+        drivetime = device.rower.drivetime
+        # Poll a whole stroke from the catch
+        clock.now += device.rower.period - device.pm._phase
+        stroke = None
+        while stroke is None:
+            forceplot = erg.get_force_plot()
+            stroke = erg.forcecapture.feed(
+                forceplot["strokestate"], forceplot["forceplot"], clock.now
+            )
+            clock.now += 0.1
+        assert stroke.captured == round(drivetime * simulator.FORCE_RATE)
+        peak = max(stroke.force)
+        # Half sine
+        assert stroke.force.index(peak) in range(
+            stroke.captured // 2 - 2, stroke.captured // 2 + 2
+        )
+
+    def test_unmodelled_get(self, erg):
+        results = erg.send(
+            [
+                "CSAFE_PM_GET_HEARTBEATDATA",
+                32,
+                "CSAFE_PM_SET_SCREENERRORMODE",
+                0,
+            ]
+        )
+        assert results["CSAFE_PM_GET_HEARTBEATDATA"] == [0] * 17
+        assert "CSAFE_PM_SET_SCREENERRORMODE" in results
+
+    def test_gap_violation(self):
+        device = simulator.SimulatedErg(gap=0.2)
+        pyrow.PyRow(device)
+        assert device.violations == 0
+        # Inside the gap after PyRow's GETCAPS query
+        report = bytes([0x01]) + csafe_cmd.frame(bytes([0x80]))
+        device.write(0x04, report)
+        assert device.violations == 1
+        with pytest.raises(simulator.USBTimeoutError):
+            device.read(0x83, 121)
@@ -0,0 +1,137 @@
+import os
+
+import pytest
+from pyrowlib.sample import MonitorSample
+from pyrowlib.store import HEADER, HEADERS, SessionReader, SessionWriter
+
+
+def sample(n):
+    return MonitorSample(
+        n * 2.5, n * 10.0, 24, 120.0 + n % 4 * 0.5, 200 + n, 1000.0 + n,
+        n, 150, 5, 4, 1,
+    )
+
+
+def curve(n):
+    return [n % 7 * 10 + point for point in range(n % 5 + 10)]
+
+
+def append(writer, strokes):
+    for n in range(strokes):
+        writer.append(sample(n), curve(n), timestamp=float(n))
+
+
+def write(path, strokes, block=256):
+    with SessionWriter(path, "430000001", 4, block=block) as writer:
+        append(writer, strokes)
+    return writer
+
+
+class TestSession:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        writer = write(path, 10)
+        assert writer.strokes == 10 and writer.blocks == 1
+        with SessionReader(path) as session:
+            assert session.serial == "430000001"
+            assert session.workouttype == 4
+            assert session.started == writer.started
+            assert len(session) == 10
+            for n in range(10):
+                assert session[n] == sample(n)
+                assert session.timestamp(n) == n
+                assert list(session.force(n)) == curve(n)
+            assert session[-1] == sample(9)
+            with pytest.raises(IndexError):
+                session[10]
+
+    def test_columns(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        power = [200 + n for n in range(1000)]
+        with SessionWriter(path, "430000001", 4, block=300) as writer:
+            append(writer, 1000)
+            writer.flush()
+            # Still being written, as after a crash
+            with SessionReader(path) as session:
+                assert session.blocks == 4
+                assert list(session.column("power")) == power
+                assert session[650] == sample(650)
+                assert list(session.force(299)) == curve(299)
+                assert list(session.force(300)) == curve(300)
+                offsets, points = session.forces()
+                assert len(offsets) == 1001
+                assert list(points[offsets[300] : offsets[301]]) == curve(
+                    300
+                )
+                del offsets, points
+        assert writer.blocks == 1
+        with SessionReader(path) as session:
+            assert session.blocks == 1
+            assert list(session.column("power")) == power
+            assert session.serial == "430000001"
+            assert list(session.force(300)) == curve(300)
+            assert session.timestamp(999) == 999.0
+
+    def test_single_block_view(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        write(path, 10000, block=10000)
+        session = SessionReader(path)
+        power = session.column("power")
+        assert power.format == "H" and len(power) == 10000
+        assert power.obj is session.column("power").obj
+        del power
+        session.close()
+
+    def test_flush(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        writer = SessionWriter(path)
+        writer.append(sample(0), curve(0))
+        assert writer.pending == 1
+        with SessionReader(path) as session:
+            assert len(session) == 0
+        writer.sync()
+        assert writer.pending == 0
+        writer.append(sample(1), [])
+        writer.flush()
+        with SessionReader(path) as session:
+            assert len(session) == 2
+            assert len(session.force(1)) == 0
+        writer.close()
+        assert writer.closed
+
+    def test_finish(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        with SessionWriter(path, block=4) as writer:
+            for n in range(10):
+                writer.append(sample(n))
+            writer.finish(97.5, 24.3)
+        with SessionReader(path) as session:
+            assert len(session) == 10
+            assert (session.distance, session.time) == (97.5, 24.3)
+        with SessionReader(write(tmp_path / "open.c2ss", 3).path) as session:
+            assert (session.distance, session.time) == (0.0, 0.0)
+
+    def test_version_1(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        write(path, 10)
+        data = path.read_bytes()
+        fields = list(HEADER.unpack_from(data)[:5])
+        fields[1] = 1
+        path.write_bytes(HEADERS[1].pack(*fields) + data[HEADER.size :])
+        with SessionReader(path) as session:
+            assert session[9] == sample(9)
+            assert session.time == 0.0
+
+    def test_truncated(self, tmp_path):
+        path = tmp_path / "session.c2ss"
+        with SessionWriter(path, block=10) as writer:
+            append(writer, 20)
+            os.truncate(path, os.path.getsize(path) - 1)
+            with SessionReader(path) as session:
+                assert len(session) == 10
+
+    def test_not_session(self, tmp_path):
+        path = tmp_path / "other"
+        path.write_bytes(bytes(HEADER.size))
+        with pytest.raises(ValueError):
+            SessionReader(path)
@@ -0,0 +1,89 @@
+import math
+
+import pytest
+from pyrowlib import pyrow, simulator, strokemetrics
+from pyrowlib.forcecapture import FORCE_RATE, ForceCapture
+from pyrowlib.strokemetrics import StrokeAnalyzer, stroke_metrics
+
+Driving = 2
+Recovery = 4
+
+
+def half_sine(points, peak=100.0):
+    return [
+        peak * math.sin(math.pi * (n + 0.5) / points) for n in range(points)
+    ]
+
+
+class TestStrokeMetrics:
+    def test_metrics(self):
+        force = [0, 10, 30, 50, 40, 20, 10]
+        metrics = stroke_metrics(force)
+        assert metrics.peak == 50
+        assert metrics.peakpos == 0.5
+        assert metrics.mean == pytest.approx(160 / 7)
+        assert metrics.points == 7
+        assert metrics.drivetime == 7 / FORCE_RATE
+        assert metrics.impulse == pytest.approx(160 / FORCE_RATE)
+        assert metrics.smoothness == 1.0
+        assert metrics.ratio == pytest.approx(160 / 7 / 50)
+
+    def test_smoothness(self):
+        # Dips by 20 on the way up
+        metrics = stroke_metrics([0, 30, 10, 50, 0])
+        assert metrics.smoothness == pytest.approx(100 / 140)
+
+    def test_empty(self):
+        assert stroke_metrics([]) is None
+        assert stroke_metrics([5]).peakpos == 0.0
+
+    @pytest.mark.skipif(strokemetrics.numpy is None, reason="needs NumPy")
+    def test_numpy_matches_python(self):
+        force = half_sine(50) + [30, 35, 20]
+        python = stroke_metrics(force, usenumpy=False)
+        vectorized = stroke_metrics(force, usenumpy=True)
+        for name, value in python._asdict().items():
+            assert getattr(vectorized, name) == pytest.approx(value)
+
+
+class TestStrokeAnalyzer:
+    def test_consistency(self):
+        analyzer = StrokeAnalyzer(window=3)
+        assert analyzer.consistency() == {}
+        for _ in range(3):
+            analyzer.analyze(half_sine(40))
+        scores = analyzer.consistency()
+        assert scores["overall"] == pytest.approx(1.0)
+
+        analyzer.analyze(half_sine(60, peak=150))
+        assert len(analyzer) == 3
+        scores = analyzer.consistency()
+        assert scores["peak"] < 1.0
+        assert scores["drivetime"] < 1.0
+        assert scores["peakpos"] == pytest.approx(1.0, abs=0.02)
+
+    def test_window(self):
+        with pytest.raises(ValueError):
+            StrokeAnalyzer(window=1)
+
+    def test_capture(self):
+        capture = ForceCapture()
+        capture.analyzer = StrokeAnalyzer()
+        capture.feed(Recovery, [], 0.0)
+        capture.feed(Driving, [10, 50], 0.0)
+        assert capture.analyzer.last is None
+        stroke = capture.feed(Recovery, [20], 0.05)
+        assert capture.analyzer.last == stroke_metrics(stroke.force)
+        assert capture.analyzer.stats()["strokes"] == 1
+
+    def test_pyrow(self):
+        erg = pyrow.PyRow(simulator.SimulatedErg(gap=0))
+        erg.scheduler.gap = 0
+        analyzer = erg.analyze_strokes(window=5)
+        force = erg.get_forceplot_data()
+        assert analyzer.last.points == len(force)
+        assert analyzer.last.ratio == pytest.approx(2 / math.pi, rel=0.1)
+        # Ready within the frame gap of the poll that ended the drive
+        assert analyzer.stats()["max"] < pyrow.MIN_FRAME_GAP
+        erg.analyze_strokes(False)
+        assert erg.forcecapture.analyzer is None
@@ -0,0 +1,149 @@
+from multiprocessing import resource_tracker
+import subprocess
+import sys
+
+import pytest
+import os
+from pyrowlib.poller import ErgSample
+from pyrowlib.telemetry import (
+    COUNTER,
+    HEADER,
+    SEQ_OFFSET,
+    TelemetryClient,
+    TelemetryPublisher,
+)
+
+Driving = 2
+Dwelling = 3
+Recovery = 4
+
+
+class ForceErg:
+    """
+    Stands in for PyRow, rows one stroke per states list.
+    """
+
+    def __init__(self, states):
+        self.states = list(states)
+        self.polls = 0
+        self.points = 0
+
+    def get_monitor(self, forceplot=False, strokestate=False):
+        self.polls += 1
+        self.state = self.states.pop(0)
+        return {
+            "time": self.polls / 10.0,
+            "distance": float(self.polls),
+            "spm": 24,
+            "power": 200,
+            "pace": 120.0,
+            "status": 5,
+            "strokestate": self.state,
+        }
+
+    def get_force_plot(self):
+        force = list(range(self.points, self.points + 4))
+        self.points += 4
+        return {"forceplot": force, "strokestate": self.state}
+
+
+@pytest.fixture
+def name():
+    return f"pyrow-test-{os.getpid()}"
+
+
+@pytest.fixture
+def publish(name):
+    """
+    Returns a function creating publishers on name, polled by the test
+    rather than a thread.
+    """
+    publishers = []
+
+    def create(erg, **kwargs):
+        publishers.append(TelemetryPublisher(erg, name, **kwargs))
+        return publishers[-1]
+
+    yield create
+    for publisher in publishers:
+        publisher.close()
+
+
+class TestTelemetry:
+    def test_sample(self, name, publish):
+        publisher = publish(ForceErg([1]))
+        with TelemetryClient(name) as client:
+            assert client.get_monitor()["time"] == 0.0
+            publisher.poll()
+            monitor = client.get_monitor()
+            assert monitor["time"] == 0.1
+            assert monitor["spm"] == 24
+            assert monitor["strokestate"] == 1
+            assert client.get_status() == {"strokestate": 1, "status": 5}
+
+    def test_forceplot(self, name, publish):
+        # The first drive is joined mid stroke and skipped
+        publisher = publish(
+            ForceErg(
+                [Driving, Recovery, Driving, Dwelling, Recovery, Recovery]
+            )
+        )
+        with TelemetryClient(name) as client:
+            for _ in range(5):
+                publisher.poll()
+            assert client.get_forceplot_data() == list(range(4, 16))
+            publisher.poll()
+            # no new stroke
+            assert client.get_forceplot_data(timeout=0.05) == []
+
+    def test_ring(self, name, publish):
+        publisher = publish(ForceErg([]), curves=2, points=8)
+        with TelemetryClient(name) as client:
+            for n in range(3):
+                publisher.publish(ErgSample(n, 1.0, {}), list(range(n, n + 8)))
+            assert client.get_curves() == [
+                list(range(1, 9)),
+                list(range(2, 10)),
+            ]
+            # the first curve was overwritten before it was read
+            assert client.get_forceplot_data() == list(range(1, 9))
+            assert client.get_forceplot_data() == list(range(2, 10))
+
+    def test_stopped_mid_write(self, name, publish):
+        publisher = publish(ForceErg([1]))
+        with TelemetryClient(name, timeout=0.05) as client:
+            # As if the publisher died between the two sequence updates
+            COUNTER.pack_into(publisher._buf, SEQ_OFFSET, 1)
+            with pytest.raises(TimeoutError):
+                client.get_monitor()
+
+    def test_stale_segment(self, name, publish):
+        # Left behind without close(), by this process so still running
+        crashed = TelemetryPublisher(ForceErg([]), name)
+        resource_tracker.unregister(crashed.shm._name, "shared_memory")
+        with pytest.raises(FileExistsError):
+            publish(ForceErg([]))
+
+        # The process that left it has gone
+        child = subprocess.Popen([sys.executable, "-c", "pass"])
+        child.wait()
+        header = list(HEADER.unpack_from(crashed._buf, 0))
+        header[4] = child.pid
+        HEADER.pack_into(crashed._buf, 0, *header)
+        crashed._buf = None
+        crashed.shm.close()
+        publisher = publish(ForceErg([1]))
+        publisher.poll()
+        with TelemetryClient(name) as client:
+            assert client.get_monitor()["time"] == 0.1
+
+    def test_not_telemetry(self, name):
+        from multiprocessing.shared_memory import SharedMemory
+
+        shm = SharedMemory(name, create=True, size=64)
+        try:
+            with pytest.raises(ValueError):
+                TelemetryClient(name)
+        finally:
+            shm.close()
+            shm.unlink()